@@ -1,32 +1,332 @@
 """
 brain.py — Мозг Jarvis через OpenAI ChatGPT API + function calling для команд
+
+AsyncBrain — вся логика на AsyncOpenAI в фоновом event loop (поток brain-loop):
+  think()        — полный ответ строкой (чат, API)
+  think_stream() — ответ по предложениям по мере генерации (голос: TTS начинает
+                   говорить первое предложение, пока модель пишет остальные)
+Brain — синхронная обёртка для потоков голосового цикла: те же think() и
+think_stream(), плюс cancel() — стоп-слово обрывает генерацию и запросы.
+
+Все клиенты делят один пул keep-alive соединений (_get_http_client). Пока
+активен цикл wake word, start_keep_warm() раз в KEEP_WARM_SEC простоя делает
+лёгкий запрос — первый ответ после паузы не платит за TCP/TLS.
+
+Префикс запроса (схема инструментов + системный промпт + история) не
+меняется от хода к ходу: команды отсортированы, языковое правило для
+финального ответа идёт последним сообщением, второй запрос несёт ту же
+схему с tool_choice="none" — так провайдер кэширует промпт. Сколько токенов
+пришло из кэша — в логе [GPT] и get_usage_stats().
+
+История ограничена бюджетом токенов (HISTORY_TOKEN_BUDGET): старые ходы
+уходят из окна и в фоновой задаче сворачиваются в краткую сводку, которая
+идёт системным сообщением сразу после промпта. Живой запрос сводку не ждёт —
+берёт ту, что готова.
+
+Оба сначала пробуют быстрый путь (ai/intent_router.py): частые команды
+выполняются локально, без запросов к модели; результат, который нельзя
+озвучить как есть (не DIRECT_RESPONSE, ошибка, другой язык), модель
+формулирует одним финальным запросом. Дальше — кэш ответов
+(ai/response_cache.py): повторный самостоятельный вопрос получает прошлый
+ответ без сети; ход без команд с побочными эффектами туда и пишется.
+Запросы к модели идут через ai/router.py: модель по реплике, дубль запроса
+при медленном первом токене, локальный режим, пока API не отвечает.
+Если модель вызвала только
+команды с DIRECT_RESPONSE (или результат — JSON с полем speak), второй
+запрос не делается: готовая фраза команды и есть ответ.
 """
 
+import asyncio
+import collections
+import concurrent.futures
 import json
+import re
+import threading
+import time
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator
+
 import config as _cfg
-from openai import OpenAI
 from config import OPENAI_API_KEY, GPT_MODEL, GPT_TEMPERATURE, build_system_prompt, get_lang
-from commands import COMMANDS, execute_command, build_tools_schema
+from commands import COMMANDS, execute_commands, build_tools_schema
+from ai.intent_router import get_intent_router
+from ai.tool_retriever import get_tool_retriever
+from ai.response_cache import get_response_cache
+from ai.router import get_latency_router, DEGRADED_MIN_CONF
+from utils.tokens import estimate_tokens
 
+# ── Нарезка потока на предложения ─────────────────────────────────────────────
+
+FIRST_SENTENCE_MIN = 8     # первое предложение отдаём как можно раньше
+SENTENCE_MIN       = 40    # дальше склеиваем короткие — меньше пауз между синтезами
+SENTENCE_MAX       = 220   # без точки режем по запятой, чтобы TTS не ждал весь абзац
+
+_SENT_END_RE  = re.compile(r'[.!?…]+["»)]*\s+|\n+')
+_SOFT_END_RE  = re.compile(r'[,;:—]\s+')
+
+RECENT_TOOLS = 4   # команды последних ходов всегда в схеме — для уточнений к ним
+
+# ── Память диалога ────────────────────────────────────────────────────────────
+
+HISTORY_TOKEN_BUDGET = 3000   # окно последних ходов (без системного промпта)
+SUMMARY_MAX_TOKENS   = 250    # длина сводки свёрнутых ходов
+FOLD_RESULT_CHARS    = 300    # результат команды в тексте для сводки — обрезаем
+MSG_OVERHEAD_TOKENS  = 4      # служебные токены роли/разметки на сообщение
+
+# ── Соединение ────────────────────────────────────────────────────────────────
+
+POOL_MAX_CONNECTIONS = 8      # ход + сводка + прогрев, с запасом
+POOL_KEEPALIVE       = 4
+KEEPALIVE_EXPIRY_SEC = 120    # дольше интервала прогрева, иначе пул закроет соединение сам
+KEEP_WARM_SEC        = 30     # если в config нет KEEP_WARM_SEC
+
+# ── Прямой ответ команды ──────────────────────────────────────────────────────
+
+_CYRILLIC_RE     = re.compile(r"[а-яё]", re.IGNORECASE)
+_LATIN_RE        = re.compile(r"[a-z]", re.IGNORECASE)
+_ERROR_PREFIXES  = ("Ошибка", "Error", "Не удалось", "Failed", "Команда '", "Install ")
+
+
+def _structured_speak(result: str) -> str | None:
+    """Поле speak, если команда вернула JSON-объект {"speak": ..., ...}."""
+    if not result.startswith("{"):
+        return None
+    try:
+        data = json.loads(result)
+    except ValueError:
+        return None
+    speak = data.get("speak") if isinstance(data, dict) else None
+    return speak.strip() if isinstance(speak, str) else None
+
+
+def _in_active_language(text: str) -> bool:
+    """Грубая проверка: русские фразы — с кириллицей, английские — без неё."""
+    has_cyrillic = bool(_CYRILLIC_RE.search(text))
+    if getattr(_cfg, "ACTIVE_LANGUAGE", "ru") == "en":
+        return not has_cyrillic
+    return has_cyrillic or not _LATIN_RE.search(text)
+
+
+class _SentenceSplitter:
+    """
+    Склеивает текстовые дельты стрима и отдаёт готовые предложения.
+    Граница — .!?… с пробелом после (числа «3.5» и «т.е.» без пробела не режутся)
+    или перевод строки; слишком длинный хвост режется по , ; : —.
+    """
 
-class Brain:
     def __init__(self):
-        self.client = OpenAI(
-            api_key=OPENAI_API_KEY,
-            timeout=15.0,    # не висеть при нестабильном интернете
-            max_retries=1,   # 1 повтор при обрыве, потом ошибка
-        )
+        self._buf   = ""
+        self._first = True
+
+    def feed(self, delta: str) -> list[str]:
+        if not delta:
+            return []
+        self._buf += delta
+        out = []
+        while True:
+            min_len = FIRST_SENTENCE_MIN if self._first else SENTENCE_MIN
+            buf = self._buf
+            cut = next((m.end() for m in _SENT_END_RE.finditer(buf) if m.end() >= min_len), 0)
+            if not cut and len(buf) > SENTENCE_MAX:
+                soft = [m.end() for m in _SOFT_END_RE.finditer(buf) if m.end() >= min_len]
+                fit  = [e for e in soft if e <= SENTENCE_MAX]
+                cut  = fit[-1] if fit else (soft[0] if soft else 0)
+            if not cut:
+                return out
+            sentence, self._buf = buf[:cut].strip(), buf[cut:]
+            if sentence:
+                self._first = False
+                out.append(sentence)
+
+    def flush(self) -> str:
+        tail, self._buf = self._buf.strip(), ""
+        return tail
+
+
+def iter_sentences(deltas: Iterable[str]) -> Iterator[str]:
+    """Предложения из текстовых дельт стрима (см. _SentenceSplitter)."""
+    splitter = _SentenceSplitter()
+    for delta in deltas:
+        yield from splitter.feed(delta)
+    tail = splitter.flush()
+    if tail:
+        yield tail
+
+
+async def aiter_sentences(deltas: AsyncIterable[str]) -> AsyncIterator[str]:
+    """iter_sentences для асинхронного стрима."""
+    splitter = _SentenceSplitter()
+    async for delta in deltas:
+        for sentence in splitter.feed(delta):
+            yield sentence
+    tail = splitter.flush()
+    if tail:
+        yield tail
+
+
+# ── Event loop и пул соединений ───────────────────────────────────────────────
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+_http = None
+_http_lock = threading.Lock()
+_last_request = 0.0            # monotonic последнего запроса к API — для прогрева
+_warm_task: asyncio.Task | None = None
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Общий event loop Brain — в фоновом потоке, живёт весь процесс."""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, daemon=True, name="brain-loop").start()
+                _loop = loop
+    return _loop
+
+
+def _get_http_client():
+    """Один httpx-пул на все клиенты: тёплое соединение переживает пересоздание Brain."""
+    global _http
+    if _http is None:
+        with _http_lock:
+            if _http is None:
+                import httpx
+                from openai import DefaultAsyncHttpxClient
+                _http = DefaultAsyncHttpxClient(limits=httpx.Limits(
+                    max_connections=POOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=POOL_KEEPALIVE,
+                    keepalive_expiry=KEEPALIVE_EXPIRY_SEC,
+                ))
+    return _http
+
+
+def _async_client():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(
+        api_key=OPENAI_API_KEY,
+        timeout=15.0,    # не висеть при нестабильном интернете
+        max_retries=1,   # 1 повтор при обрыве, потом ошибка
+        http_client=_get_http_client(),
+    )
+
+
+def _touch() -> None:
+    global _last_request
+    _last_request = time.monotonic()
+
+
+# ── Прогрев соединения ────────────────────────────────────────────────────────
+
+def start_keep_warm() -> None:
+    """Прогревать соединение с API, пока слушаем wake word. Повторный вызов — no-op."""
+    asyncio.run_coroutine_threadsafe(_start_warm(), get_loop())
+
+
+def stop_keep_warm() -> None:
+    get_loop().call_soon_threadsafe(_cancel_warm)
+
+
+async def _start_warm():
+    global _warm_task
+    if _warm_task is None or _warm_task.done():
+        _warm_task = asyncio.get_running_loop().create_task(_keep_warm())
+
+
+def _cancel_warm():
+    global _warm_task
+    if _warm_task is not None:
+        _warm_task.cancel()
+        _warm_task = None
+
+
+async def _keep_warm():
+    """
+    Первый запрос — сразу (TCP/TLS до первой реплики), дальше — после
+    KEEP_WARM_SEC без запросов. GET /models/{model}: бесплатно, токены не тратит.
+    """
+    client, key, ok = None, None, None
+    while True:
+        interval = getattr(_cfg, "KEEP_WARM_SEC", KEEP_WARM_SEC)
+        idle = time.monotonic() - _last_request
+        if idle >= interval and OPENAI_API_KEY:
+            if key != OPENAI_API_KEY:
+                client, key = _async_client(), OPENAI_API_KEY
+            start = time.monotonic()
+            try:
+                await client.models.retrieve(GPT_MODEL)
+                if not ok:
+                    print(f"  [GPT] соединение прогрето ({(time.monotonic() - start) * 1000:.0f} мс)")
+                ok = True
+            except Exception as e:
+                if ok is not False:
+                    try:
+                        print(f"  [!] Прогрев соединения: {e}")
+                    except Exception:
+                        pass
+                ok = False
+            _touch()
+            idle = 0.0
+        await asyncio.sleep(max(1.0, interval - idle))
+
+
+async def _anext(agen):
+    """__anext__ для run_coroutine_threadsafe; конец генератора — None."""
+    try:
+        return await agen.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+async def _aclose(agen):
+    for _ in range(100):
+        try:
+            await agen.aclose()
+            return
+        except RuntimeError:
+            # Отменённый __anext__ ещё не дошёл до конца — ждём его
+            await asyncio.sleep(0.01)
+
+
+# ── AsyncBrain ────────────────────────────────────────────────────────────────
+
+class AsyncBrain:
+    """
+    Ходы диалога на AsyncOpenAI. Методы — корутины event loop'а get_loop();
+    ходы идут по одному (общая история), _turn_lock держится до конца хода.
+    Отмена (CancelledError или aclose() стрима) оставляет в истории сказанное.
+    """
+
+    def __init__(self):
+        self.client = _async_client()
         self.history: list = []
+        self.last_answer = ""
+        self._turn_lock = asyncio.Lock()
+        self._recent_tools: collections.deque = collections.deque(maxlen=RECENT_TOOLS)
+        self._last_tools: list[str] | None = None
+        self._system_key: tuple | None = None
+        self._usage = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0}
+        self._summary = ""                      # сводка ходов, вышедших из окна
+        self._fold_pending: list = []           # ходы, ждущие сворачивания
+        self._fold_task: asyncio.Task | None = None
+        self._fold_gen = 0                      # reset_history() отменяет сводку в полёте
         self._rebuild_system()
-        print("    ✓ OpenAI подключён")
 
     def _rebuild_system(self):
+        import commands
+        self._system_key = (getattr(_cfg, "ACTIVE_LANGUAGE", "ru"), commands._cmd_version)
         system_msg = {"role": "system", "content": build_system_prompt(COMMANDS)}
         if self.history and self._role(self.history[0]) == "system":
             self.history[0] = system_msg
         else:
             self.history.insert(0, system_msg)
 
+    def _sync_system(self):
+        """Пересобирает системный промпт, только если сменился язык или набор команд."""
+        import commands
+        if self._system_key != (getattr(_cfg, "ACTIVE_LANGUAGE", "ru"), commands._cmd_version):
+            self._rebuild_system()
+
     # ── Helpers ───────────────────────────────────────────────────────────────
 
     @staticmethod
@@ -38,103 +338,480 @@ class Brain:
         tc = msg.get("tool_calls") if isinstance(msg, dict) else getattr(msg, "tool_calls", None)
         return bool(tc)
 
-    # ── Основной метод ────────────────────────────────────────────────────────
+    @staticmethod
+    def _content(msg) -> str:
+        content = msg.get("content") if isinstance(msg, dict) else getattr(msg, "content", None)
+        return content or ""
 
-    def think(self, user_message: str) -> str:
-        self.history.append({"role": "user", "content": user_message})
+    @classmethod
+    def _tool_call_list(cls, msg) -> list[dict]:
+        tcs = msg.get("tool_calls") if isinstance(msg, dict) else getattr(msg, "tool_calls", None)
+        return [tc if isinstance(tc, dict) else tc.model_dump() for tc in tcs or []]
 
+    @classmethod
+    def _message_tokens(cls, msg) -> int:
+        text = cls._content(msg)
+        for tc in cls._tool_call_list(msg):
+            text += tc["function"]["name"] + tc["function"]["arguments"]
+        return estimate_tokens(text) + MSG_OVERHEAD_TOKENS
+
+    def _messages(self) -> list:
+        """История для запроса: системный промпт, сводка (если есть), окно ходов."""
+        if not self._summary:
+            return list(self.history)
+        note = (
+            "Summary of the earlier conversation: "
+            if getattr(_cfg, "ACTIVE_LANGUAGE", "ru") == "en"
+            else "Краткое содержание предыдущего разговора: "
+        )
+        return self.history[:1] + [{"role": "system", "content": note + self._summary}] + self.history[1:]
+
+    # ── Инструменты ───────────────────────────────────────────────────────────
+
+    def _tools_for(self, user_message: str) -> list[dict]:
+        """Схема для первого запроса: только подходящие команды (ai/tool_retriever.py)."""
+        if not getattr(_cfg, "TOOL_RETRIEVAL_ENABLED", True):
+            return build_tools_schema()
         try:
-            response = self.client.chat.completions.create(
-                model=GPT_MODEL,
-                messages=self.history,
-                tools=build_tools_schema(),
-                tool_choice="auto",
-                max_tokens=500,
-                temperature=GPT_TEMPERATURE,
+            names = get_tool_retriever().select(
+                user_message, recent=tuple(self._recent_tools), previous=self._last_tools,
             )
+        except Exception as e:
+            print(f"  [!] Отбор инструментов: {e}")
+            names = None
+        self._last_tools = names
+        return build_tools_schema(names)
 
-            msg = response.choices[0].message
-            finish_reason = response.choices[0].finish_reason
+    async def _run_tool_calls(self, tool_calls: list[dict]) -> list[str]:
+        """
+        Выполняет вызовы в пуле потоков (независимые — параллельно, с дедлайнами
+        команд, см. commands.execute_commands) и добавляет ответы с matching
+        tool_call_id в историю — в том же порядке, что и tool_calls.
+        Возвращает результаты команд в том же порядке.
+        """
+        calls = []
+        for tool_call in tool_calls:
+            cmd_name = tool_call["function"]["name"]
+            cmd_args = json.loads(tool_call["function"]["arguments"] or "{}")
+            print(f"  [CMD] {cmd_name} {cmd_args}")
+            calls.append((cmd_name, cmd_args))
+            self._note_recent(cmd_name)
+        results = await asyncio.to_thread(execute_commands, calls)
+        self._append_tool_results(tool_calls, results)
+        return results
 
-            # ── GPT вызывает инструменты ──────────────────────────────────────
-            if finish_reason == "tool_calls" and msg.tool_calls:
-                # Сохраняем сообщение ассистента со ВСЕМИ tool_calls
-                self.history.append(msg)
-
-                # Выполняем КАЖДЫЙ вызов и добавляем ответ с matching tool_call_id
-                for tool_call in msg.tool_calls:
-                    cmd_name = tool_call.function.name
-                    cmd_args = json.loads(tool_call.function.arguments or "{}")
-                    print(f"  [CMD] {cmd_name} {cmd_args}")
-                    cmd_result = execute_command(cmd_name, cmd_args)
-                    self.history.append({
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "content": cmd_result,
-                    })
-
-                # Второй запрос — финальный ответ пользователю
-                # Строим копию истории с усиленным языковым правилом
-                lang_note = (
-                    "\n\nCRITICAL: Your reply MUST be in English only."
-                    if getattr(_cfg, "ACTIVE_LANGUAGE", "ru") == "en"
-                    else "\n\nВАЖНО: Отвечай ТОЛЬКО на русском языке."
-                )
-                final_msgs = list(self.history)
-                if final_msgs and self._role(final_msgs[0]) == "system":
-                    sys0 = final_msgs[0]
-                    old_content = sys0["content"] if isinstance(sys0, dict) else sys0.content
-                    final_msgs = [{"role": "system", "content": old_content + lang_note}] + final_msgs[1:]
-
-                final = self.client.chat.completions.create(
-                    model=GPT_MODEL,
-                    messages=final_msgs,
-                    max_tokens=200,
-                    temperature=0.7,
+    def _note_recent(self, cmd_name: str) -> None:
+        if cmd_name in self._recent_tools:
+            self._recent_tools.remove(cmd_name)
+        self._recent_tools.append(cmd_name)
+
+    def _append_tool_results(self, tool_calls: list[dict], results: list[str]) -> None:
+        for tool_call, cmd_result in zip(tool_calls, results):
+            self.history.append({
+                "role": "tool",
+                "tool_call_id": tool_call["id"],
+                "content": cmd_result,
+            })
+
+    @staticmethod
+    def _direct_answer(tool_calls: list[dict], results: list[str]) -> str | None:
+        """
+        Готовый ответ без второго запроса к модели — когда каждый результат
+        можно озвучить как есть: поле speak структурированного результата или
+        текст команды с DIRECT_RESPONSE. Ошибки, таймауты и ответ не на языке
+        интерфейса отдаём модели.
+        """
+        parts = []
+        for tool_call, result in zip(tool_calls, results):
+            speak = _structured_speak(result)
+            if speak is None:
+                meta = COMMANDS.get(tool_call["function"]["name"])
+                if not (meta and meta.get("direct")) or result.startswith("{"):
+                    return None
+                speak = result.strip()
+            if not speak or speak.startswith(_ERROR_PREFIXES) or not _in_active_language(speak):
+                return None
+            parts.append(speak)
+        return " ".join(parts) or None
+
+    async def _fast_path(self, user_message: str) -> tuple[str | None, tuple | None]:
+        """
+        Команда без GPT, если реплика распознана локально: (ответ, None).
+        Результат озвучивается по тем же правилам, что и после вызова
+        моделью (_direct_answer); не прошёл — (None, (tool_calls, results)):
+        команда уже выполнена, фразу по её результату строит модель.
+        Реплика не распознана — (None, None).
+        """
+        if not getattr(_cfg, "FAST_PATH_ENABLED", True):
+            return None, None
+        # Без API быстрый путь — единственный, поэтому порог ниже
+        min_conf = DEGRADED_MIN_CONF if get_latency_router().degraded else None
+        try:
+            handled = await asyncio.to_thread(get_intent_router().handle, user_message, min_conf)
+        except Exception as e:
+            print(f"  [!] Быстрый путь: {e}")
+            return None, None
+        if handled is None:
+            return None, None
+        intent, result = handled
+        tool_call = {
+            "id":       f"fast_{int(time.time() * 1000)}",
+            "type":     "function",
+            "function": {
+                "name":      intent["command"],
+                "arguments": json.dumps(intent["args"], ensure_ascii=False),
+            },
+        }
+        answer = self._direct_answer([tool_call], [result])
+        if answer is None:
+            return None, ([tool_call], [result])
+        # В истории — как обычный обмен репликами, чтобы GPT видел контекст дальше
+        self.history.append({"role": "user", "content": user_message})
+        self.history.append({"role": "assistant", "content": answer})
+        self._trim_history()
+        return answer, None
+
+    async def _cached_answer(self, user_message: str) -> str | None:
+        """
+        Ответ из кэша ответов (ai/response_cache.py) или None. Модель хода
+        выбирается позже, поэтому подходит запись любой из настроенных.
+        """
+        if not getattr(_cfg, "RESPONSE_CACHE_ENABLED", True):
+            return None
+        lang   = getattr(_cfg, "ACTIVE_LANGUAGE", "ru")
+        models = tuple(dict.fromkeys((GPT_MODEL, getattr(_cfg, "GPT_FAST_MODEL", "") or GPT_MODEL)))
+        try:
+            answer = await asyncio.to_thread(get_response_cache().get, user_message, lang, models)
+        except Exception as e:
+            print(f"  [!] Кэш ответов: {e}")
+            return None
+        if answer is None:
+            return None
+        self.history.append({"role": "user", "content": user_message})
+        self.history.append({"role": "assistant", "content": answer})
+        self._trim_history()
+        return answer
+
+    def _remember(self, user_message: str, answer: str, tool_calls: list[dict], model: str) -> None:
+        """
+        Кладёт ответ в кэш в фоне; кэш сам решит, можно ли (команды, реплика).
+        model — та, что ответила (router.choose_model), не обязательно GPT_MODEL.
+        """
+        if not getattr(_cfg, "RESPONSE_CACHE_ENABLED", True):
+            return
+        lang  = getattr(_cfg, "ACTIVE_LANGUAGE", "ru")
+        names = [tc["function"]["name"] for tc in tool_calls]
+        asyncio.get_running_loop().run_in_executor(
+            None, get_response_cache().put, user_message, answer, lang, model, names,
+        )
+
+    def _final_messages(self) -> list:
+        """
+        История + языковое правило последним сообщением — для ответа после
+        инструментов. Системный промпт не трогаем: иначе ломается общий
+        с первым запросом префикс и кэш промпта у провайдера.
+        """
+        lang_note = (
+            "CRITICAL: Your reply MUST be in English only."
+            if getattr(_cfg, "ACTIVE_LANGUAGE", "ru") == "en"
+            else "ВАЖНО: Отвечай ТОЛЬКО на русском языке."
+        )
+        return self._messages() + [{"role": "system", "content": lang_note}]
+
+    # ── Учёт токенов ──────────────────────────────────────────────────────────
+
+    def _log_usage(self, usage) -> None:
+        """prompt_tokens и cached_tokens из ответа API — видно, работает ли кэш префикса."""
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached  = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+        prompt  = usage.prompt_tokens or 0
+        self._usage["requests"] += 1
+        self._usage["prompt_tokens"] += prompt
+        self._usage["cached_tokens"] += cached
+        try:
+            print(f"  [GPT] prompt {prompt} tok, из кэша {cached} ({cached * 100 // max(prompt, 1)}%)")
+        except Exception:
+            pass
+
+    def get_usage_stats(self) -> dict:
+        u = self._usage
+        return {
+            **u,
+            "cached_ratio": round(u["cached_tokens"] / u["prompt_tokens"], 3) if u["prompt_tokens"] else 0.0,
+        }
+
+    # ── Основной метод ────────────────────────────────────────────────────────
+
+    async def think(self, user_message: str) -> str:
+        sentences = [s async for s in self.think_stream(user_message)]
+        # last_answer — текст целиком, с переводами строк; при ошибке его нет
+        return self.last_answer or " ".join(sentences)
+
+    async def think_stream(self, user_message: str) -> AsyncIterator[str]:
+        """
+        Ответ предложениями по мере генерации. Оба запроса (с инструментами
+        и финальный) идут со stream=True: текст первого запроса стримится
+        сразу, если модель отвечает без команд. История обновляется, когда
+        генератор дочитан до конца или отменён.
+        """
+        async with self._turn_lock:
+            self.last_answer = ""
+            async for sentence in self._turn(user_message):
+                yield sentence
+
+    async def _turn(self, user_message: str) -> AsyncIterator[str]:
+        answer, executed = await self._fast_path(user_message)
+        if answer is None and executed is None:
+            answer = await self._cached_answer(user_message)
+        if answer is not None:
+            self.last_answer = answer
+            for sentence in iter_sentences([answer]):
+                yield sentence
+            return
+
+        router = get_latency_router()
+        if not router.allow_request():
+            # API недавно не отвечал — не ждём таймаута на каждой реплике.
+            # Команда быстрого пути уже выполнена — сырой результат не озвучиваем
+            key = "offline_done" if executed else "offline"
+            self.last_answer = get_lang().get(key, "Нет связи с сервером.")
+            if executed:
+                self.history.append({"role": "user", "content": user_message})
+                self.history.append({"role": "assistant", "content": self.last_answer})
+                self._trim_history()
+            yield self.last_answer
+            return
+        turn = self._model_turn(user_message, router, executed)
+        try:
+            async for sentence in turn:
+                yield sentence
+        finally:
+            # Закрываем сразу, а не при сборке мусора: при стоп-слове ход
+            # сохраняет сказанное в истории
+            await turn.aclose()
+            # Пробу полуоткрытого предохранителя закрывает open_stream; если ход
+            # упал до запроса (промпт, схема инструментов), она осталась бы
+            # занятой — и все следующие ходы получали бы «нет связи»
+            router.release_probe()
+
+    async def _model_turn(self, user_message: str, router, executed: tuple | None = None) -> AsyncIterator[str]:
+        """
+        Ход через модель: запрос с инструментами, команды, финальный ответ.
+        executed — (tool_calls, results) команды, которую быстрый путь уже
+        выполнил: первый запрос пропускается, модель только формулирует ответ.
+        """
+        model = router.choose_model(user_message, GPT_MODEL)
+        parts: list[str] = []
+
+        async def _collect(deltas: AsyncIterable[str]) -> AsyncIterator[str]:
+            async for d in deltas:
+                parts.append(d)
+                yield d
+
+        self._sync_system()
+        self.history.append({"role": "user", "content": user_message})
+        turn_start = time.monotonic()
+        try:
+            tool_calls: list[dict] = list(executed[0]) if executed else []
+            if executed:
+                # Команда быстрого пути — в недавних, чтобы её схема была в запросе
+                self._note_recent(tool_calls[0]["function"]["name"])
+            tools = self._tools_for(user_message)
+            if not executed:
+                _touch()
+                stream = await router.open_stream(
+                    self.client,
+                    model,
+                    messages=self._messages(),
+                    tools=tools,
+                    tool_choice="auto",
+                    max_tokens=500,
+                    temperature=GPT_TEMPERATURE,
+                    stream=True,
+                    stream_options={"include_usage": True},
                 )
-                answer = final.choices[0].message.content or ""
-                answer = answer.strip()
-                # Сохраняем финальный ответ в историю
-                self.history.append({"role": "assistant", "content": answer})
+                async with stream:
+                    async for sentence in aiter_sentences(_collect(self._stream_deltas(stream, tool_calls))):
+                        yield sentence
 
-            # ── Обычный текстовый ответ ───────────────────────────────────────
-            else:
-                answer = (msg.content or "").strip()
-                if not answer:
-                    answer = get_lang().get("not_understood", "Не понял, повторите.")
-                self.history.append({"role": "assistant", "content": answer})
+            # ── GPT вызывает инструменты ──────────────────────────────────────
+            if tool_calls:
+                self.history.append({
+                    "role":       "assistant",
+                    "content":    "".join(parts) or None,
+                    "tool_calls": tool_calls,
+                })
+                parts.clear()
+                tools_start = time.monotonic()
+                if executed:
+                    results = list(executed[1])
+                    self._append_tool_results(tool_calls, results)
+                else:
+                    results = await self._run_tool_calls(tool_calls)
+                tools_sec = time.monotonic() - tools_start
 
+                direct = self._direct_answer(tool_calls, results)
+                if direct is not None:
+                    parts.append(direct)
+                    for sentence in iter_sentences([direct]):
+                        yield sentence
+                else:
+                    _touch()
+                    stream = await router.open_stream(
+                        self.client,
+                        model,
+                        messages=self._final_messages(),
+                        tools=tools,
+                        tool_choice="none",
+                        max_tokens=200,
+                        temperature=0.7,
+                        stream=True,
+                        stream_options={"include_usage": True},
+                    )
+                    async with stream:
+                        async for sentence in aiter_sentences(_collect(self._stream_deltas(stream))):
+                            yield sentence
+                    get_intent_router().record_llm_turn(
+                        (time.monotonic() - turn_start - tools_sec) * 1000
+                    )
+
+            answer = "".join(parts).strip()
+            if not answer:
+                answer = get_lang().get("not_understood", "Не понял, повторите.")
+                yield answer
+            else:
+                self._remember(user_message, answer, tool_calls, model)
+            self.history.append({"role": "assistant", "content": answer})
+            self.last_answer = answer
             self._trim_history()
-            return answer
+
+        except (asyncio.CancelledError, GeneratorExit):
+            # Стоп-слово: сказанное до обрыва остаётся в истории
+            self._drop_broken_tail()
+            if parts:
+                self.history.append({"role": "assistant", "content": "".join(parts).strip()})
+            raise
 
         except Exception as e:
             print(f"  [!] Ошибка OpenAI: {e}")
             self._drop_broken_tail()
-            return "Произошла ошибка при обращении к серверу."
+            if parts:
+                # Оборвалось посреди ответа — сказанное сохраняем, чтобы история не разошлась
+                self.history.append({"role": "assistant", "content": "".join(parts).strip()})
+            else:
+                yield "Произошла ошибка при обращении к серверу."
+
+    async def _stream_deltas(self, stream, tool_calls: list[dict] | None = None) -> AsyncIterator[str]:
+        """
+        Текстовые дельты стрима; фрагменты tool_calls собираются в tool_calls
+        (по index). Последний чанк без choices несёт usage — в _log_usage.
+        """
+        by_index: dict[int, dict] = {}
+        async for chunk in stream:
+            if getattr(chunk, "usage", None):
+                self._log_usage(chunk.usage)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            for tc in getattr(delta, "tool_calls", None) or []:
+                slot = by_index.setdefault(tc.index, {
+                    "id": "", "type": "function", "function": {"name": "", "arguments": ""},
+                })
+                if tc.id:
+                    slot["id"] = tc.id
+                if tc.function and tc.function.name:
+                    slot["function"]["name"] += tc.function.name
+                if tc.function and tc.function.arguments:
+                    slot["function"]["arguments"] += tc.function.arguments
+            if delta.content:
+                yield delta.content
+        if tool_calls is not None:
+            tool_calls.extend(by_index[i] for i in sorted(by_index))
 
     # ── Обрезка истории ───────────────────────────────────────────────────────
 
-    def _trim_history(self, keep: int = 20) -> None:
-        """Обрезает историю до keep сообщений, не разрывая tool_calls-цепочки."""
-        if len(self.history) <= keep + 1:  # +1 — system
+    def _trim_history(self) -> None:
+        """
+        Держит окно истории в HISTORY_TOKEN_BUDGET. Срез — только по началу
+        хода (сообщение user), tool_calls-цепочки не разрываются; последний
+        ход остаётся целиком, даже если он один больше бюджета. Выпавшие
+        ходы сворачиваются в сводку в фоне (_fold_async).
+        """
+        budget = getattr(_cfg, "HISTORY_TOKEN_BUDGET", HISTORY_TOKEN_BUDGET)
+        body   = self.history[1:]
+        tokens = [self._message_tokens(m) for m in body]
+        if sum(tokens) <= budget:
             return
 
-        system = self.history[0]
-        tail = self.history[-keep:]
+        starts = [i for i, m in enumerate(body) if i > 0 and self._role(m) == "user"]
+        if not starts:
+            return
+        cut = starts[-1]
+        for i in starts:
+            if sum(tokens[i:]) <= budget:
+                cut = i
+                break
+
+        self.history = self.history[:1] + body[cut:]
+        self._fold_async(body[:cut])
 
-        # Ищем первую безопасную точку среза: сообщение user или
-        # assistant без tool_calls (начало чистого диалогового хода)
-        for i, m in enumerate(tail):
+    # ── Сводка ────────────────────────────────────────────────────────────────
+
+    def _fold_async(self, dropped: list) -> None:
+        """Ставит выпавшие ходы в очередь сводки; задача запускается, если не идёт."""
+        self._fold_pending.extend(dropped)
+        if self._fold_task is None or self._fold_task.done():
+            self._fold_task = asyncio.get_running_loop().create_task(self._fold_worker())
+
+    async def _fold_worker(self) -> None:
+        while self._fold_pending:
+            batch, self._fold_pending = self._fold_pending, []
+            gen = self._fold_gen
+            try:
+                summary = await self._summarize(self._summary, batch)
+                if gen == self._fold_gen:
+                    self._summary = summary
+            except Exception as e:
+                # Не вышло — ходы потеряны для сводки, но диалог продолжается
+                try:
+                    print(f"  [!] Сводка истории: {e}")
+                except Exception:
+                    pass
+
+    def _transcript(self, messages: list) -> str:
+        lines = []
+        for m in messages:
             role = self._role(m)
             if role == "user":
-                self.history = [system] + tail[i:]
-                return
-            if role == "assistant" and not self._has_tool_calls(m):
-                self.history = [system] + tail[i:]
-                return
+                lines.append(f"Пользователь: {self._content(m)}")
+            elif role == "assistant":
+                for tc in self._tool_call_list(m):
+                    lines.append(f"[команда {tc['function']['name']} {tc['function']['arguments']}]")
+                if self._content(m):
+                    lines.append(f"Jarvis: {self._content(m)}")
+            elif role == "tool":
+                lines.append(f"[результат: {self._content(m)[:FOLD_RESULT_CHARS]}]")
+        return "\n".join(lines)
 
-        # Крайний случай: оставляем как есть
-        self.history = [system] + tail
+    async def _summarize(self, summary: str, messages: list) -> str:
+        """Старая сводка + выпавшие ходы → новая сводка (отдельный запрос к модели)."""
+        prompt = (
+            "Обнови краткую сводку разговора голосового ассистента с пользователем. "
+            "Сохрани факты, имена, найденные файлы, открытые приложения и незакрытые "
+            "просьбы; без вступлений, не длиннее 5 предложений, на языке разговора.\n\n"
+            f"Текущая сводка: {summary or '(пусто)'}\n\n"
+            f"Новые реплики:\n{self._transcript(messages)}"
+        )
+        _touch()
+        response = await self.client.chat.completions.create(
+            model=GPT_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=SUMMARY_MAX_TOKENS,
+            temperature=0.2,
+        )
+        return (response.choices[0].message.content or summary).strip()
 
     def _drop_broken_tail(self) -> None:
         """Удаляет из хвоста истории оборванные tool_calls без ответов."""
@@ -148,9 +825,107 @@ class Brain:
 
     # ── Прочее ───────────────────────────────────────────────────────────────
 
+    async def reset_history(self):
+        async with self._turn_lock:
+            self.history = []
+            self._recent_tools.clear()
+            self._fold_pending = []
+            self._fold_gen += 1
+            self._summary = ""
+            self._rebuild_system()
+
+    async def refresh_language(self):
+        async with self._turn_lock:
+            self._rebuild_system()
+
+
+# ── Brain — синхронная обёртка ────────────────────────────────────────────────
+
+class Brain:
+    """
+    AsyncBrain для синхронного кода: корутины уходят в get_loop(), вызывающий
+    поток ждёт результат. think_stream() тянет предложения по одному — TTS
+    получает их так же, как раньше. cancel() обрывает текущие ходы.
+    """
+
+    def __init__(self):
+        self._loop     = get_loop()
+        self._async    = self._call(self._create())
+        self._inflight: set[concurrent.futures.Future] = set()
+        self._lock     = threading.Lock()
+        self._cancel_gen = 0
+        print("    ✓ OpenAI подключён")
+
+    @staticmethod
+    async def _create() -> AsyncBrain:
+        # asyncio.Lock и задачи AsyncBrain — в его собственном loop
+        return AsyncBrain()
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _submit(self, coro) -> concurrent.futures.Future:
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        with self._lock:
+            self._inflight.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future: concurrent.futures.Future) -> None:
+        with self._lock:
+            self._inflight.discard(future)
+
+    @property
+    def history(self) -> list:
+        return self._async.history
+
+    # ── Ходы ──────────────────────────────────────────────────────────────────
+
+    def think(self, user_message: str) -> str:
+        try:
+            return self.think_future(user_message).result()
+        except concurrent.futures.CancelledError:
+            return ""
+
+    def think_future(self, user_message: str) -> concurrent.futures.Future:
+        """think() без блокировки — для asyncio.wrap_future в FastAPI."""
+        return self._submit(self._async.think(user_message))
+
+    def think_stream(self, user_message: str) -> Iterator[str]:
+        agen = self._async.think_stream(user_message)
+        gen  = self._cancel_gen
+        try:
+            while gen == self._cancel_gen:
+                try:
+                    sentence = self._submit(_anext(agen)).result()
+                except concurrent.futures.CancelledError:
+                    return
+                if sentence is None:
+                    return
+                yield sentence
+        finally:
+            # Брошенный или отменённый стрим: AsyncBrain дописывает историю и закрывает ответ
+            asyncio.run_coroutine_threadsafe(_aclose(agen), self._loop)
+
+    def cancel(self) -> None:
+        """Стоп-слово: обрывает генерацию ответа и запросы к модели в полёте."""
+        self._cancel_gen += 1
+        with self._lock:
+            futures = list(self._inflight)
+        for future in futures:
+            future.cancel()
+
+    # ── Прочее ───────────────────────────────────────────────────────────────
+
+    def get_usage_stats(self) -> dict:
+        return self._async.get_usage_stats()
+
     def reset_history(self):
-        self.history = []
-        self._rebuild_system()
+        self._call(self._async.reset_history())
+
+    def reset_history_future(self) -> concurrent.futures.Future:
+        """reset_history() без блокировки: сброс ждёт конца текущего хода (_turn_lock)."""
+        return asyncio.run_coroutine_threadsafe(self._async.reset_history(), self._loop)
 
     def refresh_language(self):
-        self._rebuild_system()
\ No newline at end of file
+        self._call(self._async.refresh_language())
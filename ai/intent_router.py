@@ -0,0 +1,307 @@
+"""
+intent_router.py — быстрый путь: частые команды без запроса к GPT.
+
+«громкость 50», «заблокируй компьютер», «следующая вкладка», «открой первый»
+распознаются локально и выполняются через execute_command напрямую —
+без двух round trip'ов к модели (~1–2 с на голосовую команду).
+
+Источники шаблонов — метаданные команд, перестраиваются при hot-reload:
+  • INTENT_PATTERNS  — [(regex, {фикс. аргументы})], именованные группы — слоты,
+                       значения приводятся по типу из PARAMETERS
+  • DESCRIPTION      — фразы после «RU triggers:» / «EN triggers:»; только для
+                       команд без параметров (аргументы из фразы не извлечь)
+                       и без собственных INTENT_PATTERNS
+
+Совпадение шаблона целиком — уверенность 1.0; фраза-триггер допускает опечатки
+распознавания речи (difflib, то же число слов) — кроме команд с DESTRUCTIVE:
+для необратимых действий только точное совпадение. Ниже FAST_PATH_MIN_CONF,
+при двух равноценных командах или отрицании («не блокируй») — обычный путь
+через GPT.
+"""
+
+import difflib
+import re
+import threading
+import time
+
+# ── Константы ─────────────────────────────────────────────────────────────────
+
+MAX_WORDS      = 8       # длиннее — почти наверняка не простая команда
+AMBIGUITY_GAP  = 0.05    # две команды ближе этого по уверенности — решает GPT
+DEFAULT_CONF   = 0.9     # если в config нет FAST_PATH_MIN_CONF
+
+_TRIGGERS_RE = re.compile(r"\b(?:RU|EN) triggers:\s*(.+?)(?:\.\s|\.?$)", re.IGNORECASE)
+_PUNCT_RE    = re.compile(r"[^\w%\s]+")
+_PERCENT_RE  = re.compile(r"(\d)%")
+
+_FILLERS_HEAD = ("джарвис", "jarvis", "эй", "hey", "ну", "окей", "ok", "okay",
+                 "пожалуйста", "please", "можешь", "can you", "could you")
+_FILLERS_TAIL = ("пожалуйста", "please", "джарвис", "jarvis")
+_NEGATIONS    = {"не", "нет", "not", "dont", "don", "no", "never"}
+
+# Числительные для слотов integer («открой второй», «open the last one»).
+# Только целые словоформы: по префиксу «семинар», «вторник» и «девятку»
+# тоже оказались бы номерами результата.
+_NUMBER_WORDS = {
+    "one": 1, "first": 1, "two": 2, "second": 2, "three": 3, "third": 3,
+    "four": 4, "fourth": 4, "five": 5, "fifth": 5, "six": 6, "sixth": 6,
+    "seven": 7, "seventh": 7, "eight": 8, "eighth": 8, "nine": 9, "ninth": 9,
+    "ten": 10, "tenth": 10, "last": -1,
+    "один": 1, "одна": 1, "одну": 1, "два": 2, "две": 2, "три": 3, "четыре": 4,
+    "пять": 5, "шесть": 6, "семь": 7, "восемь": 8, "девять": 9, "десять": 10,
+}
+_ORDINAL_STEMS_RU = (
+    ("перв", 1), ("втор", 2), ("четверт", 4), ("пят", 5), ("шест", 6),
+    ("седьм", 7), ("восьм", 8), ("девят", 9), ("десят", 10), ("максимальн", -1),
+)
+_HARD_ENDINGS = ("ый", "ой", "ая", "ое", "ую", "ого", "ому", "ом", "ым", "ые", "ых")
+_SOFT_ENDINGS = ("ий", "яя", "ее", "юю", "его", "ему", "ем", "ей", "им", "ие", "их")
+_NUMBER_WORDS.update({stem + end: n for stem, n in _ORDINAL_STEMS_RU for end in _HARD_ENDINGS})
+_NUMBER_WORDS.update({"последн" + end: -1 for end in _SOFT_ENDINGS})
+_NUMBER_WORDS.update({
+    "трет" + end: 3
+    for end in ("ий", "ья", "ье", "ью", "ьего", "ьему", "ьем", "ьей", "ьим", "ьи", "ьих")
+})
+
+
+# ── Нормализация и слоты ──────────────────────────────────────────────────────
+
+def normalize(text: str) -> str:
+    """Нижний регистр, ё→е, без пунктуации и слов-паразитов по краям."""
+    text = text.lower().replace("ё", "е")
+    text = _PERCENT_RE.sub(r"\1 %", text)
+    text = " ".join(_PUNCT_RE.sub(" ", text).split())
+    changed = True
+    while changed and text:
+        changed = False
+        for f in _FILLERS_HEAD:
+            if text == f or text.startswith(f + " "):
+                text, changed = text[len(f):].strip(), True
+        for f in _FILLERS_TAIL:
+            if text.endswith(" " + f):
+                text, changed = text[:-len(f)].strip(), True
+    return text
+
+
+def _to_int(value: str) -> int | None:
+    if value.isdigit():
+        return int(value)
+    return _NUMBER_WORDS.get(value)
+
+
+def _convert_slot(value: str, schema: dict):
+    """Значение слота по JSON Schema параметра; None — не подходит."""
+    kind = schema.get("type", "string")
+    if kind == "integer":
+        return _to_int(value)
+    if kind == "number":
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    if "enum" in schema and value not in schema["enum"]:
+        return None
+    return value
+
+
+def parse_triggers(description: str) -> list[str]:
+    """Фразы из «RU triggers: a, b, c. EN triggers: …», нормализованные."""
+    phrases = []
+    for m in _TRIGGERS_RE.finditer(description):
+        for raw in m.group(1).split(","):
+            phrase = normalize(raw.strip(" '\"«»"))
+            if phrase:
+                phrases.append(phrase)
+    return phrases
+
+
+# ── IntentRouter ──────────────────────────────────────────────────────────────
+
+class IntentRouter:
+    """
+    Сопоставляет реплику с командой. Индекс шаблонов строится из COMMANDS
+    и пересобирается, когда меняется версия команд (hot-reload).
+    """
+
+    def __init__(self):
+        self._lock      = threading.Lock()
+        self._version   = -1
+        self._patterns: list[tuple[str, re.Pattern, dict]] = []   # (команда, regex, фикс. args)
+        self._triggers: dict[str, str] = {}                        # фраза → команда
+        self._params:   dict[str, dict] = {}
+        self._required: dict[str, list] = {}
+        self._exact_only: set[str] = set()                         # DESTRUCTIVE: без difflib
+        self._stats = {
+            "requests":       0,
+            "hits":           0,
+            "match_ms_total": 0.0,
+            "llm_turns":      0,
+            "llm_ms_total":   0.0,
+            "by_command":     {},
+        }
+
+    # ── Индекс ────────────────────────────────────────────────────────────────
+
+    def _ensure_index(self):
+        import commands
+        if self._version == commands._cmd_version:
+            return
+        with commands._lock:
+            version = commands._cmd_version
+            snapshot = {name: dict(meta) for name, meta in commands.COMMANDS.items()}
+
+        patterns, triggers, ambiguous = [], {}, set()
+        for name, meta in snapshot.items():
+            for item in meta.get("intents") or []:
+                regex, fixed = item if isinstance(item, tuple) else (item, {})
+                try:
+                    patterns.append((name, re.compile(regex), dict(fixed)))
+                except re.error as e:
+                    try:
+                        print(f"    [intent] {name}: плохой шаблон {regex!r}: {e}")
+                    except Exception:
+                        pass
+            if meta.get("parameters") or meta.get("intents"):
+                # Свои шаблоны у команды важнее фраз из описания
+                continue
+            for phrase in parse_triggers(meta.get("description", "")):
+                if triggers.get(phrase, name) != name:
+                    ambiguous.add(phrase)
+                triggers[phrase] = name
+        for phrase in ambiguous:
+            del triggers[phrase]
+
+        self._patterns = patterns
+        self._triggers = triggers
+        self._params   = {n: m.get("parameters", {}) for n, m in snapshot.items()}
+        self._required = {n: m.get("required", []) for n, m in snapshot.items()}
+        self._exact_only = {n for n, m in snapshot.items() if m.get("destructive")}
+        self._version  = version
+
+    # ── Сопоставление ─────────────────────────────────────────────────────────
+
+    def match(self, text: str, min_conf: float | None = None) -> dict | None:
+        """
+        {"command", "args", "confidence", "source": "pattern"|"trigger"} или None.
+        None — когда нет уверенного и однозначного кандидата. min_conf —
+        порог вместо FAST_PATH_MIN_CONF (локальный режим без API).
+        """
+        norm = normalize(text)
+        words = norm.split()
+        if not words or len(words) > MAX_WORDS or _NEGATIONS.intersection(words):
+            return None
+
+        with self._lock:
+            self._ensure_index()
+            best: dict[str, dict] = {}
+
+            for name, regex, fixed in self._patterns:
+                m = regex.fullmatch(norm)
+                if not m:
+                    continue
+                args = dict(fixed)
+                ok = True
+                for slot, value in m.groupdict().items():
+                    if value is None:
+                        continue
+                    converted = _convert_slot(value, self._params.get(name, {}).get(slot, {}))
+                    if converted is None:
+                        ok = False
+                        break
+                    args[slot] = converted
+                if ok and all(r in args for r in self._required.get(name, [])):
+                    best.setdefault(name, {"command": name, "args": args,
+                                           "confidence": 1.0, "source": "pattern"})
+
+            if norm in self._triggers:
+                name = self._triggers[norm]
+                best.setdefault(name, {"command": name, "args": {},
+                                       "confidence": 1.0, "source": "trigger"})
+            elif not best:
+                for phrase, name in self._triggers.items():
+                    if name in self._exact_only or len(phrase.split()) != len(words):
+                        continue
+                    ratio = difflib.SequenceMatcher(None, norm, phrase).ratio()
+                    if ratio > best.get(name, {}).get("confidence", 0.0):
+                        best[name] = {"command": name, "args": {},
+                                      "confidence": round(ratio, 3), "source": "trigger"}
+
+        if not best:
+            return None
+        ranked = sorted(best.values(), key=lambda c: c["confidence"], reverse=True)
+        import config
+        if min_conf is None:
+            min_conf = getattr(config, "FAST_PATH_MIN_CONF", DEFAULT_CONF)
+        if ranked[0]["confidence"] < min_conf:
+            return None
+        if len(ranked) > 1 and ranked[0]["confidence"] - ranked[1]["confidence"] < AMBIGUITY_GAP:
+            return None
+        return ranked[0]
+
+    def handle(self, text: str, min_conf: float | None = None) -> tuple[dict, str] | None:
+        """
+        Выполняет команду, если реплика распознана: (intent из match, результат
+        команды); иначе None (→ GPT). Можно ли озвучить результат как есть,
+        решает вызывающий (Brain._direct_answer).
+        """
+        start = time.monotonic()
+        intent = self.match(text, min_conf)
+        match_ms = (time.monotonic() - start) * 1000
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["match_ms_total"] += match_ms
+            if intent:
+                self._stats["hits"] += 1
+                by_cmd = self._stats["by_command"]
+                by_cmd[intent["command"]] = by_cmd.get(intent["command"], 0) + 1
+        if intent is None:
+            return None
+
+        # Через execute_commands: дедлайн команды и очерёдность её GROUP те же, что у GPT
+        from commands import execute_commands
+        try:
+            print(f"  [FAST] {intent['command']} {intent['args']} "
+                  f"({intent['source']}, {intent['confidence']:.2f}, {match_ms:.1f} мс)")
+        except Exception:
+            pass
+        return intent, execute_commands([(intent["command"], intent["args"])])[0]
+
+    # ── Статистика ────────────────────────────────────────────────────────────
+
+    def record_llm_turn(self, ms: float):
+        """Время двух запросов к GPT в ходе с инструментами — то, что экономит быстрый путь."""
+        with self._lock:
+            self._stats["llm_turns"] += 1
+            self._stats["llm_ms_total"] += ms
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            by_command = dict(s["by_command"])
+        requests  = s["requests"]
+        hits      = s["hits"]
+        llm_avg   = s["llm_ms_total"] / s["llm_turns"] if s["llm_turns"] else 0.0
+        match_avg = s["match_ms_total"] / requests if requests else 0.0
+        return {
+            "requests":        requests,
+            "hits":            hits,
+            "hit_rate":        round(hits / requests, 3) if requests else 0.0,
+            "match_ms_avg":    round(match_avg, 2),
+            "llm_turn_ms_avg": round(llm_avg, 1),
+            # Время выполнения самой команды одинаково на обоих путях — не считаем
+            "saved_ms_total":  round(max(0.0, llm_avg - match_avg) * hits),
+            "by_command":      by_command,
+        }
+
+
+_router: IntentRouter | None = None
+_router_lock = threading.Lock()
+
+
+def get_intent_router() -> IntentRouter:
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = IntentRouter()
+    return _router
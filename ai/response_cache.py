@@ -0,0 +1,276 @@
+"""
+response_cache.py — кэш ответов на повторяющиеся вопросы.
+
+«что ты умеешь», «сколько у меня документов» — каждый день те же вопросы и
+каждый раз новый запрос к модели с тем же ответом. Кэш отдаёт готовый ответ
+без сети, а озвучка его предложений лежит в кэше TTS (speech/TTS/audio_cache.py) —
+такой ход почти мгновенный.
+
+  • ключ — нормализованная реплика (intent_router.normalize) + язык + модель,
+    которая ответила (GPT_MODEL или выбранная роутером GPT_FAST_MODEL)
+  • запись живёт RESPONSE_CACHE_TTL_SEC; ход с командами кэшируется, только
+    если каждая вызванная команда объявила CACHE_TTL (нет побочных эффектов),
+    и живёт не дольше самого короткого из них
+  • реплики-продолжения («а второй?», «ещё», «open it») не кэшируются —
+    их ответ зависит от предыдущего хода
+  • второй уровень (RESPONSE_CACHE_SEMANTIC): близость эмбеддингов реплик
+    не ниже SEMANTIC_MIN_SIM; на промахе — запрос эмбеддинга к API
+  • записи в SQLite рядом с модулем — переживают перезапуск
+"""
+
+import collections
+import pathlib
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+# ── Константы ─────────────────────────────────────────────────────────────────
+
+DB_PATH          = pathlib.Path(__file__).parent / "response_cache.db"
+TTL_SEC          = 12 * 3600   # если в config нет RESPONSE_CACHE_TTL_SEC
+MAX_ENTRIES      = 500         # LRU: больше записей не держим
+MIN_WORDS        = 2           # одно слово — чаще всего продолжение («ещё», «второй»)
+SEMANTIC_MIN_SIM = 0.93        # косинус для совпадения «по смыслу»
+EMBED_MEMO_SIZE  = 32          # эмбеддинги последних реплик: get и put считают один раз
+
+# Слова, по которым видно, что реплика опирается на предыдущий ход
+_CONTEXT_WORDS = {
+    "он", "она", "оно", "они", "его", "ее", "их", "ему", "ей", "им", "нем", "ней",
+    "это", "этот", "эта", "эти", "этого", "этой", "тот", "та", "те", "того",
+    "там", "туда", "тоже", "еще", "снова", "опять", "дальше", "следующий",
+    "следующие", "предыдущий", "такой", "такие",
+    "it", "its", "that", "this", "those", "these", "them", "they", "he", "she",
+    "him", "her", "there", "again", "more", "another", "next", "previous",
+    "else", "too", "also", "one",
+}
+
+
+def _vec_to_blob(vec: np.ndarray | None) -> bytes | None:
+    return vec.astype(np.float32).tobytes() if vec is not None else None
+
+
+def _blob_to_vec(blob: bytes | None) -> np.ndarray | None:
+    return np.frombuffer(blob, dtype=np.float32).copy() if blob else None
+
+
+# ── ResponseCache ─────────────────────────────────────────────────────────────
+
+class ResponseCache:
+    """
+    Записи — в памяти (LRU) и в SQLite (write-through). Потокобезопасен;
+    get/put с включённым семантическим уровнем ходят в сеть — звать не
+    из event loop.
+    """
+
+    def __init__(self, db_path: pathlib.Path | str = DB_PATH, max_entries: int = MAX_ENTRIES):
+        self._max      = max_entries
+        self._lock     = threading.Lock()
+        self._entries: collections.OrderedDict[str, dict] = collections.OrderedDict()
+        self._memo:    collections.OrderedDict[str, np.ndarray] = collections.OrderedDict()
+        self._stats    = {"lookups": 0, "hits": 0, "semantic_hits": 0, "stores": 0, "bypassed": 0}
+        self._conn     = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, lang TEXT, model TEXT, utterance TEXT,"
+            " answer TEXT, embedding BLOB, expires REAL)"
+        )
+        self._load()
+
+    def _load(self):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE expires <= ?", (now,))
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT key, lang, model, utterance, answer, embedding, expires "
+                "FROM responses ORDER BY expires DESC LIMIT ?", (self._max,),
+            ).fetchall()
+            for key, lang, model, utterance, answer, blob, expires in reversed(rows):
+                self._entries[key] = {
+                    "lang": lang, "model": model, "utterance": utterance,
+                    "answer": answer, "vec": _blob_to_vec(blob), "expires": expires,
+                }
+
+    # ── Ключ ──────────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        from ai.intent_router import normalize
+        return normalize(text)
+
+    @staticmethod
+    def cacheable_text(norm: str) -> bool:
+        """Самостоятельная реплика: ≥ MIN_WORDS слов и ни одной ссылки на прошлый ход."""
+        from ai.intent_router import _to_int
+        words = norm.split()
+        if len(words) < MIN_WORDS:
+            return False
+        return not any(w in _CONTEXT_WORDS or _to_int(w) is not None for w in words)
+
+    @staticmethod
+    def ttl_for(tool_names: list[str]) -> float | None:
+        """TTL записи для хода с такими командами; None — ход не кэшируется."""
+        import config
+        ttl = float(getattr(config, "RESPONSE_CACHE_TTL_SEC", TTL_SEC))
+        if not tool_names:
+            return ttl
+        from commands import COMMANDS
+        for name in tool_names:
+            meta = COMMANDS.get(name)
+            cmd_ttl = meta.get("cache_ttl", 0.0) if meta else 0.0
+            if cmd_ttl <= 0:
+                return None
+            ttl = min(ttl, cmd_ttl)
+        return ttl
+
+    # ── Эмбеддинги ────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _semantic_enabled() -> bool:
+        import config
+        return bool(getattr(config, "RESPONSE_CACHE_SEMANTIC", False) and config.OPENAI_API_KEY)
+
+    def _embed(self, norm: str) -> np.ndarray | None:
+        with self._lock:
+            vec = self._memo.get(norm)
+        if vec is not None:
+            return vec
+        try:
+            import config
+            from database.files.embed_client import get_embed_client
+            from database.files.semantic_search import EMBED_MODEL
+            raw = get_embed_client(config.OPENAI_API_KEY, EMBED_MODEL).embed_query(norm)
+        except Exception as e:
+            try:
+                print(f"  [!] Кэш ответов, эмбеддинг: {e}")
+            except Exception:
+                pass
+            return None
+        if not raw:
+            return None
+        vec = np.asarray(raw, dtype=np.float32)
+        vec /= np.linalg.norm(vec) or 1.0
+        with self._lock:
+            self._memo[norm] = vec
+            while len(self._memo) > EMBED_MEMO_SIZE:
+                self._memo.popitem(last=False)
+        return vec
+
+    # ── Публичный API ─────────────────────────────────────────────────────────
+
+    def get(self, text: str, lang: str, model: str | tuple[str, ...]) -> str | None:
+        """
+        Готовый ответ на реплику или None (нет, истёк, реплика не кэшируется).
+        model — модель или несколько: подходит ответ любой из них.
+        """
+        norm = self._normalize(text)
+        if not self.cacheable_text(norm):
+            return None
+        models = (model,) if isinstance(model, str) else tuple(model)
+        now = time.time()
+        with self._lock:
+            self._stats["lookups"] += 1
+            for m in models:
+                key = f"{lang}|{m}|{norm}"
+                entry = self._entries.get(key)
+                if entry is not None and entry["expires"] <= now:
+                    self._drop(key)
+                    self._conn.commit()
+                    entry = None
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._log(f"точное совпадение «{norm}»")
+                    return entry["answer"]
+            candidates = [
+                (k, e) for k, e in self._entries.items()
+                if e["vec"] is not None and e["lang"] == lang and e["model"] in models
+                and e["expires"] > now
+            ]
+
+        if not candidates or not self._semantic_enabled():
+            return None
+        vec = self._embed(norm)
+        if vec is None:
+            return None
+        sims = np.stack([e["vec"] for _, e in candidates]) @ vec
+        best = int(np.argmax(sims))
+        if sims[best] < SEMANTIC_MIN_SIM:
+            return None
+        best_key, entry = candidates[best]
+        with self._lock:
+            if best_key in self._entries:
+                self._entries.move_to_end(best_key)
+            self._stats["hits"] += 1
+            self._stats["semantic_hits"] += 1
+        self._log(f"похоже на «{entry['utterance']}» ({sims[best]:.3f})")
+        return entry["answer"]
+
+    def put(self, text: str, answer: str, lang: str, model: str, tool_names: list[str] = ()) -> bool:
+        """Запоминает ответ, если реплика самостоятельная и команды без побочных эффектов."""
+        norm = self._normalize(text)
+        ttl  = self.ttl_for(list(tool_names))
+        if not answer or ttl is None or not self.cacheable_text(norm):
+            with self._lock:
+                self._stats["bypassed"] += 1
+            return False
+        vec = self._embed(norm) if self._semantic_enabled() else None
+        key = f"{lang}|{model}|{norm}"
+        expires = time.time() + ttl
+        with self._lock:
+            self._entries[key] = {
+                "lang": lang, "model": model, "utterance": norm,
+                "answer": answer, "vec": vec, "expires": expires,
+            }
+            self._entries.move_to_end(key)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, lang, model, utterance, answer, embedding, expires) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, lang, model, norm, answer, _vec_to_blob(vec), expires),
+            )
+            while len(self._entries) > self._max:
+                self._drop(next(iter(self._entries)))
+            self._conn.commit()
+            self._stats["stores"] += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def _drop(self, key: str):
+        """Вызывать под self._lock."""
+        self._entries.pop(key, None)
+        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    @staticmethod
+    def _log(what: str):
+        try:
+            print(f"  [CACHE] ответ из кэша: {what}")
+        except Exception:
+            pass
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["entries"] = len(self._entries)
+        s["hit_rate"] = round(s["hits"] / s["lookups"], 3) if s["lookups"] else 0.0
+        return s
+
+
+_cache: ResponseCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
@@ -0,0 +1,297 @@
+"""
+router.py — выбор модели и защита хода от хвостовых задержек API.
+
+Голосовой ход зависит от самого медленного ответа OpenAI: пара запросов из
+сотни отвечает секундами. LatencyRouter:
+
+  • модель — короткая простая реплика («сколько времени», «открой почту»)
+    уходит самой быстрой модели по наблюдаемому TTFT (GPT_FAST_MODEL, пока
+    замеров мало); остальное — GPT_MODEL
+  • хеджирование — если стрим не дал первого чанка за p90 TTFT этой модели,
+    уходит такой же второй запрос; берётся тот, что ответил первым,
+    второй отменяется
+  • предохранитель — BREAKER_FAILURES неудачных запросов подряд, и Brain
+    на BREAKER_COOLDOWN_SEC переходит в локальный режим: быстрый путь с
+    пониженным порогом, на остальное — фраза «нет связи». Потом один
+    пробный запрос: прошёл — обычный режим
+  • метрики решений — get_stats(), в /status как "router"
+"""
+
+import asyncio
+import collections
+import threading
+import time
+
+# ── Константы ─────────────────────────────────────────────────────────────────
+
+SIMPLE_MAX_WORDS     = 8       # длиннее — не «простая» реплика
+TTFT_WINDOW          = 200     # замеров TTFT на модель
+MIN_SAMPLES          = 10      # меньше — p90 не считаем, берём HEDGE_DEFAULT_SEC
+HEDGE_DEFAULT_SEC    = 2.0
+HEDGE_MIN_SEC        = 0.4     # раньше — дублируем почти каждый запрос
+HEDGE_MAX_SEC        = 4.0
+BREAKER_FAILURES     = 3
+BREAKER_COOLDOWN_SEC = 30.0
+DEGRADED_MIN_CONF    = 0.75    # порог быстрого пути, пока API недоступен
+
+# Реплики, которым нужна «умная» модель, даже если они короткие
+_COMPLEX_MARKERS = (
+    "почему", "объясни", "сравни", "напиши", "придумай", "переведи", "подробно",
+    "why", "explain", "compare", "write", "translate", "summarize", "in detail",
+)
+
+
+def _percentile(values, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+# ── Стрим с первым чанком ─────────────────────────────────────────────────────
+
+class HedgedStream:
+    """
+    Стрим победившего запроса: первый чанк уже прочитан при выборе.
+    Интерфейс как у AsyncStream openai — async for и async with.
+    """
+
+    def __init__(self, stream, iterator, first):
+        self._stream   = stream
+        self._iterator = iterator
+        self._first    = first
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        await self._stream.close()
+
+    async def __aiter__(self):
+        if self._first is not None:
+            yield self._first
+        async for chunk in self._iterator:
+            yield chunk
+
+
+async def _open(client, model: str, kwargs: dict):
+    """Запрос до первого чанка: (stream, итератор, первый чанк, TTFT сек)."""
+    start  = time.monotonic()
+    stream = await client.chat.completions.create(model=model, **kwargs)
+    try:
+        iterator = stream.__aiter__()
+        try:
+            first = await iterator.__anext__()
+        except StopAsyncIteration:
+            first = None
+    except BaseException:
+        await stream.close()
+        raise
+    return stream, iterator, first, time.monotonic() - start
+
+
+# ── LatencyRouter ─────────────────────────────────────────────────────────────
+
+class LatencyRouter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ttft: dict[str, collections.deque] = {}
+        self._models: dict[str, dict] = {}
+        self._failures   = 0
+        self._open_until = 0.0
+        self._probing    = False
+        self._stats = {
+            "routes":         {"simple": 0, "default": 0},
+            "hedges":         0,
+            "hedge_wins":     0,
+            "breaker_trips":  0,
+            "degraded_turns": 0,
+        }
+
+    # ── Выбор модели ──────────────────────────────────────────────────────────
+
+    @staticmethod
+    def is_simple(text: str) -> bool:
+        words = text.lower().split()
+        return len(words) <= SIMPLE_MAX_WORDS and not any(m in text.lower() for m in _COMPLEX_MARKERS)
+
+    def choose_model(self, text: str, default: str) -> str:
+        """default для обычных реплик; для простых — самая быстрая модель по p50 TTFT."""
+        import config
+        fast = getattr(config, "GPT_FAST_MODEL", "") or default
+        simple = self.is_simple(text)
+        with self._lock:
+            self._stats["routes"]["simple" if simple else "default"] += 1
+            if not simple:
+                return default
+            measured = {
+                m: _percentile(self._ttft[m], 50)
+                for m in {default, fast}
+                if len(self._ttft.get(m, ())) >= MIN_SAMPLES
+            }
+        if len(measured) == 2:
+            return min(measured, key=measured.get)
+        return fast
+
+    def hedge_delay(self, model: str) -> float:
+        with self._lock:
+            samples = list(self._ttft.get(model, ()))
+        if len(samples) < MIN_SAMPLES:
+            return HEDGE_DEFAULT_SEC
+        return min(HEDGE_MAX_SEC, max(HEDGE_MIN_SEC, _percentile(samples, 90)))
+
+    # ── Хеджирование ──────────────────────────────────────────────────────────
+
+    async def open_stream(self, client, model: str, **kwargs) -> HedgedStream:
+        """
+        chat.completions.create(stream=True), защищённый от медленного первого
+        токена: за hedge_delay(model) без чанка — дубль запроса, берётся
+        ответивший первым. Исключение — если упали оба (или единственный).
+        """
+        import config
+        delay = self.hedge_delay(model) if getattr(config, "ROUTER_HEDGING", True) else None
+        start = time.monotonic()
+        primary = asyncio.ensure_future(_open(client, model, kwargs))
+        tasks   = {primary}
+        hedge   = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                hedge = asyncio.ensure_future(_open(client, model, kwargs))
+                tasks.add(hedge)
+                with self._lock:
+                    self._stats["hedges"] += 1
+                try:
+                    print(f"  [ROUTER] нет первого токена за {delay:.2f} с — дублирую запрос")
+                except Exception:
+                    pass
+            winner, error = None, None
+            while tasks and winner is None:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = winner or task
+                    else:
+                        error = error or task.exception()
+            if winner is None:
+                raise error
+        except asyncio.CancelledError:
+            for task in (primary, hedge):
+                if task is not None:
+                    task.cancel()
+            self.release_probe()
+            raise
+        except Exception:
+            self._record(model, ok=False)
+            raise
+
+        for task in tasks:
+            task.cancel()
+        for task in (primary, hedge):
+            # Проигравший тоже мог успеть открыть стрим — закрываем соединение
+            if task is not None and task is not winner and task.done() \
+                    and not task.cancelled() and task.exception() is None:
+                await task.result()[0].close()
+
+        stream, iterator, first, ttft = winner.result()
+        self._record(model, ok=True, ttft=ttft)
+        if winner is hedge:
+            with self._lock:
+                self._stats["hedge_wins"] += 1
+                # Основной запрос не ответил и за это время — иначе p90 занижается
+                self._ttft[model].append(time.monotonic() - start)
+        return HedgedStream(stream, iterator, first)
+
+    # ── Предохранитель ────────────────────────────────────────────────────────
+
+    def allow_request(self) -> bool:
+        """False — API считается недоступным, ход обслуживается локально."""
+        with self._lock:
+            if not self._open_until:
+                return True
+            if time.monotonic() >= self._open_until and not self._probing:
+                self._probing = True      # полуоткрыт: один пробный запрос
+                return True
+            self._stats["degraded_turns"] += 1
+            return False
+
+    @property
+    def degraded(self) -> bool:
+        with self._lock:
+            return bool(self._open_until) and not self._probing
+
+    def release_probe(self):
+        """Снимает пробу полуоткрытого предохранителя, если ход ушёл без запроса."""
+        with self._lock:
+            self._probing = False
+
+    def _record(self, model: str, ok: bool, ttft: float | None = None):
+        with self._lock:
+            m = self._models.setdefault(model, {"requests": 0, "failures": 0})
+            m["requests"] += 1
+            if ok:
+                if ttft is not None:
+                    self._ttft.setdefault(model, collections.deque(maxlen=TTFT_WINDOW)).append(ttft)
+                if self._open_until:
+                    self._log("API снова отвечает — обычный режим")
+                self._failures, self._open_until, self._probing = 0, 0.0, False
+                return
+            m["failures"] += 1
+            self._failures += 1
+            if self._probing or self._failures >= BREAKER_FAILURES:
+                if not self._open_until or self._probing:
+                    self._stats["breaker_trips"] += 1
+                    self._log(f"API недоступен — локальный режим на {BREAKER_COOLDOWN_SEC:.0f} с")
+                self._open_until = time.monotonic() + BREAKER_COOLDOWN_SEC
+                self._probing = False
+
+    @staticmethod
+    def _log(what: str):
+        try:
+            print(f"  [ROUTER] {what}")
+        except Exception:
+            pass
+
+    # ── Статистика ────────────────────────────────────────────────────────────
+
+    def get_stats(self) -> dict:
+        import config
+        with self._lock:
+            if not self._open_until:
+                breaker = "closed"
+            elif self._probing or time.monotonic() >= self._open_until:
+                breaker = "half_open"
+            else:
+                breaker = "open"
+            models = {}
+            for name, m in self._models.items():
+                samples = list(self._ttft.get(name, ()))
+                models[name] = {
+                    **m,
+                    "ttft_ms_p50": round(_percentile(samples, 50) * 1000) if samples else None,
+                    "ttft_ms_p90": round(_percentile(samples, 90) * 1000) if samples else None,
+                }
+            stats = {**self._stats, "routes": dict(self._stats["routes"])}
+        for name in models:
+            models[name]["hedge_delay_ms"] = round(self.hedge_delay(name) * 1000)
+        return {
+            "hedging":  getattr(config, "ROUTER_HEDGING", True),
+            "breaker":  breaker,
+            "failures": self._failures,
+            **stats,
+            "models":   models,
+        }
+
+
+_router: LatencyRouter | None = None
+_router_lock = threading.Lock()
+
+
+def get_latency_router() -> LatencyRouter:
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = LatencyRouter()
+    return _router
@@ -0,0 +1,137 @@
+"""
+tool_retriever.py — какие инструменты отправлять модели на конкретную реплику.
+
+Полная схема — ~55 команд, у search_by_name одно описание на 1.5k символов:
+тысячи токенов промпта на каждый ход, а время до первого токена растёт
+вместе с ними. Ретривер выбирает top-N команд по реплике:
+
+  • локальный BM25 по метаданным (имя, DESCRIPTION с триггерами, описания
+    и enum параметров) — тот же RU/EN стеммер, что у полнотекстового поиска
+    файлов; без сети, доли миллисекунды
+  • всегда: CORE_TOOLS — продолжения диалога («открой второй», «ещё»)
+  • всегда: команды, вызванные в последних ходах (уточнения к ним)
+  • ни одного совпадения по словам — полная схема: незнакомая просьба,
+    пусть модель выбирает из всего
+
+Набор отдаётся в порядке схемы (по имени) и «залипает»: если лучшие
+STICKY_TOP команд уже есть в наборе прошлого хода, он повторяется как есть —
+одинаковая схема подряд = общий префикс и кэш промпта у провайдера.
+
+Индекс пересобирается при hot-reload команд (по версии, как build_tools_schema).
+Замер: python -m bench.tool_retrieval
+"""
+
+import math
+import threading
+
+# ── Константы ─────────────────────────────────────────────────────────────────
+
+TOP_N       = 10
+STICKY_TOP  = 3        # столько лучших команд должно быть в прошлом наборе, чтобы его повторить
+CORE_TOOLS  = ("open_file_result", "next_search_results", "search_by_name", "open_app")
+NAME_WEIGHT = 3        # слова из COMMAND_NAME весомее слов из описания
+BM25_K1     = 1.2
+BM25_B      = 0.75
+
+
+def _command_text(name: str, meta: dict) -> list[str]:
+    from database.files.fulltext import tokenize
+    parts = [meta.get("description", "")]
+    for param, schema in (meta.get("parameters") or {}).items():
+        parts.append(param.replace("_", " "))
+        parts.append(str(schema.get("description", "")))
+        parts.extend(str(v) for v in schema.get("enum", []))
+    return tokenize(name.replace("_", " ")) * NAME_WEIGHT + tokenize(" ".join(parts))
+
+
+# ── ToolRetriever ─────────────────────────────────────────────────────────────
+
+class ToolRetriever:
+    def __init__(self, top_n: int = TOP_N, core: tuple[str, ...] = CORE_TOOLS):
+        self.top_n     = top_n
+        self.core      = core
+        self._lock     = threading.Lock()
+        self._version  = -1
+        self._docs:  dict[str, dict[str, int]] = {}   # команда → частоты стемов
+        self._lens:  dict[str, int] = {}
+        self._idf:   dict[str, float] = {}
+        self._avgdl  = 1.0
+
+    def _ensure_index(self):
+        import commands
+        if self._version == commands._cmd_version:
+            return
+        with commands._lock:
+            version  = commands._cmd_version
+            snapshot = {name: dict(meta) for name, meta in commands.COMMANDS.items()}
+
+        docs, lens, df = {}, {}, {}
+        for name, meta in snapshot.items():
+            tf: dict[str, int] = {}
+            tokens = _command_text(name, meta)
+            for t in tokens:
+                tf[t] = tf.get(t, 0) + 1
+            for t in tf:
+                df[t] = df.get(t, 0) + 1
+            docs[name], lens[name] = tf, len(tokens)
+
+        n = len(docs) or 1
+        self._docs  = docs
+        self._lens  = lens
+        self._idf   = {t: math.log(1 + (n - d + 0.5) / (d + 0.5)) for t, d in df.items()}
+        self._avgdl = sum(lens.values()) / n if lens else 1.0
+        self._version = version
+
+    def rank(self, text: str) -> list[tuple[str, float]]:
+        """Все команды с score > 0, лучшие первыми."""
+        from database.files.fulltext import tokenize
+        terms = set(tokenize(text))
+        with self._lock:
+            self._ensure_index()
+            scores = []
+            for name, tf in self._docs.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lens[name] / self._avgdl)
+                score = sum(
+                    self._idf[t] * tf[t] * (BM25_K1 + 1) / (tf[t] + norm)
+                    for t in terms if t in tf
+                )
+                if score > 0:
+                    scores.append((name, score))
+        scores.sort(key=lambda s: s[1], reverse=True)
+        return scores
+
+    def select(
+        self,
+        text:     str,
+        recent:   tuple[str, ...] | list[str] = (),
+        previous: list[str] | None = None,
+    ) -> list[str] | None:
+        """
+        Имена команд для схемы (отсортированы); None — отправить полную схему
+        (в реплике нет ни одного слова из метаданных команд). previous —
+        набор прошлого хода: повторяется, если покрывает лучшие команды.
+        """
+        ranked = self.rank(text)
+        if not ranked:
+            return None
+        if previous and {name for name, _ in ranked[:STICKY_TOP]} <= set(previous):
+            return previous
+        chosen = {name for name, _ in ranked[:self.top_n]}
+        with self._lock:
+            known = self._docs
+            chosen.update(name for name in (*self.core, *recent) if name in known)
+        return sorted(chosen)
+
+
+_retriever: ToolRetriever | None = None
+_retriever_lock = threading.Lock()
+
+
+def get_tool_retriever() -> ToolRetriever:
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                import config
+                _retriever = ToolRetriever(top_n=getattr(config, "TOOL_RETRIEVAL_TOP_N", TOP_N))
+    return _retriever
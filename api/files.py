@@ -61,67 +61,103 @@ async def files_search(
     size_filter: str = "",
     drive: str = "",
     semantic: bool = False,
+    content_mode: str = "auto",
     limit: int = 20,
     offset: int = 0,
+    cursor: str = "",
 ):
-    """Поиск файлов по имени или содержимому (semantic=true)."""
-    if not any([q, category, extension, date_filter, size_filter, drive]):
-        raise HTTPException(400, "Укажи хотя бы один параметр поиска")
-
-    drive_norm = drive.upper().strip(": \\") if drive else ""
-    loop       = asyncio.get_event_loop()
-
-    # ── Параллельный запуск семантики и поиска по имени ──────────────────────
-    # Раньше шло последовательно: semantic (~1-2с на embedding) → name search.
-    # Теперь оба запускаются одновременно — суммарное время = max, не sum.
-    name_task = loop.run_in_executor(
-        None,
-        lambda: _indexer().search(
-            query=q,
-            category=category,
-            extension=extension,
-            date_filter=date_filter,
-            size_filter=size_filter,
-            drive=drive_norm,
-            limit=limit,
-            offset=offset,
-        ),
-    )
+    """
+    Поиск файлов по имени или содержимому (semantic=true).
+    content_mode: auto | semantic | fulltext | hybrid — движок поиска по содержимому;
+    auto без API-ключа работает офлайн через полнотекстовый индекс.
+    С semantic=true имя и содержимое ищутся параллельно (у каждого свой дедлайн)
+    и сливаются через RRF — см. database/files/hybrid_search.py.
+
+    Поиск открывает серверную сессию: в ответе next_cursor, следующая страница —
+    GET /files/search?cursor=... (остальные параметры не нужны), без повторного
+    поиска. Истёкший курсор → 410, клиент повторяет поиск с offset.
+    """
+    from database.files.search_session import open_search, resume
 
-    sem_task = None
-    if semantic and q:
-        import config
-        api_key = getattr(config, "OPENAI_API_KEY", "")
-        if not api_key:
-            raise HTTPException(400, "OpenAI API ключ не задан — семантический поиск недоступен")
-        from database.files.semantic_search import get_semantic_indexer
-        sem_task = loop.run_in_executor(
-            None,
-            lambda: get_semantic_indexer().search(
-                query=q, api_key=api_key, limit=limit, category=category,
-            ),
+    loop = asyncio.get_event_loop()
+    if cursor:
+        page = await loop.run_in_executor(None, lambda: resume(cursor))
+        if page is None:
+            raise HTTPException(410, "Сессия поиска истекла — повторите поиск")
+    else:
+        params = _search_params(q, category, extension, date_filter, size_filter,
+                                drive, semantic, content_mode, limit, offset)
+        page = await loop.run_in_executor(
+            None, lambda: open_search(params, limit=max(1, limit), offset=max(0, offset))
         )
 
-    results: list = []
-    seen:    set  = set()
+    response = {
+        "results":     page["results"],
+        "total":       len(page["results"]),
+        "offset":      page["offset"],
+        "limit":       page["limit"],
+        "semantic":    bool(page["params"].get("content")),
+        "has_more":    page["has_more"],
+        "next_cursor": page["next_cursor"],
+    }
+    if "engines" in page:
+        response["engines"] = page["engines"]
+    return response
+
+
+@router.get("/search/stream")
+async def files_search_stream(
+    q: str = "",
+    category: str = "",
+    extension: str = "",
+    date_filter: str = "",
+    size_filter: str = "",
+    drive: str = "",
+    content_mode: str = "auto",
+    limit: int = 20,
+    offset: int = 0,
+):
+    """
+    Гибридный поиск с потоковой выдачей (NDJSON): строка на событие —
+    сначала результаты по имени, затем по содержимому, в конце слитый список
+    ({"type": "final", ...}). UI может рисовать первые совпадения сразу.
+    """
+    from fastapi.responses import StreamingResponse
+    from database.files.hybrid_search import iter_hybrid_search
+    import json
+
+    params = _search_params(q, category, extension, date_filter, size_filter,
+                            drive, True, content_mode, limit, offset)
 
-    # Семантика идёт первой в ответе, если включена
-    if sem_task is not None:
-        for r in await sem_task:
-            results.append(r)
-            seen.add(r["path"])
+    def _lines():
+        for event in iter_hybrid_search(**params):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
 
-    for r in await name_task:
-        if r["path"] not in seen:
-            results.append(r)
-            seen.add(r["path"])
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
 
+
+def _search_params(q, category, extension, date_filter, size_filter,
+                   drive, semantic, content_mode, limit, offset) -> dict:
+    """Общая валидация параметров /search и /search/stream."""
+    if not any([q, category, extension, date_filter, size_filter, drive]):
+        raise HTTPException(400, "Укажи хотя бы один параметр поиска")
+    if content_mode not in ("auto", "semantic", "fulltext", "hybrid"):
+        raise HTTPException(400, "content_mode: auto, semantic, fulltext или hybrid")
+    if semantic and content_mode == "semantic":
+        import config
+        if not getattr(config, "OPENAI_API_KEY", ""):
+            raise HTTPException(400, "OpenAI API ключ не задан — семантический поиск недоступен")
     return {
-        "results":  results[:limit],
-        "total":    len(results),
-        "offset":   offset,
-        "limit":    limit,
-        "semantic": semantic,
+        "query":        q,
+        "category":     category,
+        "extension":    extension,
+        "date_filter":  date_filter,
+        "size_filter":  size_filter,
+        "drive":        drive.upper().strip(": \\") if drive else "",
+        "limit":        limit,
+        "offset":       offset,
+        "content":      semantic,
+        "content_mode": content_mode,
     }
 
 
@@ -216,9 +252,8 @@ async def semantic_status():
 async def semantic_rebuild():
     """Запустить переиндексацию семантического индекса в фоне."""
     import config
+    # Без ключа перестраивается только полнотекстовый индекс
     api_key = getattr(config, "OPENAI_API_KEY", "")
-    if not api_key:
-        raise HTTPException(400, "OpenAI API ключ не задан")
 
     from database.files.semantic_search import get_semantic_indexer, ALL_SUPPORTED
     from services.events import emit
@@ -241,4 +276,17 @@ async def semantic_rebuild():
             emit({"type": "semantic_index_error", "error": str(e)})
 
     threading.Thread(target=_bg, daemon=True, name="semantic-rebuild").start()
-    return {"ok": True, "message": "Семантическая переиндексация запущена"}
\ No newline at end of file
+    return {
+        "ok": True,
+        "message": (
+            "Семантическая переиндексация запущена" if api_key else
+            "API ключ не задан — перестраивается только полнотекстовый индекс"
+        ),
+    }
+
+@router.post("/semantic/maintenance")
+async def semantic_maintenance():
+    """Внеочередное обслуживание semantic.db: сироты, VACUUM, индексы. Возвращает отчёт."""
+    from database.files.semantic_search import get_semantic_indexer
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, get_semantic_indexer().run_maintenance)
@@ -148,6 +148,9 @@ def _preload_models():
     try:
         from database.files.file_indexer import get_indexer
         get_indexer()
+        # Семантический индекс: при создании поднимает кэш эмбеддингов запросов
+        from database.files.semantic_search import get_semantic_indexer
+        get_semantic_indexer()
         _logger.info(_lm("indexer_ok"))
     except Exception as e:
         _logger.warning(_lm("indexer_fail", e))
@@ -243,7 +246,9 @@ _brain_lock = threading.Lock()
 def get_brain() -> Brain:
     global _brain
     if _brain is None:
-        _brain = Brain()
+        with _brain_lock:
+            if _brain is None:
+                _brain = Brain()
     return _brain
 
 
@@ -273,15 +278,43 @@ class VoiceRunner:
 
     def stop(self):
         self._stop.set()
+        _brain_module.stop_keep_warm()
         _State.is_running = False
         _State.set_status("idle")
 
+    @staticmethod
+    def _respond(text: str, stt, tts, brain) -> str:
+        """
+        GPT → TTS потоком: первое предложение звучит, пока модель пишет
+        остальные. voice_busy держится только на время генерации — /chat
+        не ждёт, пока договорит голос. Стоп-слово обрывает и генерацию.
+        """
+        from speech.STT.wake_word import StopListener
+
+        def _generate():
+            _State.voice_busy = True
+            try:
+                yield from brain.think_stream(text)
+            finally:
+                _State.voice_busy = False
+
+        def _on_sentence(sentence: str):
+            if _State.status != "speaking":
+                _State.set_status("speaking")
+            _State.emit({"type": "response_partial", "text": sentence})
+
+        with StopListener(stt, tts, on_stop=brain.cancel):
+            response = tts.speak_stream(_generate(), on_sentence=_on_sentence)
+        _State.add_message("assistant", response)
+        _State.emit({"type": "response", "text": response})
+        return response
+
     def _run(self):
         try:
             import speech.STT.stt as _stt_mod
             from speech.STT.stt import get_stt
             from speech.STT.recorder import Recorder
-            from speech.STT.wake_word import wait_for_wake_word, StopListener
+            from speech.STT.wake_word import wait_for_wake_word
             from utils.ramdisk import setup_vosk_ramdisk
 
             _stt_mod.VOSK_MODEL_PATH = setup_vosk_ramdisk(_stt_mod.VOSK_MODEL_PATH)
@@ -291,6 +324,7 @@ class VoiceRunner:
             recorder.calibrate()
             tts      = get_tts()
             brain    = get_brain()
+            _brain_module.start_keep_warm()
 
             tts.speak(get_lang()["ready"])
 
@@ -330,20 +364,9 @@ class VoiceRunner:
                         _State.set_status("idle")
                         continue
 
-                    # Шаг 3: GPT → TTS
-                    _State.voice_busy = True
-                    try:
-                        with _brain_lock:
-                            response = brain.think(text)
-                    finally:
-                        _State.voice_busy = False
-
+                    # Шаг 3: GPT → TTS (потоком, по предложениям)
+                    response = self._respond(text, stt, tts, brain)
                     _logger.info(_lm("voice_jarvis", response))
-                    _State.add_message("assistant", response)
-                    _State.emit({"type": "response", "text": response})
-                    _State.set_status("speaking")
-                    with StopListener(stt, tts):
-                        tts.speak(response)
 
                     # Шаг 4: Followup
                     # Пауза 0.6с — даём эху TTS затухнуть, иначе микрофон
@@ -374,18 +397,7 @@ class VoiceRunner:
                                 continue
 
                         _State.set_status("thinking")
-                        _State.voice_busy = True
-                        try:
-                            with _brain_lock:
-                                response = brain.think(text)
-                        finally:
-                            _State.voice_busy = False
-
-                        _State.add_message("assistant", response)
-                        _State.emit({"type": "response", "text": response})
-                        _State.set_status("speaking")
-                        with StopListener(stt, tts):
-                            tts.speak(response)
+                        self._respond(text, stt, tts, brain)
 
                         followup_end = time.time() + _State.followup_seconds
 
@@ -407,6 +419,7 @@ class VoiceRunner:
         except Exception as e:
             _logger.error(_lm("voice_error", e))
             _State.emit({"type": "error", "message": str(e)})
+            _brain_module.stop_keep_warm()
             _State.is_running = False
             _State.set_status("idle")
 
@@ -435,12 +448,40 @@ async def websocket_endpoint(ws: WebSocket):
 @app.get("/status")
 async def get_status():
     return {
-        "status":       _State.status,
-        "is_running":   _State.is_running,
-        "language":     config.ACTIVE_LANGUAGE,
-        "wake_word":    config.WAKE_WORD,
-        "mic_index":    _State.active_mic_index,
-        "openai_ready": bool(config.OPENAI_API_KEY),
+        "status":         _State.status,
+        "is_running":     _State.is_running,
+        "language":       config.ACTIVE_LANGUAGE,
+        "wake_word":      config.WAKE_WORD,
+        "mic_index":      _State.active_mic_index,
+        "openai_ready":   bool(config.OPENAI_API_KEY),
+        "fast_path":      _fast_path_stats(),
+        "response_cache": _response_cache_stats(),
+        "router":         _router_stats(),
+        # Доля токенов промпта из кэша провайдера (None — Brain ещё не создан)
+        "prompt_cache":   _brain.get_usage_stats() if _brain is not None else None,
+    }
+
+
+def _fast_path_stats() -> dict:
+    """Доля команд, выполненных без GPT, и сэкономленное время (ai/intent_router.py)."""
+    from ai.intent_router import get_intent_router
+    return {"enabled": getattr(config, "FAST_PATH_ENABLED", True), **get_intent_router().get_stats()}
+
+
+def _router_stats() -> dict:
+    """Выбор модели, дубли запросов и состояние предохранителя (ai/router.py)."""
+    from ai.router import get_latency_router
+    return get_latency_router().get_stats()
+
+
+def _response_cache_stats() -> dict:
+    """Попадания в кэш ответов (ai/response_cache.py) и кэш озвучки на диске."""
+    from ai.response_cache import get_response_cache
+    from speech.TTS.audio_cache import get_audio_cache
+    return {
+        "enabled": getattr(config, "RESPONSE_CACHE_ENABLED", True),
+        **get_response_cache().get_stats(),
+        "audio":   get_audio_cache().get_stats(),
     }
 
 
@@ -485,7 +526,15 @@ async def chat(req: ChatRequest):
 
     loop = asyncio.get_event_loop()
     try:
-        response = await loop.run_in_executor(None, lambda: _chat_sync(req.text, req.speak))
+        # Ход идёт в event loop Brain — поток пула на ожидание ответа не занимаем
+        brain = await loop.run_in_executor(None, get_brain)
+        response = await asyncio.wrap_future(brain.think_future(req.text))
+        _logger.info(_lm("chat_user", req.text))
+        _logger.info(_lm("chat_jarvis", response))
+        _State.add_message("user", req.text)
+        _State.add_message("assistant", response)
+        if req.speak:
+            await loop.run_in_executor(None, lambda: get_tts().speak(response))
         _State.set_status("idle")
         return {"response": response}
     except Exception as e:
@@ -493,18 +542,6 @@ async def chat(req: ChatRequest):
         raise HTTPException(500, str(e))
 
 
-def _chat_sync(text: str, speak: bool) -> str:
-    with _brain_lock:
-        response = get_brain().think(text)
-    _logger.info(_lm("chat_user", text))
-    _logger.info(_lm("chat_jarvis", response))
-    _State.add_message("user", text)
-    _State.add_message("assistant", response)
-    if speak:
-        get_tts().speak(response)
-    return response
-
-
 # ── POST /chat/reset ──────────────────────────────────────────────────────────
 
 @app.get("/chat/history")
@@ -522,8 +559,9 @@ async def delete_chat_message(index: int):
 
 @app.post("/chat/reset")
 async def reset_chat():
-    with _brain_lock:
-        get_brain().reset_history()
+    # Сброс ждёт конца хода, который сейчас озвучивается, — event loop не держим
+    brain = await asyncio.get_event_loop().run_in_executor(None, get_brain)
+    await asyncio.wrap_future(brain.reset_history_future())
     _State.chat_history.clear()
     return {"ok": True}
 
@@ -573,8 +611,9 @@ async def update_settings(body: SettingsUpdate):
         if body.language not in LANGUAGE_PROFILES:
             raise HTTPException(400, f"Неизвестный язык: {body.language}")
         set_language(body.language)
-        with _brain_lock:
-            get_brain().reset_history()   # сбрасываем историю — старые сообщения на другом языке путают GPT
+        # Сбрасываем историю — старые сообщения на другом языке путают GPT
+        brain = await asyncio.get_event_loop().run_in_executor(None, get_brain)
+        await asyncio.wrap_future(brain.reset_history_future())
         _State.chat_history.clear()
 
     if body.gpt_model is not None:
@@ -0,0 +1,177 @@
+"""
+bench/embed_server.py — локальная заглушка OpenAI Embeddings API.
+
+Нужна чтобы мерить пропускную способность индексации офлайн и без трат:
+детерминированные векторы (одинаковый текст → одинаковый вектор),
+имитация задержки сети и лимитов аккаунта (429 + заголовки x-ratelimit-*).
+
+Запуск:  python -m bench.embed_server --port 8765 --rpm 600 --tpm 200000
+Клиент:  OPENAI_EMBED_BASE_URL=http://127.0.0.1:8765/v1
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_DIM = 1536
+
+
+def fake_vector(text: str, dim: int = DEFAULT_DIM) -> list[float]:
+    """Детерминированный псевдослучайный вектор по тексту."""
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+    rnd  = random.Random(seed)
+    return [rnd.uniform(-1.0, 1.0) for _ in range(dim)]
+
+
+class _Window:
+    """Лимит «N в минуту» скользящим окном — как у реального API."""
+
+    def __init__(self, per_minute: int):
+        self.limit  = per_minute
+        self._hits: list[tuple[float, int]] = []
+        self._lock  = threading.Lock()
+
+    def take(self, amount: int) -> tuple[bool, int, float]:
+        """(разрешено, остаток, через сколько сек освободится место)."""
+        now = time.monotonic()
+        with self._lock:
+            self._hits = [(t, n) for t, n in self._hits if now - t < 60.0]
+            used = sum(n for _, n in self._hits)
+            if self.limit and used + amount > self.limit:
+                reset = 60.0 - (now - self._hits[0][0]) if self._hits else 1.0
+                return False, max(0, self.limit - used), max(0.05, reset)
+            self._hits.append((now, amount))
+            return True, max(0, self.limit - used - amount), 0.0
+
+
+class EmbedServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, dim: int = DEFAULT_DIM,
+                 latency_ms: float = 80.0, per_1k_tokens_ms: float = 5.0,
+                 rpm: int = 0, tpm: int = 0):
+        self.dim              = dim
+        self.latency_ms       = latency_ms
+        self.per_1k_tokens_ms = per_1k_tokens_ms
+        self.requests         = _Window(rpm)
+        self.tokens           = _Window(tpm)
+        self.stats = {"requests": 0, "inputs": 0, "rate_limited": 0}
+        self._stats_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "EmbedServer":
+        threading.Thread(target=self._httpd.serve_forever, daemon=True,
+                         name="embed-stub").start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def _make_handler(self):
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive — как у api.openai.com
+
+            def log_message(self, *_):
+                pass
+
+            def _send(self, code: int, body: dict, headers: dict):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length  = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/embeddings"):
+                    self._send(404, {"error": {"message": "not found"}}, {})
+                    return
+
+                inputs = payload.get("input", [])
+                if isinstance(inputs, str):
+                    inputs = [inputs]
+                n_tokens = sum(len(t) // 3 + 1 for t in inputs)
+
+                ok_r, left_r, reset_r = server.requests.take(1)
+                ok_t, left_t, reset_t = (server.tokens.take(n_tokens) if ok_r
+                                         else (False, 0, reset_r))
+                limit_headers = {
+                    "x-ratelimit-limit-requests":     str(server.requests.limit),
+                    "x-ratelimit-limit-tokens":       str(server.tokens.limit),
+                    "x-ratelimit-remaining-requests": str(left_r),
+                    "x-ratelimit-remaining-tokens":   str(left_t),
+                    "x-ratelimit-reset-requests":     f"{reset_r:.3f}s",
+                    "x-ratelimit-reset-tokens":       f"{reset_t:.3f}s",
+                } if (server.requests.limit or server.tokens.limit) else {}
+
+                if not (ok_r and ok_t):
+                    with server._stats_lock:
+                        server.stats["rate_limited"] += 1
+                    wait_ms = int(max(reset_r, reset_t) * 1000)
+                    self._send(429, {"error": {"message": "Rate limit reached",
+                                               "type": "requests", "code": "rate_limit_exceeded"}},
+                               {**limit_headers, "retry-after-ms": str(wait_ms)})
+                    return
+
+                time.sleep((server.latency_ms + server.per_1k_tokens_ms * n_tokens / 1000) / 1000)
+
+                as_b64 = payload.get("encoding_format") == "base64"
+                data = []
+                for i, text in enumerate(inputs):
+                    vec = fake_vector(text, server.dim)
+                    emb = (base64.b64encode(struct.pack(f"<{len(vec)}f", *vec)).decode("ascii")
+                           if as_b64 else vec)
+                    data.append({"object": "embedding", "index": i, "embedding": emb})
+                with server._stats_lock:
+                    server.stats["requests"] += 1
+                    server.stats["inputs"]   += len(inputs)
+                self._send(200, {
+                    "object": "list",
+                    "data":   data,
+                    "model":  payload.get("model", "stub"),
+                    "usage":  {"prompt_tokens": n_tokens, "total_tokens": n_tokens},
+                }, limit_headers)
+
+        return _Handler
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Локальная заглушка /v1/embeddings")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    ap.add_argument("--latency-ms", type=float, default=80.0)
+    ap.add_argument("--rpm", type=int, default=0, help="0 = без лимита")
+    ap.add_argument("--tpm", type=int, default=0, help="0 = без лимита")
+    args = ap.parse_args()
+    srv = EmbedServer(args.host, args.port, args.dim, args.latency_ms,
+                      rpm=args.rpm, tpm=args.tpm)
+    print(f"Embedding stub: {srv.base_url}")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+bench/embed_throughput.py — пропускная способность embed_client на локальной заглушке.
+
+Запуск:  python -m bench.embed_throughput --docs 5000 --concurrency 1 2 4 8
+Печатает JSON: документов/сек, запросов, 429, итоговый размер батча.
+"""
+
+import argparse
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.embed_server import EmbedServer
+from database.files.embed_client import EmbeddingClient
+
+_WORDS = ("отчёт продажи квартал нейросеть договор диплом глава введение "
+          "report sales invoice network contract thesis chapter summary").split()
+
+
+def _corpus(n: int, seed: int = 42) -> list[str]:
+    rnd = random.Random(seed)
+    return [" ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(50, 600))) for _ in range(n)]
+
+
+def run(docs: int, concurrency: int, rpm: int, tpm: int, latency_ms: float) -> dict:
+    srv = EmbedServer(port=0, dim=64, latency_ms=latency_ms, rpm=rpm, tpm=tpm).start()
+    try:
+        client = EmbeddingClient("local", "stub", base_url=srv.base_url,
+                                 concurrency=concurrency, rpm=rpm or 10**6, tpm=tpm or 10**9)
+        texts = _corpus(docs)
+        t0 = time.perf_counter()
+        # Как build_index: батчи по 100 файлов, EMBED_CONCURRENCY потоков эмбеддинга
+        chunks = [texts[i:i + 100] for i in range(0, len(texts), 100)]
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            assert all(v is not None for v in pool.map(client.embed, chunks))
+        elapsed = time.perf_counter() - t0
+        stats = client.get_stats()
+        client.close()
+        return {
+            "concurrency":    concurrency,
+            "docs":           docs,
+            "seconds":        round(elapsed, 3),
+            "docs_per_sec":   round(docs / elapsed, 1),
+            "requests":       stats["requests"],
+            "rate_limited":   srv.stats["rate_limited"],
+            "batch_tokens":   stats["batch_tokens"],
+        }
+    finally:
+        srv.stop()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=3000)
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--rpm", type=int, default=0)
+    ap.add_argument("--tpm", type=int, default=0)
+    ap.add_argument("--latency-ms", type=float, default=80.0)
+    args = ap.parse_args()
+    results = [run(args.docs, c, args.rpm, args.tpm, args.latency_ms) for c in args.concurrency]
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
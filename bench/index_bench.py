@@ -0,0 +1,447 @@
+"""
+bench/index_bench.py — воспроизводимый бенчмарк FileIndexer и SemanticIndexer.
+
+Генерирует детерминированное синтетическое дерево (seed → одни и те же имена,
+вложенность, расширения, размеры и даты) во временной папке и меряет:
+  build        — полная сборка files.db и semantic.db (FTS + эмбеддинги)
+  incremental  — _index_path / _remove_file по одному файлу (как watchdog),
+                 пересборка semantic.db после правки части текстов
+  search       — p50/p95/p99 по классам запросов: точное имя, префикс,
+                 подстрока, несколько слов, транслит, опечатка, промах,
+                 фильтры; по содержимому — fulltext, semantic, hybrid
+
+Эмбеддинги — локальная заглушка bench/embed_server.py: сеть и ключ не нужны,
+задержка API задаётся --embed-latency-ms. Векторы заглушки случайные, поэтому
+hit_rate у semantic не показателен — сравниваем только время.
+
+Запуск:  python -m bench.index_bench --files 10000 --out bench_10k.json
+         python -m bench.index_bench --files 1000000 --semantic-docs 20000 --dir D:\\bench
+Печатает JSON; два прогона с одним --seed сравнимы между собой.
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import platform
+import random
+import shutil
+import tempfile
+import time
+
+from bench.embed_server import EmbedServer
+from bench.query_coalescing import _percentile
+
+# ── Словарь корпуса ───────────────────────────────────────────────────────────
+
+_RU_WORDS = (
+    "отчёт продажи квартал договор диплом глава введение заключение смета "
+    "бюджет презентация расписание лекция конспект резюме счёт накладная "
+    "фото отпуск семья дача проект задание курсовая реферат протокол встреча "
+    "план годовой итоговый черновик финал копия скан паспорт справка"
+).split()
+
+_EN_WORDS = (
+    "report sales invoice contract thesis chapter summary budget meeting "
+    "notes draft final backup holiday family project task lecture schedule "
+    "resume scan passport release roadmap design spec review photo video"
+).split()
+
+# Темы текстов: файл пишется словами одной темы — у поиска по содержимому
+# есть что ранжировать
+_TOPICS = (
+    "нейросеть обучение модель данные выборка точность градиент слой",
+    "договор сторона оплата срок поставка штраф акт подписание",
+    "отпуск море билет гостиница маршрут экскурсия пляж виза",
+    "invoice payment amount due tax customer order delivery",
+    "network server latency request cache database index query",
+    "recipe flour sugar oven bake dough butter minutes",
+)
+
+# (расширение, вес) — примерная смесь пользовательской папки
+_EXTENSIONS = (
+    ("jpg", 22), ("png", 6), ("heic", 2), ("pdf", 10), ("docx", 8),
+    ("xlsx", 4), ("pptx", 2), ("txt", 8), ("md", 4), ("csv", 2),
+    ("py", 5), ("js", 3), ("html", 2), ("json", 3), ("mp3", 6),
+    ("mp4", 4), ("mkv", 1), ("zip", 3), ("exe", 1), ("log", 4),
+)
+
+# Расширения, в которые пишем текст (FULL_TEXT семантического индекса)
+_TEXT_EXTS = {"txt", "md", "py", "js", "html", "log"}
+
+_SAMPLE_SIZE = 5000   # сколько имён храним для генерации запросов
+
+
+# ── Генерация дерева ──────────────────────────────────────────────────────────
+
+class Corpus:
+    """Описание сгенерированного дерева: корень, текстовые файлы, выборка имён."""
+
+    def __init__(self, root: pathlib.Path):
+        self.root        = root
+        self.files       = 0
+        self.dirs        = 0
+        self.bytes       = 0
+        self.text_paths: list[str] = []
+        self.samples:    list[tuple[str, list[str], str]] = []   # (имя, слова, расширение)
+        self.seconds     = 0.0
+
+
+def _name(rnd: random.Random, ext: str, serial: int) -> tuple[str, list[str]]:
+    kind = rnd.random()
+    if ext in ("jpg", "heic") and kind < 0.6:
+        stamp = f"20{rnd.randint(15, 25)}{rnd.randint(1, 12):02d}{rnd.randint(1, 28):02d}"
+        return f"IMG_{stamp}_{serial % 10000:04d}.{ext}", ["img", stamp]
+    if kind < 0.5:
+        words = rnd.sample(_RU_WORDS, rnd.randint(1, 3))
+        sep   = rnd.choice(("_", " ", "-"))
+        stem  = sep.join(words)
+        if rnd.random() < 0.5:
+            stem = stem.capitalize()
+    else:
+        words = rnd.sample(_EN_WORDS, rnd.randint(1, 3))
+        sep   = rnd.choice(("_", " ", "-"))
+        stem  = sep.join(w.capitalize() if rnd.random() < 0.3 else w for w in words)
+    if rnd.random() < 0.4:
+        stem += f"{sep}{rnd.randint(2015, 2025)}"
+    elif rnd.random() < 0.2:
+        stem += f"{sep}v{rnd.randint(1, 9)}"
+    return f"{stem}.{ext}", words
+
+
+def _text(rnd: random.Random, words: list[str]) -> str:
+    topic = _TOPICS[rnd.randrange(len(_TOPICS))].split()
+    body  = [rnd.choice(topic) for _ in range(rnd.randint(30, 300))]
+    return " ".join(words + body)
+
+
+def generate(root: pathlib.Path, files: int, depth: int, seed: int) -> Corpus:
+    """Детерминированное дерево: files файлов в ~files/40 папках глубиной до depth."""
+    rnd    = random.Random(seed)
+    corpus = Corpus(root)
+    t0     = time.perf_counter()
+    now    = time.time()
+    exts, weights = zip(*_EXTENSIONS)
+
+    # Папки: каждая новая вешается на случайную существующую не глубже depth
+    dirs: list[tuple[pathlib.Path, int]] = [(root, 0)]
+    for i in range(max(10, files // 40)):
+        parent, level = dirs[rnd.randrange(len(dirs))]
+        while level >= depth:
+            parent, level = dirs[rnd.randrange(len(dirs))]
+        words = rnd.sample(_RU_WORDS if rnd.random() < 0.5 else _EN_WORDS, rnd.randint(1, 2))
+        path  = parent / f"{' '.join(words)} {i}"
+        path.mkdir(parents=True, exist_ok=True)
+        dirs.append((path, level + 1))
+    corpus.dirs = len(dirs) - 1
+
+    taken: set[str] = set()
+    for serial in range(files):
+        folder, _ = dirs[rnd.randrange(len(dirs))]
+        ext       = rnd.choices(exts, weights)[0]
+        name, words = _name(rnd, ext, serial)
+        path = folder / name
+        if str(path) in taken:
+            path = folder / f"{path.stem} ({serial}).{ext}"
+        taken.add(str(path))
+
+        if ext in _TEXT_EXTS:
+            data = _text(rnd, words).encode("utf-8")
+            path.write_bytes(data)
+            corpus.text_paths.append(str(path))
+            size = len(data)
+        else:
+            # Бинарные файлы — только нужного размера, без содержимого
+            size = rnd.randint(0, 4096)
+            with open(path, "wb") as f:
+                f.truncate(size)
+        mtime = now - rnd.uniform(0, 2 * 365 * 86400)
+        os.utime(path, (mtime, mtime))
+        corpus.files += 1
+        corpus.bytes += size
+
+        # Резервуарная выборка имён для запросов
+        if len(corpus.samples) < _SAMPLE_SIZE:
+            corpus.samples.append((name, words, ext))
+        else:
+            j = rnd.randrange(serial + 1)
+            if j < _SAMPLE_SIZE:
+                corpus.samples[j] = (name, words, ext)
+
+    corpus.seconds = time.perf_counter() - t0
+    return corpus
+
+
+# ── Запросы ───────────────────────────────────────────────────────────────────
+
+def _typo(word: str, rnd: random.Random) -> str:
+    i = rnd.randrange(len(word) - 1)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def name_queries(corpus: Corpus, n: int, seed: int) -> dict[str, list[dict]]:
+    """Классы запросов к поиску по имени — kwargs для FileIndexer.search()."""
+    from database.files.file_indexer import _get_category, _to_latin
+
+    rnd     = random.Random(seed + 1)
+    samples = corpus.samples
+    ru      = [s for s in samples if any("а" <= c <= "я" for c in s[1][0])]
+    multi   = [s for s in samples if len(s[1]) > 1]
+    out: dict[str, list[dict]] = {k: [] for k in (
+        "exact", "prefix", "substring", "multiword", "translit",
+        "fuzzy", "miss", "category", "browse",
+    )}
+    for _ in range(n):
+        name, words, ext = rnd.choice(samples)
+        word = rnd.choice(words)
+        out["exact"].append({"query": name})
+        out["prefix"].append({"query": name[:max(3, len(name) // 3)]})
+        start = rnd.randrange(max(1, len(word) - 3))
+        out["substring"].append({"query": word[start:start + 4]})
+        if multi:
+            out["multiword"].append({"query": " ".join(rnd.choice(multi)[1][:2])})
+        if ru:
+            out["translit"].append({"query": _to_latin(rnd.choice(ru)[1][0])})
+        long_words = [w for w in words if len(w) > 4] or ["report"]
+        out["fuzzy"].append({"query": _typo(rnd.choice(long_words), rnd)})
+        out["miss"].append({"query": f"zq{rnd.randrange(10**6)}xj"})
+        out["category"].append({"query": word, "category": _get_category(ext)})
+        out["browse"].append({
+            "category":    rnd.choice(("photo", "document", "music", "code")),
+            "date_filter": rnd.choice(("week", "month", "year")),
+        })
+    return {k: v for k, v in out.items() if v}
+
+
+def content_queries(n: int, seed: int) -> list[str]:
+    """Запросы по содержимому: 1–3 слова темы (уникальные — без кэша эмбеддингов)."""
+    rnd  = random.Random(seed + 2)
+    seen: set[str] = set()
+    out:  list[str] = []
+    while len(out) < n and len(seen) < n * 20:
+        topic = _TOPICS[rnd.randrange(len(_TOPICS))].split()
+        q = " ".join(rnd.sample(topic, rnd.randint(1, 3)))
+        if q not in seen:
+            seen.add(q)
+            out.append(q)
+        elif len(seen) >= n * 3:
+            out.append(q)   # тем мало — повторы неизбежны
+    return out
+
+
+def _timed(fn, calls: list) -> dict:
+    ms: list[float] = []
+    hits = 0
+    for kwargs in calls:
+        t0 = time.perf_counter()
+        res = fn(**kwargs)
+        ms.append((time.perf_counter() - t0) * 1000)
+        hits += bool(res)
+    return {
+        "n":        len(ms),
+        "p50_ms":   round(_percentile(ms, 50), 3),
+        "p95_ms":   round(_percentile(ms, 95), 3),
+        "p99_ms":   round(_percentile(ms, 99), 3),
+        "max_ms":   round(max(ms), 3) if ms else 0.0,
+        "hit_rate": round(hits / len(ms), 3) if ms else 0.0,
+    }
+
+
+# ── FileIndexer ───────────────────────────────────────────────────────────────
+
+def bench_files(corpus: Corpus, work: pathlib.Path, queries: int, updates: int, seed: int) -> dict:
+    from database.files.file_indexer import FileIndexer
+
+    idx = FileIndexer(db_path=work / "files.db", autostart=False)
+    t0  = time.perf_counter()
+    indexed = idx.build_index(roots=[corpus.root])
+    build_sec = time.perf_counter() - t0
+
+    # Инкрементальные обновления — как их применяет watchdog, по одному пути
+    rnd    = random.Random(seed + 3)
+    folder = corpus.root / "incremental"
+    folder.mkdir(exist_ok=True)
+    new_paths = []
+    for i in range(updates):
+        name, _ = _name(rnd, rnd.choice(("txt", "jpg", "pdf")), i)
+        p = folder / f"{i}_{name}"
+        p.write_bytes(b"x" * rnd.randint(0, 512))
+        new_paths.append(str(p))
+    t0 = time.perf_counter()
+    for p in new_paths:
+        idx._index_path(p)
+    add_sec = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for p in new_paths:
+        idx._remove_file(p)
+    remove_sec = time.perf_counter() - t0
+    shutil.rmtree(folder, ignore_errors=True)
+
+    search = {
+        cls: _timed(idx.search, [{**q, "limit": 5} for q in calls])
+        for cls, calls in name_queries(corpus, queries, seed).items()
+    }
+    idx._conn.close()
+    return {
+        "build": {
+            "indexed":       indexed,
+            "seconds":       round(build_sec, 3),
+            "files_per_sec": round(indexed / build_sec, 1) if build_sec else 0.0,
+            "db_bytes":      (work / "files.db").stat().st_size,
+        },
+        "incremental": {
+            "updates":          updates,
+            "add_per_sec":      round(updates / add_sec, 1) if add_sec else 0.0,
+            "remove_per_sec":   round(updates / remove_sec, 1) if remove_sec else 0.0,
+        },
+        "search": search,
+    }
+
+
+# ── SemanticIndexer ───────────────────────────────────────────────────────────
+
+def bench_semantic(corpus: Corpus, work: pathlib.Path, docs: int, queries: int,
+                   updates: int, latency_ms: float, seed: int) -> dict:
+    import config
+    from database.files import semantic_search as ss
+
+    srv = EmbedServer(port=0, dim=ss.EMBED_DIM, latency_ms=latency_ms).start()
+    old_url = getattr(config, "EMBED_BASE_URL", "")
+    config.EMBED_BASE_URL = srv.base_url
+    api_key = "bench"
+    try:
+        rnd   = random.Random(seed + 4)
+        paths = sorted(corpus.text_paths)
+        if len(paths) > docs:
+            paths = sorted(rnd.sample(paths, docs))
+        sem = ss.SemanticIndexer(db_path=work / "semantic.db")
+
+        t0 = time.perf_counter()
+        embedded  = sem.build_index(paths, api_key)
+        build_sec = time.perf_counter() - t0
+        requests  = srv.stats["requests"]
+
+        # Повторный проход без изменений — стоимость диффа по mtime
+        t0 = time.perf_counter()
+        sem.build_index(paths, api_key)
+        noop_sec = time.perf_counter() - t0
+
+        # Правим часть файлов и пересобираем: извлечение + FTS + эмбеддинги только для них
+        changed = rnd.sample(paths, min(updates, len(paths)))
+        for p in changed:
+            with open(p, "a", encoding="utf-8") as f:
+                f.write(" " + " ".join(rnd.sample(_EN_WORDS, 5)))
+            st = os.stat(p)
+            os.utime(p, (st.st_atime, st.st_mtime + 1))
+        t0 = time.perf_counter()
+        reembedded = sem.build_index(paths, api_key)
+        update_sec = time.perf_counter() - t0
+
+        # У каждого режима свои запросы — semantic и hybrid не делят кэш эмбеддингов
+        modes  = ("fulltext", "semantic", "hybrid")
+        texts  = content_queries(queries * len(modes), seed)
+        search = {
+            mode: _timed(sem.search_content, [
+                {"query": q, "api_key": api_key, "limit": 10, "mode": mode}
+                for q in texts[i * queries:(i + 1) * queries]
+            ])
+            for i, mode in enumerate(modes)
+        }
+        status = sem.get_status()
+        sem._conn.close()
+        return {
+            "docs": len(paths),
+            "build": {
+                "embedded":      embedded,
+                "seconds":       round(build_sec, 3),
+                "docs_per_sec":  round(len(paths) / build_sec, 1) if build_sec else 0.0,
+                "api_requests":  requests,
+                "noop_seconds":  round(noop_sec, 3),
+            },
+            "incremental": {
+                "changed":      len(changed),
+                "reembedded":   reembedded,
+                "seconds":      round(update_sec, 3),
+                "docs_per_sec": round(len(changed) / update_sec, 1) if update_sec else 0.0,
+            },
+            "search":       search,
+            "vector_store": status.get("vector_store"),
+        }
+    finally:
+        config.EMBED_BASE_URL = old_url
+        srv.stop()
+
+
+# ── main ──────────────────────────────────────────────────────────────────────
+
+def run(args) -> dict:
+    from database.files.file_indexer import _should_skip
+
+    base = pathlib.Path(tempfile.mkdtemp(prefix="jarvis-bench-", dir=args.dir))
+    root, work = base / "tree", base / "work"
+    work.mkdir(parents=True)
+    # %TEMP% на Windows попадает под SKIP_DIR_PARTS — индексатор его не увидит
+    if _should_skip(root):
+        shutil.rmtree(base, ignore_errors=True)
+        raise SystemExit(f"{root} исключается индексатором — укажите другую папку через --dir")
+    try:
+        corpus = generate(root, args.files, args.depth, args.seed)
+        updates = args.updates if args.updates is not None else min(1000, max(10, args.files // 10))
+        report = {
+            "params": {
+                "files": args.files, "depth": args.depth, "seed": args.seed,
+                "queries": args.queries, "updates": updates,
+                "semantic_docs": args.semantic_docs,
+                "embed_latency_ms": args.embed_latency_ms,
+            },
+            "env": {
+                "python":   platform.python_version(),
+                "platform": platform.platform(),
+                "cpus":     os.cpu_count(),
+            },
+            "corpus": {
+                "files":      corpus.files,
+                "dirs":       corpus.dirs,
+                "text_files": len(corpus.text_paths),
+                "bytes":      corpus.bytes,
+                "seconds":    round(corpus.seconds, 3),
+            },
+            "file_index": bench_files(corpus, work, args.queries, updates, args.seed),
+        }
+        if args.semantic_docs:
+            report["semantic_index"] = bench_semantic(
+                corpus, work, args.semantic_docs, args.queries,
+                min(updates, args.semantic_docs // 10 or 1),
+                args.embed_latency_ms, args.seed,
+            )
+        return report
+    finally:
+        if args.keep:
+            print(f"Дерево и БД сохранены: {base}")
+        else:
+            shutil.rmtree(base, ignore_errors=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--files", type=int, default=10_000, help="файлов в дереве (10k–1M)")
+    ap.add_argument("--depth", type=int, default=6, help="максимальная вложенность папок")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--queries", type=int, default=200, help="запросов на каждый класс")
+    ap.add_argument("--updates", type=int, default=None, help="файлов в инкрементальном тесте")
+    ap.add_argument("--semantic-docs", type=int, default=2000, help="0 — без SemanticIndexer")
+    ap.add_argument("--embed-latency-ms", type=float, default=50.0)
+    ap.add_argument("--dir", default=None, help="где создать временное дерево")
+    ap.add_argument("--keep", action="store_true", help="не удалять дерево и БД")
+    ap.add_argument("--out", default=None, help="записать JSON в файл")
+    args = ap.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        pathlib.Path(args.out).write_text(text, encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
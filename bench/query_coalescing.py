@@ -0,0 +1,100 @@
+"""
+bench/query_coalescing.py — нагрузка на эмбеддинги поисковых запросов.
+
+N потоков одновременно шлют короткие запросы (как type-ahead в UI или голос
+во время поиска) в локальную заглушку bench/embed_server.py. Сравниваем:
+  direct    — каждый запрос отдельным вызовом embeddings.create
+  coalesced — EmbeddingClient.embed_query(): склейка в пачки по окну в мс
+
+Запуск: python -m bench.query_coalescing --clients 1 8 32 --queries 400
+"""
+
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+
+from bench.embed_server import EmbedServer
+from bench.embed_throughput import _WORDS
+from database.files.embed_client import EmbeddingClient
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def run(mode: str, clients: int, queries: int, latency_ms: float, rpm: int) -> dict:
+    srv = EmbedServer(port=0, dim=64, latency_ms=latency_ms, rpm=rpm).start()
+    try:
+        client = EmbeddingClient("local", "stub", base_url=srv.base_url,
+                                 concurrency=4, rpm=rpm or 10**6, tpm=10**9)
+        call = client.embed_query if mode == "coalesced" else (lambda q: (client.embed([q]) or [None])[0])
+
+        rnd       = random.Random(7)
+        texts     = [" ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(1, 4))) for _ in range(queries)]
+        latencies: list[float] = []
+        failed    = [0]
+        lock      = threading.Lock()
+        it        = iter(texts)
+
+        def _worker():
+            while True:
+                with lock:
+                    q = next(it, None)
+                if q is None:
+                    return
+                t = time.perf_counter()
+                ok = call(q) is not None
+                dt = (time.perf_counter() - t) * 1000
+                with lock:
+                    latencies.append(dt)
+                    failed[0] += 0 if ok else 1
+
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=_worker) for _ in range(clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        stats = client.get_stats()
+        client.close()
+        return {
+            "mode":         mode,
+            "clients":      clients,
+            "queries":      queries,
+            "api_requests": stats["requests"],
+            "failed":       failed[0],
+            "rate_limited": srv.stats["rate_limited"],
+            "qps":          round(queries / elapsed, 1),
+            "p50_ms":       round(statistics.median(latencies), 1),
+            "p95_ms":       round(_percentile(latencies, 95), 1),
+            "p99_ms":       round(_percentile(latencies, 99), 1),
+            "coalescer":    stats.get("query_coalescer", {}),
+        }
+    finally:
+        srv.stop()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    ap.add_argument("--queries", type=int, default=400)
+    ap.add_argument("--latency-ms", type=float, default=80.0)
+    ap.add_argument("--rpm", type=int, default=0, help="лимит заглушки, 0 — без лимита")
+    args = ap.parse_args()
+    results = [
+        run(mode, c, args.queries, args.latency_ms, args.rpm)
+        for c in args.clients
+        for mode in ("direct", "coalesced")
+    ]
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
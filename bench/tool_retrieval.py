@@ -0,0 +1,201 @@
+"""
+bench/tool_retrieval.py — сколько промпта экономит отбор инструментов.
+
+Реплики пользователя берутся из журнала (logs/assistant.log, строки
+«Voice | User: …» / «Голос | Пользователь: …» / «Chat | User: …») и
+проигрываются в двух вариантах первого запроса Brain:
+  full    — системный промпт с полными описаниями команд + вся схема
+  pruned  — каталог команд в промпте + схема от ToolRetriever.select()
+
+Офлайн: токены промпта (tiktoken, если установлен, иначе оценка по символам)
+и время отбора. С --live (нужен OPENAI_API_KEY) оба варианта реально
+отправляются в API со stream=True: время до первого токена, prompt_tokens
+из usage и совпадает ли выбранная моделью команда.
+
+Запуск: python -m bench.tool_retrieval [--log logs/assistant.log] [--live] [--out result.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import re
+import statistics
+import time
+
+_USER_RE = re.compile(r"(?:Voice|Голос|Chat|Чат)\s*\|\s*(?:User|Пользователь):\s*(.+)$")
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def load_utterances(path: str) -> list[str]:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return [m.group(1).strip() for line in f if (m := _USER_RE.search(line))]
+
+
+def _token_counter():
+    """(функция подсчёта, название). Без tiktoken — ~4 символа ASCII / ~2 кириллицы на токен."""
+    try:
+        import tiktoken
+        enc = tiktoken.get_encoding("o200k_base")
+        return (lambda text: len(enc.encode(text))), "tiktoken/o200k_base"
+    except Exception:
+        def _approx(text: str) -> int:
+            ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+            return round(ascii_chars / 4 + (len(text) - ascii_chars) / 2)
+        return _approx, "approx"
+
+
+def _prompts(commands) -> tuple[str, str]:
+    """Системный промпт до (полные описания) и после (каталог)."""
+    import config
+    short = config._short_description
+    config._short_description = lambda desc, limit=0: desc
+    try:
+        before = config.build_system_prompt(commands.COMMANDS)
+    finally:
+        config._short_description = short
+    return before, config.build_system_prompt(commands.COMMANDS)
+
+
+# ── Офлайн ────────────────────────────────────────────────────────────────────
+
+def offline(utterances: list[str]) -> dict:
+    with contextlib.redirect_stdout(io.StringIO()):
+        import commands
+    from ai.tool_retriever import get_tool_retriever
+
+    count, tokenizer = _token_counter()
+    prompt_full, prompt_short = _prompts(commands)
+    tools_full = commands.build_tools_schema()
+    full_tokens = count(prompt_full) + count(json.dumps(tools_full, ensure_ascii=False))
+    retriever = get_tool_retriever()
+    retriever.select("warm up")
+
+    rows, select_ms = [], []
+    for text in utterances:
+        t = time.perf_counter()
+        names = retriever.select(text)
+        select_ms.append((time.perf_counter() - t) * 1000)
+        tools = commands.build_tools_schema(names)
+        pruned = count(prompt_short) + count(json.dumps(tools, ensure_ascii=False))
+        rows.append({"text": text, "tools": len(tools), "tokens": pruned + count(text)})
+
+    pruned_tokens = [r["tokens"] for r in rows]
+    mean_pruned   = statistics.mean(pruned_tokens) if rows else 0
+    return {
+        "utterances":        len(rows),
+        "tokenizer":         tokenizer,
+        "commands":          len(tools_full),
+        "full_tokens":       full_tokens,
+        "pruned_tokens_avg": round(mean_pruned),
+        "pruned_tokens_max": max(pruned_tokens, default=0),
+        "reduction":         round(1 - mean_pruned / full_tokens, 3) if rows else 0.0,
+        "tools_avg":         round(statistics.mean(r["tools"] for r in rows), 1) if rows else 0,
+        "full_schema_falls": sum(1 for r in rows if r["tools"] == len(tools_full)),
+        "select_ms_p50":     round(statistics.median(select_ms), 3) if rows else 0,
+        "select_ms_p95":     round(_percentile(select_ms, 95), 3),
+        "system_prompt":     {"full": count(prompt_full), "catalog": count(prompt_short)},
+    }
+
+
+# ── Live ──────────────────────────────────────────────────────────────────────
+
+def _ttft(client, model: str, messages: list, tools: list) -> dict:
+    """Время до первого содержательного чанка, prompt_tokens и вызванная команда."""
+    start  = time.perf_counter()
+    first  = None
+    called = None
+    usage  = None
+    stream = client.chat.completions.create(
+        model=model, messages=messages, tools=tools, tool_choice="auto",
+        max_tokens=60, temperature=0, stream=True,
+        stream_options={"include_usage": True},
+    )
+    for chunk in stream:
+        if chunk.usage:
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if first is None and (delta.content or delta.tool_calls):
+            first = time.perf_counter()
+        for tc in delta.tool_calls or []:
+            if called is None and tc.function and tc.function.name:
+                called = tc.function.name
+    return {
+        "ttft_ms":       round(((first or time.perf_counter()) - start) * 1000),
+        "prompt_tokens": usage.prompt_tokens if usage else None,
+        "tool":          called,
+    }
+
+
+def live(utterances: list[str]) -> dict:
+    import config
+    from openai import OpenAI
+    with contextlib.redirect_stdout(io.StringIO()):
+        import commands
+    from ai.tool_retriever import get_tool_retriever
+
+    client = OpenAI(api_key=config.OPENAI_API_KEY, timeout=30.0)
+    prompt_full, prompt_short = _prompts(commands)
+    retriever = get_tool_retriever()
+    runs = {"full": [], "pruned": []}
+    agree = 0
+    for text in utterances:
+        user = {"role": "user", "content": text}
+        full = _ttft(client, config.GPT_MODEL, [{"role": "system", "content": prompt_full}, user],
+                     commands.build_tools_schema())
+        pruned = _ttft(client, config.GPT_MODEL, [{"role": "system", "content": prompt_short}, user],
+                       commands.build_tools_schema(retriever.select(text)))
+        runs["full"].append(full)
+        runs["pruned"].append(pruned)
+        agree += full["tool"] == pruned["tool"]
+
+    def _summary(items: list[dict]) -> dict:
+        ttft = [r["ttft_ms"] for r in items]
+        tokens = [r["prompt_tokens"] for r in items if r["prompt_tokens"] is not None]
+        return {
+            "ttft_ms_p50":       statistics.median(ttft) if ttft else 0,
+            "ttft_ms_p95":       _percentile(ttft, 95),
+            "prompt_tokens_avg": round(statistics.mean(tokens)) if tokens else None,
+        }
+
+    return {
+        "model":          config.GPT_MODEL,
+        "full":           _summary(runs["full"]),
+        "pruned":         _summary(runs["pruned"]),
+        # Та же команда (или её отсутствие) при полной и урезанной схеме
+        "tool_agreement": round(agree / len(utterances), 3) if utterances else 0.0,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--log", default="logs/assistant.log")
+    ap.add_argument("--live", action="store_true", help="замерить TTFT в API (нужен OPENAI_API_KEY)")
+    ap.add_argument("--limit", type=int, default=0, help="только первые N реплик")
+    ap.add_argument("--out", default="")
+    args = ap.parse_args()
+
+    utterances = load_utterances(args.log)
+    if args.limit:
+        utterances = utterances[:args.limit]
+    result = {"offline": offline(utterances)}
+    if args.live:
+        result["live"] = live(utterances)
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,13 +8,33 @@ commands/__init__.py — автосборщик команд
   - PARAMETERS     : dict  — JSON Schema параметров (можно {})
   - REQUIRED       : list
   - def handler(**kwargs) -> str
+Необязательно:
+  - TIMEOUT        : float — дедлайн выполнения в секундах (по умолчанию DEFAULT_TIMEOUT)
+  - GROUP          : str   — команды одной группы выполняются строго по очереди
+                             (общее состояние: поиск, вкладки Chrome); по умолчанию —
+                             имя команды, т.е. два вызова одной команды не пересекаются
+  - INTENT_PATTERNS: list  — [(regex, {фикс. аргументы})] для быстрого пути без GPT
+                             (ai/intent_router.py); именованные группы regex — слоты
+  - DIRECT_RESPONSE: bool  — handler возвращает готовую локализованную фразу:
+                             Brain озвучивает её без второго запроса к GPT
+  - CACHE_TTL      : float — команда без побочных эффектов: ответ хода с ней можно
+                             отдавать из кэша ответов столько секунд (ai/response_cache.py)
+  - DESTRUCTIVE    : bool  — необратимое действие: быстрый путь только по точному
+                             шаблону или триггеру, без нечёткого совпадения
+handler может вернуть dict {"speak": "...", ...} — озвучивается speak,
+остальные поля остаются модели в истории как контекст.
 """
 
+import collections
 import importlib.util
+import json
 import pathlib
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+DEFAULT_TIMEOUT = 10.0   # сек на команду без TIMEOUT в метаданных
+TOOL_WORKERS    = 6      # параллельных команд за один ход модели
 
 COMMANDS: dict = {}
 _lock = threading.Lock()
@@ -46,6 +66,12 @@ def _load_command_file(path: pathlib.Path) -> None:
         "parameters":  getattr(mod, "PARAMETERS",  {}),
         "required":    getattr(mod, "REQUIRED",    []),
         "handler":     mod.handler,
+        "timeout":     float(getattr(mod, "TIMEOUT", DEFAULT_TIMEOUT)),
+        "group":       getattr(mod, "GROUP", name),
+        "intents":     getattr(mod, "INTENT_PATTERNS", []),
+        "direct":      bool(getattr(mod, "DIRECT_RESPONSE", False)),
+        "cache_ttl":   float(getattr(mod, "CACHE_TTL", 0)),
+        "destructive": bool(getattr(mod, "DESTRUCTIVE", False)),
     }
     with _lock:
         global _cmd_version
@@ -100,20 +126,166 @@ def execute_command(name: str, args: dict) -> str:
         return f"Команда '{name}' не найдена."
     try:
         result = cmd["handler"](**args)
+        if isinstance(result, dict):
+            return json.dumps(result, ensure_ascii=False, default=str)
         return str(result) if result is not None else "Выполнено."
     except Exception as e:
         return f"Ошибка при выполнении '{name}': {e}"
 
 
-def build_tools_schema() -> list[dict]:
+_exec_pool: ThreadPoolExecutor | None = None
+_exec_pool_lock = threading.Lock()
+_abandoned: dict[Future, str] = {}   # просроченные вызовы, чьи потоки ещё работают → GROUP
+
+
+def _get_exec_pool() -> ThreadPoolExecutor:
+    global _exec_pool
+    if _exec_pool is None:
+        with _exec_pool_lock:
+            if _exec_pool is None:
+                _exec_pool = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="cmd")
+    return _exec_pool
+
+
+def _abandon(fut: Future, group: str) -> int:
+    """
+    Просроченный вызов: его поток занимает слот пула, пока не вернётся.
+    Пул с таким слотом больше не берём — следующие вызовы идут в новый,
+    старый закроется сам, когда дорабатывающие потоки завершатся.
+    Пока поток жив, его GROUP занята (_group_busy). Возвращает, сколько
+    брошенных вызовов ещё работает.
+    """
+    global _exec_pool
+    with _exec_pool_lock:
+        _abandoned[fut] = group
+        if _exec_pool is not None:
+            _exec_pool.shutdown(wait=False)
+            _exec_pool = None
+        count = len(_abandoned)
+    fut.add_done_callback(_forget_abandoned)
+    return count
+
+
+def _forget_abandoned(fut: Future) -> None:
+    with _exec_pool_lock:
+        _abandoned.pop(fut, None)
+
+
+def _group_busy(group: str) -> bool:
+    """В группе дорабатывает брошенный вызов — следующий нарушил бы очерёдность GROUP."""
+    with _exec_pool_lock:
+        return group in _abandoned.values()
+
+
+def _busy_error(name: str, group: str) -> str:
+    return json.dumps({
+        "error":   "busy",
+        "command": name,
+        "group":   group,
+        "message": f"Команда '{name}' не запущена: предыдущая команда группы '{group}' "
+                   f"не ответила вовремя и ещё работает. Попробуйте позже.",
+    }, ensure_ascii=False)
+
+
+def _timeout_error(name: str, timeout: float) -> str:
+    """Структурированная ошибка для модели: она сама объяснит пользователю."""
+    return json.dumps({
+        "error":       "timeout",
+        "command":     name,
+        "timeout_sec": timeout,
+        "message":     f"Команда '{name}' не ответила за {timeout:g} с и продолжает работу в фоне.",
+    }, ensure_ascii=False)
+
+
+def execute_commands(calls: list[tuple[str, dict]]) -> list[str]:
+    """
+    Выполняет несколько вызовов за один ход модели. Независимые команды идут
+    параллельно на общем пуле, вызовы одной GROUP — по очереди в исходном
+    порядке. У каждого вызова свой дедлайн (TIMEOUT команды) с момента
+    запуска; просроченный получает JSON-ошибку timeout, а поток дорабатывает
+    в фоне, уже вне пула следующих вызовов (зависшие команды не отнимают у
+    них слоты). Пока он не вернулся, вызовы его группы — и в этом ходе, и в
+    следующих — не запускаются и получают JSON-ошибку busy.
+    Результаты — в порядке calls.
+    """
+    if not calls:
+        return []
+    with _lock:
+        meta = [COMMANDS.get(name) for name, _ in calls]
+
+    results: list[str | None] = [None] * len(calls)
+    queues:  dict[str, collections.deque] = {}
+    for i, (name, _) in enumerate(calls):
+        group = meta[i]["group"] if meta[i] else name
+        queues.setdefault(group, collections.deque()).append(i)
+
+    running: dict[Future, tuple[int, str, float]] = {}   # future → (индекс, группа, дедлайн)
+
+    def _start_next(group: str):
+        while queues[group]:
+            i = queues[group].popleft()
+            name, args = calls[i]
+            if _group_busy(group):
+                results[i] = _busy_error(name, group)
+                continue
+            timeout = meta[i]["timeout"] if meta[i] else DEFAULT_TIMEOUT
+            # Пул берём на каждый запуск: после таймаута он заменяется (_abandon)
+            fut = _get_exec_pool().submit(execute_command, name, args)
+            running[fut] = (i, group, time.monotonic() + timeout)
+            return
+
+    for group in queues:
+        _start_next(group)
+
+    while running:
+        nearest = min(deadline for _, _, deadline in running.values())
+        done, _ = wait(list(running), timeout=max(0.0, nearest - time.monotonic()),
+                       return_when=FIRST_COMPLETED)
+        now = time.monotonic()
+        for fut in list(running):
+            i, group, deadline = running[fut]
+            if fut in done:
+                results[i] = fut.result()   # execute_command не бросает исключений
+            elif now >= deadline:
+                name = calls[i][0]
+                timeout = meta[i]["timeout"] if meta[i] else DEFAULT_TIMEOUT
+                results[i] = _timeout_error(name, timeout)
+                still_running = _abandon(fut, group)
+                try:
+                    print(f"  [CMD] {name}: таймаут {timeout:g} с; "
+                          f"брошенных вызовов в работе: {still_running}")
+                except Exception:
+                    pass
+            else:
+                continue
+            del running[fut]
+            _start_next(group)
+    return results
+
+
+def build_tools_schema(names: list[str] | None = None) -> list[dict]:
+    """
+    Схема инструментов для API, отсортирована по имени команды;
+    names — только эти команды (ai/tool_retriever.py).
+    """
+    tools = _full_tools_schema()
+    if names is None:
+        return tools
+    wanted = set(names)
+    return [t for t in tools if t["function"]["name"] in wanted]
+
+
+def _full_tools_schema() -> list[dict]:
     with _lock:
         if _schema_cache["version"] == _cmd_version:
             return _schema_cache["tools"]
         snapshot = list(COMMANDS.items())
         current_version = _cmd_version
 
+    # По имени, а не в порядке загрузки: hot-reload не должен менять
+    # байты схемы — она часть кэшируемого префикса промпта
     tools = []
-    for name, meta in snapshot:
+    for name, meta in sorted(snapshot, key=lambda item: item[0]):
         tools.append({
             "type": "function",
             "function": {
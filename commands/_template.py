@@ -8,6 +8,7 @@ commands/_template.py — шаблон для новой команды
   - Имя файла = название команды (примерно)
   - Не начинать с _ (иначе автосборщик пропустит)
   - Обязательно: COMMAND_NAME, DESCRIPTION, PARAMETERS, REQUIRED, handler()
+  - Необязательно: TIMEOUT, GROUP, INTENT_PATTERNS, DIRECT_RESPONSE (см. блок перед handler)
 """
 
 # ── 1. Название команды (GPT использует это имя для вызова) ───────────────────
@@ -32,6 +33,31 @@ PARAMETERS = {
 # ── 4. Список обязательных параметров ─────────────────────────────────────────
 REQUIRED = ["param1"]
 
+# ── (необязательно) Дедлайн и группа выполнения ───────────────────────────────
+# TIMEOUT — сколько секунд модель ждёт команду (по умолчанию 10)
+# GROUP   — команды одной группы не выполняются параллельно (общее состояние)
+# TIMEOUT = 10
+# GROUP   = "my_group"
+#
+# DIRECT_RESPONSE — handler возвращает готовую фразу на языке интерфейса:
+# Brain озвучивает её сам, без второго запроса к GPT
+# DIRECT_RESPONSE = True
+#
+# CACHE_TTL — команда только читает и результат меняется медленно: ответ на
+# ту же реплику отдаётся из кэша столько секунд (ai/response_cache.py).
+# Не ставить командам с побочными эффектами (громкость, открытие, поиск)
+# CACHE_TTL = 600
+#
+# INTENT_PATTERNS — быстрый путь без GPT (ai/intent_router.py): regex на всю
+# реплику (нижний регистр, без пунктуации), именованные группы — параметры
+# INTENT_PATTERNS = [
+#     (r"моя команда (?P<param1>\w+)", {}),
+# ]
+#
+# DESTRUCTIVE — необратимое действие (очистка корзины, выключение): быстрый
+# путь берёт только точный шаблон или фразу-триггер, без нечёткого совпадения
+# DESTRUCTIVE = True
+
 
 # ── 5. Обработчик — принимает параметры из GPT, возвращает строку ─────────────
 def handler(param1: str, param2: int = 0) -> str:
@@ -24,6 +24,7 @@ PARAMETERS = {
     },
 }
 REQUIRED = ["app"]
+DIRECT_RESPONSE = True
 
 _reg_path = pathlib.Path(__file__).parent / "_registry.py"
 _spec = importlib.util.spec_from_file_location("_apps_registry", _reg_path)
@@ -21,6 +21,8 @@ PARAMETERS = {
     }
 }
 REQUIRED = ["app"]
+TIMEOUT = 30   # первый поиск приложения сканирует меню Пуск
+DIRECT_RESPONSE = True
 
 # Загрузка реестра из соседнего файла _registry.py
 _reg_path = pathlib.Path(__file__).parent / "_registry.py"
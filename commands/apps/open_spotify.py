@@ -6,6 +6,7 @@ COMMAND_NAME = "open_spotify"
 DESCRIPTION = "Открыть Spotify"
 PARAMETERS = {}
 REQUIRED = []
+DIRECT_RESPONSE = True
 
 _SPOTIFY_PATHS = [
     os.path.join(os.environ.get("APPDATA", ""), "Spotify", "Spotify.exe"),
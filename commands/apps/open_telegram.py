@@ -5,6 +5,7 @@ COMMAND_NAME = "open_telegram"
 DESCRIPTION = "Открыть Telegram"
 PARAMETERS = {}
 REQUIRED = []
+DIRECT_RESPONSE = True
 
 _TELEGRAM_PATHS = [
     os.path.join(os.environ.get("APPDATA", ""), "Telegram Desktop", "Telegram.exe"),
@@ -41,6 +41,7 @@ PARAMETERS = {
     }
 }
 REQUIRED = ["action"]
+DIRECT_RESPONSE = True
 
 _KEYS = {
     "switch":     ("alt", "tab"),
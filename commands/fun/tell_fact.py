@@ -11,6 +11,7 @@ DESCRIPTION = (
 )
 PARAMETERS = {}
 REQUIRED = []
+DIRECT_RESPONSE = True
 
 _FACTS_RU = [
     "Осьминоги имеют три сердца, голубую кровь и девять мозгов — один центральный и по одному в каждом щупальце.",
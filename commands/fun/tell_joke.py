@@ -9,6 +9,7 @@ DESCRIPTION = (
 )
 PARAMETERS = {}
 REQUIRED = []
+DIRECT_RESPONSE = True
 
 _JOKES_RU = [
     "Программист просыпается ночью. Жена говорит: «Иди проверь, нет ли на кухне мышей». Он идёт, возвращается. «Нет». — «Точно нет?» — «Ну смотри: пошёл на кухню, не нашёл, вернулся. Что непонятно?»",
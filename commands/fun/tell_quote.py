@@ -11,6 +11,7 @@ DESCRIPTION = (
 )
 PARAMETERS = {}
 REQUIRED = []
+DIRECT_RESPONSE = True
 
 _QUOTES_RU = [
     "«Если вы думаете, что можете — вы правы. Если думаете, что не можете — тоже правы.» — Генри Форд",
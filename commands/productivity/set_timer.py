@@ -18,6 +18,7 @@ PARAMETERS = {
     },
 }
 REQUIRED = []
+DIRECT_RESPONSE = True
 
 
 def _ring(total_seconds: int, label: str) -> None:
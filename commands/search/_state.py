@@ -10,16 +10,18 @@ _results: list = []
 _query: str = ""
 _offset: int = 0
 _last_params: dict = {}
+_cursor: str | None = None   # курсор следующей страницы (database/files/search_session.py)
 
 
 def set_results(results: list, query: str = "", offset: int = 0, params:
-dict = None):
+dict = None, cursor: str | None = None):
     with _lock:
-        global _results, _query, _offset, _last_params
+        global _results, _query, _offset, _last_params, _cursor
         _results = results
         _query = query
         _offset = offset
         _last_params = params or {}
+        _cursor = cursor
 
 
 def get_results() -> list:
@@ -34,6 +36,7 @@ def get_state() -> dict:
             "query": _query,
             "offset": _offset,
             "params": dict(_last_params),
+            "cursor": _cursor,
         }
 
 
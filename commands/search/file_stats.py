@@ -11,6 +11,7 @@ PARAMETERS = {
     },
 }
 REQUIRED = ["query_type"]
+CACHE_TTL = 600   # статистика индекса за 10 минут почти не меняется
 
 _CAT_RU = {
     "document": "документов",
@@ -10,6 +10,14 @@ DESCRIPTION = (
 )
 PARAMETERS = {}
 REQUIRED = []
+GROUP = "search"   # общее состояние последнего поиска
+
+# Быстрый путь без GPT: только однозначные фразы — «ещё» и «дальше»
+# без контекста могут относиться к шутке или ответу, их решает GPT
+INTENT_PATTERNS = [
+    (r"(?:покажи\s)?(?:следующие|еще)\sрезультаты|больше\sфайлов|следующая\sстраница", {}),
+    (r"(?:show\s)?more\sresults|next\spage|next\sresults", {}),
+]
 
 _HERE = pathlib.Path(__file__).parent
 _STATE_KEY = "_jarvis_search_state"
@@ -32,7 +40,7 @@ _ORDINALS_EN = ["First",  "Second", "Third",  "Fourth",    "Fifth"]
 
 def handler() -> str:
     import config
-    from database.files.file_indexer import get_indexer
+    from database.files.search_session import open_search, resume
     from services.events import emit
 
     is_en = getattr(config, "ACTIVE_LANGUAGE", "ru") == "en"
@@ -40,25 +48,23 @@ def handler() -> str:
     state = _get_state()
     st = state.get_state()
     params = st["params"]
-    new_offset = st["offset"] + 5
-
-    indexer = get_indexer()
-    results = indexer.search(
-        query=params.get("query", ""),
-        category=params.get("category", ""),
-        extension=params.get("extension", ""),
-        date_filter=params.get("date_filter", ""),
-        size_filter=params.get("size_filter", ""),
-        drive=params.get("drive", ""),
-        limit=5,
-        offset=new_offset,
-    )
+    if not st.get("cursor"):
+        # Выдача дочитана до конца (или поиска ещё не было)
+        return "No more results." if is_en else "Больше результатов нет."
+
+    # Следующая страница той же сессии — без повторного каскада запросов.
+    # Сессия истекла (долгая пауза, перезапуск) — открываем поиск заново с того же места
+    page = resume(st["cursor"])
+    if page is None:
+        page = open_search(params, limit=5, offset=st["offset"] + 5)
+    results    = page["results"]
+    new_offset = page["offset"]
 
     if not results:
         return "No more results." if is_en else "Больше результатов нет."
 
     state.set_results(results, query=params.get("query", ""),
-                      offset=new_offset, params=params)
+                      offset=new_offset, params=params, cursor=page["next_cursor"])
 
     emit({
         "type":    "search_results",
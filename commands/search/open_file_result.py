@@ -45,6 +45,17 @@ PARAMETERS = {
     },
 }
 REQUIRED = ["number"]
+GROUP = "search"   # общее состояние последнего поиска
+
+# Быстрый путь без GPT (ai/intent_router.py); слот number — цифра или порядковое слово.
+# Совпадают: «открой второй», «открой 3», «открой папку последнего», «open the last one».
+# Не совпадают (→ GPT/open_app): «открой семинар», «открой вторник», «открой девятку».
+INTENT_PATTERNS = [
+    (r"открой\s(?:номер\s)?(?P<number>\w+)(?:\sфайл|\sрезультат)?", {"action": "open"}),
+    (r"открой\sпапку\s(?P<number>\w+)(?:\sфайла|\sрезультата)?", {"action": "folder"}),
+    (r"open\s(?:the\s)?(?:number\s)?(?P<number>\w+)(?:\sone|\sfile|\sresult)?", {"action": "open"}),
+    (r"open\s(?:the\s)?folder\sof\s(?:the\s)?(?P<number>\w+)(?:\sone|\sfile)?", {"action": "folder"}),
+]
 
 _HERE = pathlib.Path(__file__).parent
 _STATE_KEY = "_jarvis_search_state"
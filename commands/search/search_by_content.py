@@ -57,6 +57,8 @@ PARAMETERS = {
     },
 }
 REQUIRED = ["query"]
+TIMEOUT = 15
+GROUP = "search"   # общее состояние последнего поиска
 
 
 def handler(query: str = "", category: str = "") -> str:
@@ -69,17 +71,17 @@ def handler(query: str = "", category: str = "") -> str:
             "Опиши о чём файл — что в нём написано или какая тема."
         )
 
+    params = {"query": query, "category": category, "semantic": True, "hybrid": True,
+              "content": True}
     try:
-        from database.files.semantic_search import get_semantic_indexer
+        from database.files.search_session import open_search
         from services.events import emit
 
-        api_key = getattr(config, "OPENAI_API_KEY", "")
-        results = get_semantic_indexer().search(
-            query=query,
-            api_key=api_key,
-            limit=5,
-            category=category,
-        )
+        # Содержимое (эмбеддинги + BM25, без ключа — офлайн BM25) и имя файла
+        # параллельно, слияние через RRF: отчёт «продажи.docx» найдётся и по имени.
+        # Слитый список остаётся в сессии — «следующие» листают его без нового поиска
+        page    = open_search(params, limit=5)
+        results = page["results"]
     except Exception as e:
         print(f"  [search_by_content] Ошибка: {e}")
         return (
@@ -93,7 +95,8 @@ def handler(query: str = "", category: str = "") -> str:
         results,
         query=query,
         offset=0,
-        params={"query": query, "category": category, "semantic": True},
+        params=params,
+        cursor=page["next_cursor"],
     )
 
     emit({
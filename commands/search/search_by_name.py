@@ -88,6 +88,7 @@ PARAMETERS = {
     },
 }
 REQUIRED = []
+GROUP = "search"   # общее состояние последнего поиска
 
 
 def handler(
@@ -109,7 +110,7 @@ def handler(
             "Уточни поиск — назови имя файла или тип (ворд, фото, видео, папка)."
         )
 
-    from database.files.file_indexer import get_indexer
+    from database.files.search_session import open_search
     from services.events import emit
 
     # ИИ иногда ставит category=folder когда пользователь говорит "файл"
@@ -119,27 +120,22 @@ def handler(
 
     query, category, extension = auto_detect(query, category, extension)
 
-    results = get_indexer().search(
-        query=query,
-        category=category,
-        extension=extension,
-        date_filter=date_filter,
-        size_filter=size_filter,
-        drive=drive,
-        limit=5,
-        offset=0,
-    )
+    params = {
+        "query": query, "category": category, "extension": extension,
+        "date_filter": date_filter, "size_filter": size_filter,
+        "drive": drive, "semantic": False,
+    }
+    # Сессия поиска: «следующие» дочитает ту же выдачу по курсору
+    page    = open_search(params, limit=5)
+    results = page["results"]
 
     state = get_state()
     state.set_results(
         results,
         query=query,
         offset=0,
-        params={
-            "query": query, "category": category, "extension": extension,
-            "date_filter": date_filter, "size_filter": size_filter,
-            "drive": drive, "semantic": False,
-        },
+        params=params,
+        cursor=page["next_cursor"],
     )
 
     emit({
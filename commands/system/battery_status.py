@@ -2,6 +2,7 @@ COMMAND_NAME = "battery_status"
 DESCRIPTION = "Узнать уровень заряда батареи ноутбука"
 PARAMETERS = {}
 REQUIRED = []
+DIRECT_RESPONSE = True
 
 
 def handler() -> str:
@@ -20,6 +20,7 @@ PARAMETERS = {
     },
 }
 REQUIRED = ["action"]
+TIMEOUT = 20   # PowerShell + сканирование BLE
 
 # PowerShell-скрипт для переключения Bluetooth через Windows Radio API
 _PS_TOGGLE = """
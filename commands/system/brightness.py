@@ -23,6 +23,17 @@ PARAMETERS = {
     },
 }
 REQUIRED = ["action"]
+DIRECT_RESPONSE = True
+
+# Быстрый путь без GPT (ai/intent_router.py)
+INTENT_PATTERNS = [
+    (r"(?:(?:установи|поставь|сделай)\s)?яркость(?:\sна)?\s(?P<level>\d{1,3})(?:\s?%|\sпроцент\w*)?", {"action": "set"}),
+    (r"(?:увеличь|прибавь|подними)\sяркость|(?:сделай\s)?ярче|яркость\sвыше", {"action": "up"}),
+    (r"(?:уменьши|убавь|понизь)\sяркость|(?:сделай\s)?темнее|яркость\sниже", {"action": "down"}),
+    (r"(?:set\s)?(?:the\s)?brightness(?:\sto)?\s(?P<level>\d{1,3})(?:\s?%|\spercent)?", {"action": "set"}),
+    (r"brightness\sup|(?:increase|raise)\s(?:the\s)?brightness|brighter", {"action": "up"}),
+    (r"brightness\sdown|(?:decrease|lower)\s(?:the\s)?brightness|dimmer", {"action": "down"}),
+]
 
 _STEP = 20  # шаг для up/down
 
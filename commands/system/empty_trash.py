@@ -9,6 +9,9 @@ DESCRIPTION = (
 )
 PARAMETERS = {}
 REQUIRED = []
+TIMEOUT = 20
+DIRECT_RESPONSE = True
+DESTRUCTIVE = True      # «удали из карзины» не должно очищать корзину без GPT
 
 
 def handler() -> str:
@@ -1,17 +1,33 @@
 import datetime
 
 COMMAND_NAME = "get_date"
-DESCRIPTION = "Сказать текущую дату и день недели"
+DESCRIPTION = "Tell the current date and weekday / Сказать текущую дату и день недели"
 PARAMETERS = {}
 REQUIRED = []
+DIRECT_RESPONSE = True
+
+# Быстрый путь без GPT (ai/intent_router.py)
+INTENT_PATTERNS = [
+    (r"какое\s(?:сегодня\s)?число(?:\sсегодня)?|какая\s(?:сегодня\s)?дата|какой\s(?:сегодня\s)?день(?:\sнедели)?(?:\sсегодня)?", {}),
+    (r"what(?:\ss|\sis)?\s(?:the\s)?date(?:\stoday)?|what\sday\sis\s(?:it\s)?today", {}),
+]
 
 _DAYS = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота", "Воскресенье"]
 _MONTHS = [
     "января", "февраля", "марта", "апреля", "мая", "июня",
     "июля", "августа", "сентября", "октября", "ноября", "декабря",
 ]
+# Свои списки, а не strftime: %A/%B зависят от локали Windows
+_DAYS_EN = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+_MONTHS_EN = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+]
 
 
 def handler() -> str:
+    import config
     now = datetime.datetime.now()
-    return f"Сегодня {_DAYS[now.weekday()]}, {now.day} {_MONTHS[now.month - 1]} {now.year} года"
\ No newline at end of file
+    if getattr(config, "ACTIVE_LANGUAGE", "ru") == "en":
+        return f"Today is {_DAYS_EN[now.weekday()]}, {_MONTHS_EN[now.month - 1]} {now.day}, {now.year}"
+    return f"Сегодня {_DAYS[now.weekday()]}, {now.day} {_MONTHS[now.month - 1]} {now.year} года"
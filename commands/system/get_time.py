@@ -0,0 +1,19 @@
+import datetime
+
+COMMAND_NAME = "get_time"
+DESCRIPTION = (
+    "Tell the current time / Сказать текущее время. "
+    "RU triggers: который час, сколько времени, сколько сейчас времени. "
+    "EN triggers: what time is it, what's the time, current time."
+)
+PARAMETERS = {}
+REQUIRED = []
+DIRECT_RESPONSE = True
+
+
+def handler() -> str:
+    import config
+    now = datetime.datetime.now()
+    if getattr(config, "ACTIVE_LANGUAGE", "ru") == "en":
+        return f"It's {now.strftime('%H:%M')}"
+    return f"Сейчас {now.hour}:{now.minute:02d}"
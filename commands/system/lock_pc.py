@@ -4,8 +4,18 @@ COMMAND_NAME = "lock_pc"
 DESCRIPTION = "Заблокировать экран компьютера"
 PARAMETERS = {}
 REQUIRED = []
+DIRECT_RESPONSE = True
+
+# Быстрый путь без GPT (ai/intent_router.py)
+INTENT_PATTERNS = [
+    (r"(?:за)?блокируй\s(?:компьютер|комп|пк|экран)|заблокировать\s(?:компьютер|экран)|блокировка\sэкрана", {}),
+    (r"lock\s(?:the\s|my\s)?(?:computer|pc|screen)", {}),
+]
 
 
 def handler() -> str:
+    import config
     subprocess.Popen(["rundll32.exe", "user32.dll,LockWorkStation"])
-    return "Блокирую экран"
\ No newline at end of file
+    if getattr(config, "ACTIVE_LANGUAGE", "ru") == "en":
+        return "Locking the screen"
+    return "Блокирую экран"
@@ -16,6 +16,7 @@ PARAMETERS = {
     }
 }
 REQUIRED = []
+DIRECT_RESPONSE = True
 
 # PowerShell через реестр Windows — работает на Win10/11
 _PS_NIGHT_LIGHT = r"""
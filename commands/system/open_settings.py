@@ -18,6 +18,7 @@ PARAMETERS = {
     }
 }
 REQUIRED = []
+DIRECT_RESPONSE = True
 
 _SECTIONS = {
     "display":           "ms-settings:display",
@@ -9,6 +9,7 @@ DESCRIPTION = (
 )
 PARAMETERS = {}
 REQUIRED = []
+DIRECT_RESPONSE = True
 
 
 def handler() -> str:
@@ -12,6 +12,7 @@ PARAMETERS = {
     }
 }
 REQUIRED = ["action"]
+DESTRUCTIVE = True
 
 _ACTIONS = {
     "shutdown": (["shutdown", "/s", "/t", "5"], "Выключаю компьютер через 5 секунд"),
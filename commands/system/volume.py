@@ -30,6 +30,21 @@ PARAMETERS = {
     },
 }
 REQUIRED = ["action"]
+DIRECT_RESPONSE = True
+
+# Быстрый путь без GPT (ai/intent_router.py)
+INTENT_PATTERNS = [
+    (r"(?:(?:установи|поставь|сделай)\s)?громкость(?:\sна)?\s(?P<percent>\d{1,3})(?:\s?%|\sпроцент\w*)?", {"action": "set"}),
+    (r"(?:увеличь|прибавь|подними)\s(?:громкость|звук)|(?:сделай\s)?громче", {"action": "up"}),
+    (r"(?:уменьши|убавь|понизь)\s(?:громкость|звук)|(?:сделай\s)?тише", {"action": "down"}),
+    (r"(?:выключи|отключи)\sзвук|без\sзвука", {"action": "mute"}),
+    (r"включи\sзвук", {"action": "unmute"}),
+    (r"(?:set\s)?(?:the\s)?volume(?:\sto)?\s(?P<percent>\d{1,3})(?:\s?%|\spercent)?", {"action": "set"}),
+    (r"volume\sup|(?:increase|raise|turn\sup)\s(?:the\s)?volume|louder", {"action": "up"}),
+    (r"volume\sdown|(?:decrease|lower|turn\sdown)\s(?:the\s)?volume|quieter", {"action": "down"}),
+    (r"mute", {"action": "mute"}),
+    (r"unmute", {"action": "unmute"}),
+]
 
 _STEP = 10  # шаг для up/down
 
@@ -28,6 +28,8 @@ PARAMETERS = {
     },
 }
 REQUIRED = ["action"]
+TIMEOUT = 15   # PowerShell
+DIRECT_RESPONSE = True
 
 _RU = {
     "enabled":       "Wi-Fi включён.",
@@ -8,6 +8,7 @@ DESCRIPTION = (
 )
 PARAMETERS = {}
 REQUIRED = []
+TIMEOUT = 45   # скриншот + vision-модель (клиент ждёт до 30 с)
 
 
 def handler() -> str:
@@ -14,6 +14,7 @@ PARAMETERS = {
     }
 }
 REQUIRED = ["object_type"]
+TIMEOUT = 45   # скриншот + vision-модель (клиент ждёт до 30 с)
 
 
 def handler(object_type: str) -> str:
@@ -14,6 +14,7 @@ PARAMETERS = {
     }
 }
 REQUIRED = ["element"]
+TIMEOUT = 45   # скриншот + vision-модель (клиент ждёт до 30 с)
 
 
 def handler(element: str) -> str:
@@ -22,6 +22,7 @@ PARAMETERS = {
     }
 }
 REQUIRED = []
+TIMEOUT = 45   # скриншот + vision-модель (клиент ждёт до 30 с)
 
 
 def handler(hint: str = "") -> str:
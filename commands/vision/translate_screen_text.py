@@ -14,6 +14,7 @@ PARAMETERS = {
     }
 }
 REQUIRED = ["target_language"]
+TIMEOUT = 45   # скриншот + vision-модель (клиент ждёт до 30 с)
 
 
 def handler(target_language: str = "русский") -> str:
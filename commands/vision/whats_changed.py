@@ -16,6 +16,7 @@ PARAMETERS = {
     }
 }
 REQUIRED = []
+TIMEOUT = 45   # скриншот + vision-модель (клиент ждёт до 30 с)
 
 
 def handler(delay_seconds: int = 5) -> str:
@@ -27,6 +27,7 @@ PARAMETERS = {
     }
 }
 REQUIRED = []
+TIMEOUT = 45   # скриншот + vision-модель (клиент ждёт до 30 с)
 
 
 def handler(request: str = "") -> str:
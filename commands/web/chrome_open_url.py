@@ -15,6 +15,7 @@ PARAMETERS = {
     }
 }
 REQUIRED = ["url"]
+GROUP = "chrome"   # действия с вкладками — строго по порядку
 
 
 def handler(url: str) -> str:
@@ -18,6 +18,22 @@ PARAMETERS = {
     }
 }
 REQUIRED = ["action"]
+GROUP = "chrome"   # действия с вкладками — строго по порядку
+DIRECT_RESPONSE = True
+
+# Быстрый путь без GPT (ai/intent_router.py)
+INTENT_PATTERNS = [
+    (r"(?:открой\s)?новую\sвкладку|новая\sвкладка", {"action": "new"}),
+    (r"закрой\s(?:эту\s)?вкладку", {"action": "close"}),
+    (r"(?:переключи\sна\s)?следующую\sвкладку|следующая\sвкладка", {"action": "next"}),
+    (r"(?:переключи\sна\s)?предыдущую\sвкладку|предыдущая\sвкладка", {"action": "prev"}),
+    (r"(?:восстанови|верни)\s(?:закрытую\s)?вкладку", {"action": "reopen"}),
+    (r"(?:open\s)?(?:a\s)?new\stab", {"action": "new"}),
+    (r"close\s(?:the\s|this\s)?tab", {"action": "close"}),
+    (r"(?:go\sto\s|switch\sto\s)?(?:the\s)?next\stab", {"action": "next"}),
+    (r"(?:go\sto\s|switch\sto\s)?(?:the\s)?(?:previous|prev)\stab", {"action": "prev"}),
+    (r"reopen\s(?:the\s)?(?:closed\s)?tab", {"action": "reopen"}),
+]
 
 _ACTIONS = {
     "new":       ["ctrl", "t"],
@@ -16,6 +16,8 @@ PARAMETERS = {
     }
 }
 REQUIRED = ["tool"]
+GROUP = "chrome"   # действия с вкладками — строго по порядку
+DIRECT_RESPONSE = True
 
 _TOOLS = {
     "devtools":    ["f12"],
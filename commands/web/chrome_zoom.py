@@ -14,6 +14,8 @@ PARAMETERS = {
     }
 }
 REQUIRED = ["action"]
+GROUP = "chrome"   # действия с вкладками — строго по порядку
+DIRECT_RESPONSE = True
 
 
 def handler(action: str) -> str:
@@ -10,8 +10,49 @@ load_dotenv()
 # ── API ───────────────────────────────────────────────────────────────────────
 OPENAI_API_KEY  = os.getenv("OPENAI_API_KEY", "")
 GPT_MODEL       = "gpt-4o-mini"   # или "gpt-4o"
+GPT_FAST_MODEL  = "gpt-4o-mini"   # короткие простые реплики (ai/router.py)
 GPT_TEMPERATURE = 0.7
 
+# ── Задержки API (ai/router.py) ──────────────────────────────────────────────
+# Нет первого токена дольше p90 — уходит второй такой же запрос,
+# берётся ответивший первым.
+ROUTER_HEDGING = True
+
+# ── Быстрый путь (ai/intent_router.py) ────────────────────────────────────────
+# Частые команды («громкость 50», «следующая вкладка») распознаются локально
+# и выполняются без GPT. Ниже порога уверенности — обычный запрос к модели.
+FAST_PATH_ENABLED  = True
+FAST_PATH_MIN_CONF = 0.9
+
+# ── Отбор инструментов (ai/tool_retriever.py) ────────────────────────────────
+# Модели уходят только top-N подходящих к реплике команд + базовые,
+# а не вся схема — меньше токенов промпта и быстрее первый токен.
+TOOL_RETRIEVAL_ENABLED = True
+TOOL_RETRIEVAL_TOP_N   = 10
+
+# ── Память диалога (ai/brain.py) ─────────────────────────────────────────────
+# Окно последних ходов в токенах; что не влезло — в фоновую сводку.
+HISTORY_TOKEN_BUDGET = 3000
+
+# ── Кэш ответов (ai/response_cache.py) ──────────────────────────────────────
+# Повторный вопрос («что ты умеешь») — ответ без запроса к модели.
+# SEMANTIC — ещё и по близости смысла: на промахе запрос эмбеддинга к API.
+RESPONSE_CACHE_ENABLED  = True
+RESPONSE_CACHE_TTL_SEC  = 12 * 3600
+RESPONSE_CACHE_SEMANTIC = False
+
+# ── Соединение с OpenAI (ai/brain.py) ────────────────────────────────────────
+# Пока слушаем wake word, соединение прогревается после стольких секунд
+# простоя — первый ответ не ждёт TCP/TLS-рукопожатия.
+KEEP_WARM_SEC = 30
+
+# ── Embeddings (семантический поиск файлов) ───────────────────────────────────
+# Пусто = api.openai.com. Для офлайн-замеров: http://127.0.0.1:8765/v1 (bench/embed_server.py)
+EMBED_BASE_URL    = os.getenv("OPENAI_EMBED_BASE_URL", "")
+EMBED_CONCURRENCY = 4           # батчей в полёте одновременно
+EMBED_RPM         = 3000        # лимиты аккаунта: запросов / токенов в минуту
+EMBED_TPM         = 1_000_000
+
 # ── Whisper ───────────────────────────────────────────────────────────────────
 WHISPER_MODEL    = "base"           # tiny / base / small / medium / large
 
@@ -41,6 +82,8 @@ LANGUAGE_PROFILES = {
         "thinking":         "Думаю...",
         "not_heard":        "Не расслышал.",
         "not_understood":   "Не понял, повторите.",
+        "offline":          "Нет связи с сервером. Пока работают только простые команды.",
+        "offline_done":     "Готово. Подробнее без связи с сервером не расскажу.",
         "stopped":          "Хорошо.",
         "exit_words":       ["выход", "пока", "exit", "quit"],
         "stop_words":       ["стоп", "хватит", "замолчи", "тихо", "достаточно", "молчать"],
@@ -57,6 +100,8 @@ LANGUAGE_PROFILES = {
         "thinking":         "Processing...",
         "not_heard":        "Didn't catch that.",
         "not_understood":   "Didn't catch that, please repeat.",
+        "offline":          "No connection to the server. Only simple commands work for now.",
+        "offline_done":     "Done. I can't tell you more without a server connection.",
         "stopped":          "Okay.",
         "exit_words":       ["exit", "quit", "bye", "goodbye", "выход"],
         "stop_words":       ["stop", "enough", "quiet", "silence", "cancel", "shut up"],
@@ -82,14 +127,25 @@ def set_language(lang_code: str):
 
 
 
+def _short_description(desc: str, limit: int = 100) -> str:
+    """Первая фраза описания команды — до « / », триггеров и примеров."""
+    for sep in (" / ", " RU triggers", " RU:", ". "):
+        desc = desc.split(sep)[0]
+    desc = desc.strip().rstrip(".")
+    return desc if len(desc) <= limit else desc[:limit].rsplit(" ", 1)[0] + "…"
+
+
 def build_system_prompt(commands: dict) -> str:
     """Строит системный промпт с учётом доступных команд и языка."""
     lang = ACTIVE_LANGUAGE
 
+    # Полные описания с триггерами уходят в схеме инструментов — здесь
+    # только каталог, чтобы модель знала обо всех командах
+    # Сортировка по имени — промпт побайтно одинаков при любом порядке загрузки
     lines = []
-    for name, meta in commands.items():
+    for name, meta in sorted(commands.items()):
         desc = meta.get("description_en" if lang == "en" else "description", meta["description"])
-        lines.append(f'  • "{name}" — {desc}')
+        lines.append(f'  • "{name}" — {_short_description(desc)}')
     command_block = "\n".join(lines) if lines else "  (команды не добавлены)"
 
     if lang == "ru":
@@ -0,0 +1,459 @@
+"""
+embed_client.py — клиент OpenAI Embeddings для семантического индекса.
+
+  • один OpenAI клиент (httpx keep-alive пул) на процесс, а не на каждый батч
+  • до EMBED_CONCURRENCY батчей в полёте одновременно
+  • token bucket по запросам и токенам в минуту — не упираемся в лимит заранее
+  • 429 → общая пауза по заголовкам retry-after / x-ratelimit-reset-*
+  • размер батча в токенах подстраивается: при 429 / «слишком много токенов»
+    уменьшается вдвое, после успешных запросов плавно растёт
+  • эмбеддинги поисковых запросов, пришедшие почти одновременно (type-ahead,
+    несколько вкладок, голос во время поиска в UI), склеиваются в один
+    запрос к API — QueryCoalescer
+
+Для офлайн-замеров: OPENAI_EMBED_BASE_URL=http://127.0.0.1:8765/v1
+и локальная заглушка bench/embed_server.py.
+"""
+
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from utils.tokens import estimate_tokens
+
+# ── Константы ─────────────────────────────────────────────────────────────────
+
+MAX_INPUT_TOKENS  = 8191      # лимит модели на один текст
+MAX_BATCH_ITEMS   = 256       # текстов в одном запросе
+MAX_BATCH_TOKENS  = 120_000   # потолок адаптивного батча (API: 300k на запрос)
+MIN_BATCH_TOKENS  = 2_000
+MAX_ATTEMPTS      = 5
+REQUEST_TIMEOUT   = 30.0
+
+COALESCE_WINDOW_MS  = 5.0    # ждём следующий запрос не дольше этого
+COALESCE_MAX_WAIT_MS = 25.0  # потолок задержки первого запроса в пачке
+COALESCE_MAX_BATCH  = 64
+
+
+# ── Разбор заголовков rate limit ──────────────────────────────────────────────
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_MUL = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _parse_duration(value: str) -> float | None:
+    """'6m0s' → 360.0, '20ms' → 0.02, '1.5' → 1.5."""
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _DURATION_MUL[unit] for n, unit in parts)
+
+
+def _retry_after(headers) -> float | None:
+    """Сколько ждать после 429 — по заголовкам ответа."""
+    if headers is None:
+        return None
+    ms = headers.get("retry-after-ms")
+    if ms:
+        try:
+            return float(ms) / 1000
+        except ValueError:
+            pass
+    for name in ("retry-after", "x-ratelimit-reset-tokens", "x-ratelimit-reset-requests"):
+        sec = _parse_duration(headers.get(name, ""))
+        if sec is not None:
+            return sec
+    return None
+
+
+# ── Token bucket ──────────────────────────────────────────────────────────────
+
+class TokenBucket:
+    """Классический token bucket: capacity единиц, пополняется rate единиц/сек."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = max(1.0, float(per_minute))
+        self.rate     = self.capacity / 60.0
+        self._tokens  = self.capacity
+        self._stamp   = time.monotonic()
+        self._lock    = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp  = now
+
+    def acquire(self, amount: float):
+        """Блокирует пока в ведре не наберётся amount (не больше capacity)."""
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(min(wait, 1.0))
+
+    def drain(self, remaining: float):
+        """Синхронизация с сервером: x-ratelimit-remaining-* меньше нашего счёта."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, max(0.0, float(remaining)))
+
+
+# ── Клиент ────────────────────────────────────────────────────────────────────
+
+class EmbeddingClient:
+    def __init__(
+        self,
+        api_key:     str,
+        model:       str,
+        base_url:    str = "",
+        concurrency: int = 4,
+        rpm:         int = 3000,
+        tpm:         int = 1_000_000,
+    ):
+        import httpx
+        from openai import OpenAI
+
+        self.model       = model
+        self.concurrency = max(1, int(concurrency))
+        self._http = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=self.concurrency * 2,
+                max_keepalive_connections=self.concurrency,
+                keepalive_expiry=120.0,
+            ),
+            timeout=REQUEST_TIMEOUT,
+        )
+        self._client = OpenAI(
+            api_key=api_key or "local",
+            base_url=base_url or None,
+            timeout=REQUEST_TIMEOUT,
+            max_retries=0,          # повторы делаем сами — с учётом заголовков
+            http_client=self._http,
+        )
+        self._req_bucket = TokenBucket(rpm)
+        self._tok_bucket = TokenBucket(tpm)
+        self._inflight   = threading.BoundedSemaphore(self.concurrency)
+        self._pool       = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="embed-client",
+        )
+        self._lock          = threading.Lock()
+        self._paused_until  = 0.0
+        self._batch_tokens  = MAX_BATCH_TOKENS // 2
+        self._stats = {
+            "requests": 0, "texts": 0, "tokens": 0,
+            "rate_limited": 0, "retries": 0, "errors": 0,
+        }
+        self._coalescer: "QueryCoalescer | None" = None
+
+    # ── Публичный API ─────────────────────────────────────────────────────────
+
+    def embed(self, texts: list[str]) -> list[list[float]] | None:
+        """Эмбеддинги в исходном порядке; None если хоть один батч не удался."""
+        if not texts:
+            return []
+        batches = self._split(texts)
+        if len(batches) == 1:
+            return self._embed_with_retry(batches[0][1])
+
+        futures = [(start, self._pool.submit(self._embed_with_retry, chunk))
+                   for start, chunk in batches]
+        out: list = [None] * len(texts)
+        for start, fut in futures:
+            vecs = fut.result()
+            if vecs is None:
+                return None
+            out[start:start + len(vecs)] = vecs
+        return out
+
+    def embed_query(self, text: str) -> list[float] | None:
+        """Эмбеддинг одного поискового запроса через общий коалесцер."""
+        with self._lock:
+            if self._coalescer is None:
+                self._coalescer = QueryCoalescer(self._embed_with_retry)
+            coalescer = self._coalescer
+        return coalescer.embed(text)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            coalescer = self._coalescer
+            stats = {
+                **self._stats,
+                "batch_tokens": self._batch_tokens,
+                "concurrency":  self.concurrency,
+                "paused_for":   round(max(0.0, self._paused_until - time.monotonic()), 2),
+            }
+        if coalescer is not None:
+            stats["query_coalescer"] = coalescer.get_stats()
+        return stats
+
+    def close(self):
+        if self._coalescer is not None:
+            self._coalescer.close()
+        self._pool.shutdown(wait=False)
+        try:
+            self._http.close()
+        except Exception:
+            pass
+
+    # ── Адаптивные батчи ──────────────────────────────────────────────────────
+
+    def _split(self, texts: list[str]) -> list[tuple[int, list[str]]]:
+        """Режет тексты на батчи по текущему бюджету токенов."""
+        with self._lock:
+            budget = self._batch_tokens
+        batches: list[tuple[int, list[str]]] = []
+        start, chunk, used = 0, [], 0
+        for i, text in enumerate(texts):
+            n = min(estimate_tokens(text), MAX_INPUT_TOKENS)
+            if chunk and (used + n > budget or len(chunk) >= MAX_BATCH_ITEMS):
+                batches.append((start, chunk))
+                start, chunk, used = i, [], 0
+            chunk.append(text)
+            used += n
+        if chunk:
+            batches.append((start, chunk))
+        return batches
+
+    def _shrink(self):
+        with self._lock:
+            self._batch_tokens = max(MIN_BATCH_TOKENS, self._batch_tokens // 2)
+
+    def _grow(self):
+        with self._lock:
+            self._batch_tokens = min(MAX_BATCH_TOKENS, int(self._batch_tokens * 1.1) + 1)
+
+    # ── Запрос с повторами ────────────────────────────────────────────────────
+
+    def _pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _wait_pause(self):
+        while True:
+            with self._lock:
+                left = self._paused_until - time.monotonic()
+            if left <= 0:
+                return
+            time.sleep(min(left, 1.0))
+
+    def _embed_with_retry(self, texts: list[str]) -> list[list[float]] | None:
+        import openai
+
+        tokens = sum(min(estimate_tokens(t), MAX_INPUT_TOKENS) for t in texts)
+        for attempt in range(MAX_ATTEMPTS):
+            self._wait_pause()
+            self._req_bucket.acquire(1)
+            self._tok_bucket.acquire(tokens)
+            try:
+                with self._inflight:
+                    raw = self._client.embeddings.with_raw_response.create(
+                        model=self.model, input=texts,
+                    )
+                resp = raw.parse()
+                self._on_success(raw.headers, len(texts), resp)
+                return [item.embedding for item in resp.data]
+
+            except openai.RateLimitError as e:
+                delay = _retry_after(getattr(e.response, "headers", None))
+                with self._lock:
+                    self._stats["rate_limited"] += 1
+                self._shrink()
+                self._pause(delay if delay is not None else self._backoff(attempt))
+
+            except openai.APIStatusError as e:
+                # 400 с превышением токенов — режем батч пополам и пробуем снова
+                if e.status_code in (400, 413) and len(texts) > 1 and "token" in str(e).lower():
+                    self._shrink()
+                    mid = len(texts) // 2
+                    left  = self._embed_with_retry(texts[:mid])
+                    right = self._embed_with_retry(texts[mid:]) if left is not None else None
+                    return left + right if right is not None else None
+                if e.status_code < 500:
+                    return self._fail(e)
+                time.sleep(self._backoff(attempt))
+
+            except (openai.APIConnectionError, openai.APITimeoutError):
+                time.sleep(self._backoff(attempt))
+
+            except Exception as e:
+                return self._fail(e)
+
+            with self._lock:
+                self._stats["retries"] += 1
+
+        return self._fail("превышено число попыток")
+
+    def _on_success(self, headers, n_texts: int, resp):
+        usage = getattr(resp, "usage", None)
+        used  = getattr(usage, "total_tokens", 0) or 0
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["texts"]    += n_texts
+            self._stats["tokens"]   += used
+        self._grow()
+
+        # Сервер знает остаток лучше нас — подрезаем свои вёдра
+        for name, bucket in (
+            ("x-ratelimit-remaining-requests", self._req_bucket),
+            ("x-ratelimit-remaining-tokens",   self._tok_bucket),
+        ):
+            value = headers.get(name) if headers is not None else None
+            if value:
+                try:
+                    bucket.drain(float(value))
+                except ValueError:
+                    pass
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return min(30.0, 0.5 * 2 ** attempt) * (0.8 + random.random() * 0.4)
+
+    def _fail(self, err) -> None:
+        with self._lock:
+            self._stats["errors"] += 1
+        try:
+            print(f"    [semantic] Embedding error: {err}")
+        except Exception:
+            pass
+        return None
+
+
+# ── Склейка поисковых запросов ────────────────────────────────────────────────
+
+class QueryCoalescer:
+    """
+    Собирает запросы, пришедшие с интервалом не больше window_ms, в один
+    вызов embed_fn и раздаёт результаты через Future. Первый запрос пачки
+    ждёт не дольше max_wait_ms — одиночный запрос теряет максимум window_ms.
+    Одинаковые тексты внутри пачки уходят в API один раз.
+    """
+
+    def __init__(
+        self,
+        embed_fn,
+        window_ms:   float = COALESCE_WINDOW_MS,
+        max_wait_ms: float = COALESCE_MAX_WAIT_MS,
+        max_batch:   int   = COALESCE_MAX_BATCH,
+    ):
+        self._embed_fn  = embed_fn
+        self._window    = window_ms / 1000
+        self._max_wait  = max_wait_ms / 1000
+        self._max_batch = max_batch
+        self._cond      = threading.Condition()
+        self._pending:  list[tuple[str, Future]] = []
+        self._first_at  = 0.0
+        self._last_at   = 0.0
+        self._closed    = False
+        # Пачки улетают параллельно — сбор следующей не ждёт ответа API
+        self._dispatch  = ThreadPoolExecutor(max_workers=4, thread_name_prefix="embed-coalesce")
+        self._stats     = {"queries": 0, "batches": 0, "api_texts": 0, "max_batch": 0}
+        threading.Thread(target=self._collector, daemon=True, name="embed-coalescer").start()
+
+    def embed(self, text: str, timeout: float = REQUEST_TIMEOUT * MAX_ATTEMPTS) -> list[float] | None:
+        fut: Future = Future()
+        now = time.monotonic()
+        with self._cond:
+            if not self._pending:
+                self._first_at = now
+            self._last_at = now
+            self._pending.append((text, fut))
+            self._cond.notify()
+        try:
+            return fut.result(timeout=timeout)
+        except Exception:
+            return None
+
+    def _collector(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                # Ждём тишины window мс, но не дольше max_wait от первого запроса
+                while len(self._pending) < self._max_batch:
+                    now      = time.monotonic()
+                    deadline = min(self._last_at + self._window, self._first_at + self._max_wait)
+                    if now >= deadline:
+                        break
+                    self._cond.wait(timeout=deadline - now)
+                batch = self._pending[:self._max_batch]
+                del self._pending[:self._max_batch]
+                if self._pending:
+                    self._first_at = self._last_at = time.monotonic()
+            self._dispatch.submit(self._run, batch)
+
+    def _run(self, batch: list[tuple[str, Future]]):
+        unique = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vecs = self._embed_fn(unique)
+        except Exception:
+            vecs = None
+        by_text = dict(zip(unique, vecs)) if vecs else {}
+        with self._cond:
+            self._stats["queries"]   += len(batch)
+            self._stats["batches"]   += 1
+            self._stats["api_texts"] += len(unique)
+            self._stats["max_batch"]  = max(self._stats["max_batch"], len(batch))
+        for text, fut in batch:
+            if not fut.done():
+                fut.set_result(by_text.get(text))
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        stats["avg_batch"] = round(stats["queries"] / stats["batches"], 2) if stats["batches"] else 0.0
+        return stats
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            pending, self._pending = self._pending, []
+            self._cond.notify_all()
+        for _, fut in pending:
+            fut.set_result(None)
+        self._dispatch.shutdown(wait=False)
+
+
+# ── Синглтон ──────────────────────────────────────────────────────────────────
+
+_client: "EmbeddingClient | None" = None
+_client_key: tuple = ()
+_client_lock = threading.Lock()
+
+
+def get_embed_client(api_key: str, model: str) -> EmbeddingClient:
+    """Общий клиент; пересоздаётся если сменился ключ, модель или адрес API."""
+    global _client, _client_key
+    import config
+    base_url = getattr(config, "EMBED_BASE_URL", "")
+    key = (api_key, model, base_url)
+    with _client_lock:
+        if _client is None or _client_key != key:
+            old = _client
+            _client = EmbeddingClient(
+                api_key=api_key,
+                model=model,
+                base_url=base_url,
+                concurrency=getattr(config, "EMBED_CONCURRENCY", 4),
+                rpm=getattr(config, "EMBED_RPM", 3000),
+                tpm=getattr(config, "EMBED_TPM", 1_000_000),
+            )
+            _client_key = key
+            if old is not None:
+                old.close()
+        return _client
@@ -10,8 +10,10 @@ import threading
 import time
 import pathlib
 import datetime
+import itertools
 from difflib import SequenceMatcher
 from functools import lru_cache
+from typing import Iterator
 
 # ── Заимствованные слова RU → EN ──────────────────────────────────────────────
 # Транслитерация "скриншот" → "skrinshot", но реальный файл "screenshot".
@@ -267,6 +269,8 @@ def _build_search_text(name: str) -> str:
 
 DB_PATH = pathlib.Path(__file__).parent / "files.db"
 
+SEARCH_CHUNK = 50   # строк за один SELECT в ленивом каскаде поиска (iter_search)
+
 HOME = pathlib.Path(os.environ.get("USERPROFILE", str(pathlib.Path.home())))
 
 # ── Приоритеты сканирования ────────────────────────────────────────────────────
@@ -442,10 +446,17 @@ def _human_size(b: int) -> str:
 
 
 class FileIndexer:
-    def __init__(self):
-        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    def __init__(self, db_path: pathlib.Path | None = None, autostart: bool = True):
+        """
+        db_path   — другой файл индекса (бенчмарки); по умолчанию DB_PATH
+        autostart — фоновая сборка, watchdog и передача файлов в семантический
+                    индекс. False — автономный индекс, которым управляет вызывающий
+        """
+        self._db_path   = pathlib.Path(db_path) if db_path else DB_PATH
+        self._autostart = autostart
+        self._db_path.parent.mkdir(parents=True, exist_ok=True)
         self._lock = threading.Lock()
-        self._conn = sqlite3.connect(str(DB_PATH), check_same_thread=False)
+        self._conn = sqlite3.connect(str(self._db_path), check_same_thread=False)
         self._conn.row_factory = sqlite3.Row
         # Производительность: WAL даёт параллельные чтения, cache ускоряет LIKE-запросы
         self._conn.execute("PRAGMA journal_mode=WAL")
@@ -466,7 +477,8 @@ class FileIndexer:
         }
 
         self._observer = None
-        threading.Thread(target=self._auto_build_and_watch, daemon=True).start()
+        if autostart:
+            threading.Thread(target=self._auto_build_and_watch, daemon=True).start()
 
     # ── Инициализация БД ──────────────────────────────────────────────────────
 
@@ -547,7 +559,12 @@ class FileIndexer:
 
     # ── Построение индекса (3 фазы) ────────────────────────────────────────────
 
-    def build_index(self) -> int:
+    def build_index(self, roots: list[pathlib.Path] | None = None) -> int:
+        """
+        Полная пересборка. roots — свой набор папок одной фазой
+        (бенчмарки, тесты); по умолчанию три фазы: приоритетные папки,
+        медиа и пользователь, остальные диски.
+        """
         from services.events import emit
 
         started = time.time()
@@ -572,11 +589,14 @@ class FileIndexer:
         # DB уже очищена выше, поэтому сет начинается пустым.
         seen_in_build: set[str] = set()
 
-        phases = [
-            (1, "Приоритетные папки",   [d for d in PRIORITY_DIRS if d.exists()]),
-            (2, "Медиа и пользователь", [d for d in EXTENDED_DIRS if d.exists()]),
-            (3, "Остальные диски",      _get_extra_drives()),
-        ]
+        if roots is not None:
+            phases = [(1, "Заданные папки", [pathlib.Path(d) for d in roots if pathlib.Path(d).exists()])]
+        else:
+            phases = [
+                (1, "Приоритетные папки",   [d for d in PRIORITY_DIRS if d.exists()]),
+                (2, "Медиа и пользователь", [d for d in EXTENDED_DIRS if d.exists()]),
+                (3, "Остальные диски",      _get_extra_drives()),
+            ]
 
         for phase_num, phase_label, dirs in phases:
             if not dirs:
@@ -702,6 +722,8 @@ class FileIndexer:
             "started_at":  None,
         }
         emit({"type": "index_progress", **self._progress})
+        if not self._autostart:
+            return total_indexed
         self._start_watcher()
 
         # Запускаем семантическую индексацию в фоне после завершения файлового индекса
@@ -709,9 +731,8 @@ class FileIndexer:
             try:
                 import config
                 from database.files.semantic_search import get_semantic_indexer, ALL_SUPPORTED
+                # Без ключа строится только локальный полнотекстовый индекс
                 api_key = getattr(config, "OPENAI_API_KEY", "")
-                if not api_key:
-                    return
                 # Берём все документы из files.db с нужными расширениями
                 with self._lock:
                     rows = self._conn.execute(
@@ -760,7 +781,7 @@ class FileIndexer:
                 )
                 self._conn.commit()
             # Ставим в очередь семантической индексации (только файлы, не папки)
-            if not is_dir:
+            if not is_dir and self._autostart:
                 try:
                     from database.files.semantic_search import get_semantic_indexer
                     get_semantic_indexer().enqueue(str(fpath))
@@ -827,6 +848,8 @@ class FileIndexer:
                 (path, prefix + "%"),
             )
             self._conn.commit()
+        if not self._autostart:
+            return
         try:
             from database.files.semantic_search import get_semantic_indexer
             get_semantic_indexer().remove_path(path)
@@ -951,28 +974,15 @@ class FileIndexer:
         limit:       int = 5,
         offset:      int = 0,
     ) -> list[dict]:
-        # Ищем по оригинальному запросу + транслитерированному варианту + заимствованным словам
-        variants = _query_variants(query)
-        if len(variants) > 1:
-            seen, merged = set(), []
-            for v in variants:
-                for r in self._search_one(
-                    query=v, category=category, extension=extension,
-                    date_filter=date_filter, size_filter=size_filter,
-                    drive=drive, limit=limit, offset=offset,
-                ):
-                    if r["path"] not in seen:
-                        merged.append(r); seen.add(r["path"])
-                if len(merged) >= limit:
-                    break
-            return merged[:limit]
-        return self._search_one(
+        """Страница ранжированной выдачи iter_search(): results[offset:offset + limit]."""
+        ranked = self.iter_search(
             query=query, category=category, extension=extension,
-            date_filter=date_filter, size_filter=size_filter,
-            drive=drive, limit=limit, offset=offset,
+            date_filter=date_filter, size_filter=size_filter, drive=drive,
+            chunk=offset + limit,
         )
+        return list(itertools.islice(ranked, offset, offset + limit))
 
-    def _search_one(
+    def iter_search(
         self,
         query:       str = "",
         category:    str = "",
@@ -980,10 +990,37 @@ class FileIndexer:
         date_filter: str = "",
         size_filter: str = "",
         drive:       str = "",
-        limit:       int = 5,
-        offset:      int = 0,
-    ) -> list[dict]:
-
+        chunk:       int = SEARCH_CHUNK,
+    ) -> Iterator[dict]:
+        """
+        Ленивая ранжированная выдача: каскад запросов (точное совпадение →
+        префикс → подстрока → слова → транслит → fuzzy) читается порциями по
+        chunk строк, следующая порция — только когда потребитель дочитал
+        предыдущую. Без дублей; несуществующие файлы отбрасываются (_fmt).
+        Варианты запроса (оригинал, транслит, заимствования) — по очереди.
+        """
+        seen: set[str] = set()
+        for v in _query_variants(query):
+            for rows in self._iter_ranked(
+                query=v, category=category, extension=extension,
+                date_filter=date_filter, size_filter=size_filter,
+                drive=drive, chunk=max(1, chunk),
+            ):
+                fresh = [r for r in rows if r["path"] not in seen]
+                seen.update(r["path"] for r in fresh)
+                yield from self._fmt(fresh)
+
+    def _iter_ranked(
+        self,
+        query:       str = "",
+        category:    str = "",
+        extension:   str = "",
+        date_filter: str = "",
+        size_filter: str = "",
+        drive:       str = "",
+        chunk:       int = SEARCH_CHUNK,
+    ) -> Iterator[list[dict]]:
+        """Порции сырых строк files для одного варианта запроса (без _fmt)."""
         conds, params = [], []
 
         now = datetime.datetime.now()
@@ -1019,106 +1056,100 @@ class FileIndexer:
             conds.append("UPPER(SUBSTR(path, 1, 1)) = ?")
             params.append(drive.upper().strip(": \\"))
 
-        where = ("WHERE " + " AND ".join(conds)) if conds else ""
-
         if not query:
-            sql = f"SELECT * FROM files {where} ORDER BY modified_at DESC LIMIT ? OFFSET ?"
-            with self._lock:
-                rows = self._conn.execute(sql, params + [limit, offset]).fetchall()
-            return self._fmt([dict(r) for r in rows])
+            # Без запроса — свежие первыми; keyset по (modified_at, id) вместо OFFSET
+            last = None
+            while True:
+                cond, extra = list(conds), []
+                if last is not None:
+                    cond.append("(modified_at < ? OR (modified_at = ? AND id < ?))")
+                    extra = [last[0], last[0], last[1]]
+                where = ("WHERE " + " AND ".join(cond)) if cond else ""
+                with self._lock:
+                    rows = self._conn.execute(
+                        f"SELECT * FROM files {where} ORDER BY modified_at DESC, id DESC LIMIT ?",
+                        params + extra + [chunk],
+                    ).fetchall()
+                if rows:
+                    yield [dict(r) for r in rows]
+                if len(rows) < chunk:
+                    return
+                last = (rows[-1]["modified_at"], rows[-1]["id"])
 
         q = query.lower()
         words = [w for w in q.split() if len(w) > 2]
-        results: list[dict] = []
         seen: set[str] = set()
+        found = 0
 
-        def _q(extra_cond: str, extra_params: list, lim: int):
-            """Выполняет запрос без захвата блокировки (вызывается внутри with self._lock)."""
-            all_conds = conds + [extra_cond]
-            w = "WHERE " + " AND ".join(all_conds)
-            return self._conn.execute(
-                f"SELECT * FROM files {w} LIMIT ?",
-                params + extra_params + [lim],
-            ).fetchall()
-
-        def _add(rows) -> None:
-            for r in rows:
-                if r["path"] not in seen:
-                    results.append(dict(r))
-                    seen.add(r["path"])
-
-        # ── Все приоритетные запросы в одном захвате блокировки ───────────────
+        def _scan(extra_cond: str, extra_params: list) -> Iterator[list[dict]]:
+            """Одна ступень каскада порциями: keyset по id, блокировка — на порцию."""
+            nonlocal found
+            last_id = 0
+            while True:
+                w = "WHERE " + " AND ".join(conds + [extra_cond, "id > ?"])
+                with self._lock:
+                    rows = self._conn.execute(
+                        f"SELECT * FROM files {w} ORDER BY id LIMIT ?",
+                        params + extra_params + [last_id, chunk],
+                    ).fetchall()
+                fresh = [dict(r) for r in rows if r["path"] not in seen]
+                if fresh:
+                    seen.update(r["path"] for r in fresh)
+                    found += len(fresh)
+                    yield fresh
+                if len(rows) < chunk:
+                    return
+                last_id = rows[-1]["id"]
+
+        # 1. Точное совпадение
+        yield from _scan("name_lower = ?", [q])
+        # 2. Начинается с запроса
+        yield from _scan("name_lower LIKE ?", [q + "%"])
+        # 3. Содержит запрос целиком
+        yield from _scan("name_lower LIKE ?", ["%" + q + "%"])
+        # 4. AND по словам (только для многословных запросов)
+        if len(words) > 1:
+            cond = " AND ".join("name_lower LIKE ?" for _ in words)
+            yield from _scan(f"({cond})", ["%" + w + "%" for w in words])
+        # 5. OR fallback по словам
+        for word in words:
+            yield from _scan("name_lower LIKE ?", ["%" + word + "%"])
+        # 6. name_search: транслитерация / заимствования (AND)
+        if len(words) > 1:
+            cond = " AND ".join("name_search LIKE ?" for _ in words)
+            yield from _scan(f"({cond})", ["%" + w + "%" for w in words])
+        # 7. name_search содержит запрос целиком / OR fallback
+        yield from _scan("name_search LIKE ?", ["%" + q + "%"])
+        for word in words:
+            yield from _scan("name_search LIKE ?", ["%" + word + "%"])
+
+        # ── Fuzzy — только когда весь каскад выше почти ничего не нашёл ─────────
+        if found >= 2 or len(q) <= 4:
+            return
+        where = ("WHERE " + " AND ".join(conds)) if conds else ""
         with self._lock:
-            # 1. Точное совпадение
-            _add(_q("name_lower = ?", [q], limit))
-
-            # 2. Начинается с запроса
-            if len(results) < limit:
-                _add(_q("name_lower LIKE ?", [q + "%"], limit * 3))
-
-            # 3. Содержит запрос целиком
-            if len(results) < limit:
-                _add(_q("name_lower LIKE ?", ["%" + q + "%"], limit * 5))
-
-            # 4. AND по словам (только для многословных запросов)
-            if len(results) < limit and len(words) > 1:
-                cond = " AND ".join("name_lower LIKE ?" for _ in words)
-                _add(_q(cond, ["%" + w + "%" for w in words], limit * 3))
-
-            # 5. OR fallback по словам
-            if len(results) < limit and words:
-                for word in words:
-                    _add(_q("name_lower LIKE ?", ["%" + word + "%"], limit * 3))
-                    if len(results) >= limit:
-                        break
-
-            # 6. name_search: транслитерация / заимствования (AND)
-            if len(results) < limit:
-                sw = words if len(words) > 1 else [q]
-                if len(sw) > 1:
-                    cond = " AND ".join("name_search LIKE ?" for _ in sw)
-                    _add(_q(cond, ["%" + w + "%" for w in sw], limit * 3))
-
-            # 7. name_search содержит запрос целиком / OR fallback
-            if len(results) < limit:
-                sw = words or [q]
-                _add(_q("name_search LIKE ?", ["%" + q + "%"], limit * 5))
-                if len(results) < limit:
-                    for word in sw:
-                        _add(_q("name_search LIKE ?", ["%" + word + "%"], limit * 3))
-                        if len(results) >= limit:
-                            break
-
-        # ── Fuzzy — отдельный захват блокировки, только когда всё выше не нашло ──
-        if len(results) < 2 and len(q) > 4:
-            sql = f"SELECT * FROM files {where} LIMIT 500"
-            with self._lock:
-                pool = self._conn.execute(sql, params).fetchall()
-            scored = []
-            # quick_ratio() даёт верхнюю границу за O(min(n,m)) — на порядок
-            # быстрее ratio(). Если она ниже порога — не считаем полный ratio.
-            for r in pool:
-                if r["path"] in seen:
+            pool = self._conn.execute(f"SELECT * FROM files {where} LIMIT 500", params).fetchall()
+        scored = []
+        # quick_ratio() даёт верхнюю границу за O(min(n,m)) — на порядок
+        # быстрее ratio(). Если она ниже порога — не считаем полный ratio.
+        for r in pool:
+            if r["path"] in seen:
+                continue
+            m1 = SequenceMatcher(None, q, r["name_lower"])
+            if m1.quick_ratio() < 0.5:
+                m2 = SequenceMatcher(None, q, r["name_search"])
+                if m2.quick_ratio() < 0.5:
                     continue
-                m1 = SequenceMatcher(None, q, r["name_lower"])
-                if m1.quick_ratio() < 0.5:
-                    m2 = SequenceMatcher(None, q, r["name_search"])
-                    if m2.quick_ratio() < 0.5:
-                        continue
-                    score = m2.ratio()
-                else:
-                    s1 = m1.ratio()
-                    m2 = SequenceMatcher(None, q, r["name_search"])
-                    score = max(s1, m2.ratio()) if m2.quick_ratio() >= s1 else s1
-                if score >= 0.5:
-                    scored.append((score, dict(r)))
-            scored.sort(key=lambda x: -x[0])
-            for _, r in scored:
-                if len(results) < limit:
-                    results.append(r)
-                    seen.add(r["path"])
-
-        return self._fmt(results[offset: offset + limit])
+                score = m2.ratio()
+            else:
+                s1 = m1.ratio()
+                m2 = SequenceMatcher(None, q, r["name_search"])
+                score = max(s1, m2.ratio()) if m2.quick_ratio() >= s1 else s1
+            if score >= 0.5:
+                scored.append((score, dict(r)))
+        scored.sort(key=lambda x: -x[0])
+        for i in range(0, len(scored), chunk):
+            yield [r for _, r in scored[i:i + chunk]]
 
     def _fmt(self, rows: list) -> list[dict]:
         out = []
@@ -1217,7 +1248,7 @@ class FileIndexer:
         return {
             "total_files":  count,
             "last_build":   last,
-            "db_path":      str(DB_PATH),
+            "db_path":      str(self._db_path),
             "scan_dirs":    [str(d) for d in all_dirs if d.exists()],
             **self.get_progress(),
         }
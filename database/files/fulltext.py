@@ -0,0 +1,209 @@
+"""
+fulltext.py — локальный полнотекстовый индекс по содержимому файлов.
+
+Работает без сети и API-ключа: SQLite FTS5 + ранжирование BM25.
+Живёт в semantic.db и заполняется тем же пайплайном, что и эмбеддинги
+(SemanticIndexer.build_index), — текст берётся из extracted_text.
+
+Стемминг лёгкий, на Python (FTS5 умеет только английский porter):
+  RU — отрезаем самое длинное типовое окончание
+  EN — отрезаем -ing/-ed/-es/-s и т.п.
+Одинаковый стеммер для документа и запроса + префиксный MATCH ("стем"*)
+закрывают большую часть словоформ.
+"""
+
+import re
+import sqlite3
+import threading
+
+# ── Константы ─────────────────────────────────────────────────────────────────
+
+BM25_NAME_WEIGHT = 2.0    # совпадение в имени файла весомее, чем в тексте
+BM25_BODY_WEIGHT = 1.0
+MIN_STEM         = 3      # короче не режем — «кот» не должен стать «к»
+MAX_QUERY_TERMS  = 12
+
+# ── Стемминг ──────────────────────────────────────────────────────────────────
+
+_TOKEN_RE    = re.compile(r"[0-9a-zа-яё]+")
+_CYRILLIC_RE = re.compile(r"[а-я]")
+
+_RU_REFLEXIVE = ("ся", "сь")
+_RU_ENDINGS = sorted((
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ией",
+    "иях", "ость", "ости", "ешь", "ишь", "ете", "ите",
+    "ях", "ах", "ов", "ев", "ей", "ой", "ий", "ый", "ая", "яя", "ое", "ее",
+    "ие", "ые", "ую", "юю", "ом", "ем", "ам", "ям", "ию", "ия", "ла",
+    "ло", "ли", "ет", "ют", "ут", "ит", "ат", "ят", "им",
+    "а", "я", "о", "е", "и", "ы", "у", "ю", "ь", "й",
+), key=len, reverse=True)
+
+_EN_ENDINGS = (
+    "ational", "ations", "ation", "ingly", "ings", "ing", "edly", "ies",
+    "ed", "es", "ly", "s",
+)
+
+
+def stem(token: str) -> str:
+    """Лёгкий стемминг одного слова (RU/EN)."""
+    if len(token) <= MIN_STEM:
+        return token
+    if _CYRILLIC_RE.search(token):
+        for suf in _RU_REFLEXIVE:
+            if token.endswith(suf) and len(token) - len(suf) >= MIN_STEM:
+                token = token[:-len(suf)]
+                break
+        endings = _RU_ENDINGS
+    else:
+        endings = _EN_ENDINGS
+    for suf in endings:
+        if token.endswith(suf) and len(token) - len(suf) >= MIN_STEM:
+            return token[:-len(suf)]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    """Текст → стемы (регистр и ё не важны, токены короче 2 символов выбрасываем)."""
+    text = text.lower().replace("ё", "е")
+    return [stem(t) for t in _TOKEN_RE.findall(text) if len(t) >= 2]
+
+
+def snippet(text: str, terms: list[str], width: int = 200) -> str:
+    """Кусок исходного текста вокруг первого совпадения со стемом запроса."""
+    low = text.lower().replace("ё", "е")
+    pos = min((p for p in (low.find(t) for t in terms) if p >= 0), default=-1)
+    if pos < 0:
+        return text[:width].strip()
+    start = max(0, pos - width // 4)
+    return ("…" if start else "") + text[start:start + width].strip()
+
+
+# ── FullTextIndex ─────────────────────────────────────────────────────────────
+
+class FullTextIndex:
+    """
+    FTS5-индекс поверх соединения SemanticIndexer (тот же файл и та же блокировка).
+    fulltext_files хранит path → rowid/mtime: точечное удаление и дифф по mtime
+    без сканирования виртуальной таблицы.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, lock: threading.Lock):
+        self._conn = conn
+        self._lock = lock
+        self.available = True
+        try:
+            with self._lock:
+                self._conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS fulltext_files (
+                        id    INTEGER PRIMARY KEY,
+                        path  TEXT UNIQUE NOT NULL,
+                        mtime REAL NOT NULL
+                    );
+                    CREATE VIRTUAL TABLE IF NOT EXISTS fulltext USING fts5(
+                        name, body,
+                        tokenize = 'unicode61 remove_diacritics 2'
+                    );
+                """)
+                self._conn.commit()
+        except sqlite3.OperationalError as e:
+            # Сборка SQLite без FTS5 — поиск по содержимому остаётся только семантическим
+            self.available = False
+            try:
+                print(f"    [fulltext] FTS5 недоступен: {e}")
+            except Exception:
+                pass
+
+    # ── Запись ────────────────────────────────────────────────────────────────
+
+    def known_mtimes(self) -> dict[str, float]:
+        if not self.available:
+            return {}
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT path, mtime FROM fulltext_files"
+            ).fetchall())
+
+    def upsert_many(self, docs: list[tuple[str, float, str, str]]):
+        """docs: (path, mtime, name, text). Пустой текст тоже записываем — для диффа."""
+        if not self.available or not docs:
+            return
+        with self._lock:
+            for path, mtime, name, text in docs:
+                row = self._conn.execute(
+                    "SELECT id FROM fulltext_files WHERE path = ?", (path,)
+                ).fetchone()
+                if row is not None:
+                    doc_id = row[0]
+                    self._conn.execute("DELETE FROM fulltext WHERE rowid = ?", (doc_id,))
+                    self._conn.execute(
+                        "UPDATE fulltext_files SET mtime = ? WHERE id = ?", (mtime, doc_id)
+                    )
+                else:
+                    doc_id = self._conn.execute(
+                        "INSERT INTO fulltext_files (path, mtime) VALUES (?, ?)", (path, mtime)
+                    ).lastrowid
+                self._conn.execute(
+                    "INSERT INTO fulltext (rowid, name, body) VALUES (?, ?, ?)",
+                    (doc_id, " ".join(tokenize(name)), " ".join(tokenize(text))),
+                )
+            self._conn.commit()
+
+    def remove_path(self, path: str, prefix: str):
+        """Удаляет файл или все файлы папки (prefix = path + os.sep)."""
+        if not self.available:
+            return
+        with self._lock:
+            ids = [r[0] for r in self._conn.execute(
+                "SELECT id FROM fulltext_files WHERE path = ? OR path LIKE ?",
+                (path, prefix + "%"),
+            ).fetchall()]
+            if not ids:
+                return
+            self._conn.executemany("DELETE FROM fulltext WHERE rowid = ?", [(i,) for i in ids])
+            self._conn.executemany("DELETE FROM fulltext_files WHERE id = ?", [(i,) for i in ids])
+            self._conn.commit()
+
+    def remove_exact(self, paths: list[str]):
+        """Удаляет список точных путей (обслуживание индекса)."""
+        if not self.available or not paths:
+            return
+        with self._lock:
+            for start in range(0, len(paths), 500):
+                chunk = paths[start:start + 500]
+                ids = [r[0] for r in self._conn.execute(
+                    "SELECT id FROM fulltext_files WHERE path IN ({})".format(",".join("?" * len(chunk))),
+                    chunk,
+                ).fetchall()]
+                self._conn.executemany("DELETE FROM fulltext WHERE rowid = ?", [(i,) for i in ids])
+                self._conn.executemany("DELETE FROM fulltext_files WHERE id = ?", [(i,) for i in ids])
+            self._conn.commit()
+
+    # ── Поиск ─────────────────────────────────────────────────────────────────
+
+    def search(self, query: str, limit: int = 20) -> tuple[list[tuple[str, float]], list[str]]:
+        """
+        BM25 по стемам запроса. Возвращает ([(path, score)], стемы запроса);
+        score > 0, больше — лучше. Термины объединяются через OR — документ
+        с большим числом совпавших слов BM25 и так поднимет выше.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+        if not self.available or not terms:
+            return [], terms
+        match = " OR ".join(f'"{t}"*' for t in terms)
+        with self._lock:
+            try:
+                rows = self._conn.execute(
+                    "SELECT f.path, bm25(fulltext, ?, ?) AS rank "
+                    "FROM fulltext JOIN fulltext_files f ON f.id = fulltext.rowid "
+                    "WHERE fulltext MATCH ? ORDER BY rank LIMIT ?",
+                    (BM25_NAME_WEIGHT, BM25_BODY_WEIGHT, match, limit),
+                ).fetchall()
+            except sqlite3.OperationalError:
+                return [], terms
+        return [(r[0], -float(r[1])) for r in rows], terms
+
+    def count(self) -> int:
+        if not self.available:
+            return 0
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM fulltext_files").fetchone()[0]
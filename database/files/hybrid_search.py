@@ -0,0 +1,194 @@
+"""
+hybrid_search.py — единый поиск файлов: по имени (files.db) + по содержимому
+(semantic.db: эмбеддинги и/или BM25).
+
+  • оба движка стартуют параллельно, у каждого свой дедлайн — медленный
+    движок (сеть, холодный индекс) не держит ответ
+  • ранжирование — Reciprocal Rank Fusion: шкалы движков несравнимы, ранги — да
+  • iter_hybrid_search() отдаёт частичные результаты по мере готовности:
+    сначала имя (миллисекунды), потом содержимое, в конце — слитый список
+
+Используется в /files/search, /files/search/stream и голосовой команде
+search_by_content.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Iterator
+
+# ── Константы ─────────────────────────────────────────────────────────────────
+
+NAME_DEADLINE_SEC    = 1.5
+CONTENT_DEADLINE_SEC = 4.0    # эмбеддинг запроса по сети ~0.5–2 с
+RRF_K                = 60     # сглаживание RRF (стандартное значение)
+MAX_DEPTH            = 500    # сколько кандидатов берём у каждого движка (= MAX_RESULTS сессии)
+
+_pool: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid-search")
+    return _pool
+
+
+# ── Слияние ───────────────────────────────────────────────────────────────────
+
+def rrf_merge(lists: list[list[dict]], engines: list[str], limit: int, offset: int = 0) -> list[dict]:
+    """
+    Reciprocal Rank Fusion: score = Σ 1 / (RRF_K + rank). Итоговый score
+    нормирован к лучшему (0–1). Поля результата берутся из первого движка,
+    пустые дополняются из следующих (id и дата — из поиска по имени,
+    preview — из поиска по содержимому).
+    """
+    fused:   dict[str, float] = {}
+    merged:  dict[str, dict]  = {}
+    sources: dict[str, list]  = {}
+    for results, engine in zip(lists, engines):
+        for rank, r in enumerate(results):
+            path = r["path"]
+            fused[path] = fused.get(path, 0.0) + 1.0 / (RRF_K + rank + 1)
+            sources.setdefault(path, []).append(engine)
+            if path not in merged:
+                merged[path] = dict(r)
+            else:
+                for k, v in r.items():
+                    if not merged[path].get(k):
+                        merged[path][k] = v
+    if not fused:
+        return []
+    order = sorted(fused, key=fused.get, reverse=True)
+    top   = fused[order[0]]
+    return [
+        {**merged[p], "score": round(fused[p] / top, 3), "engines": sources[p]}
+        for p in order[offset:offset + limit]
+    ]
+
+
+# ── Движки ────────────────────────────────────────────────────────────────────
+
+def _name_engine(params: dict, depth: int) -> list[dict]:
+    from database.files.file_indexer import get_indexer
+    return get_indexer().search(
+        query=params["query"],
+        category=params["category"],
+        extension=params["extension"],
+        date_filter=params["date_filter"],
+        size_filter=params["size_filter"],
+        drive=params["drive"],
+        limit=depth,
+        offset=0,
+    )
+
+
+def _content_engine(params: dict, depth: int) -> list[dict]:
+    import config
+    from database.files.semantic_search import get_semantic_indexer
+    results = get_semantic_indexer().search_content(
+        query=params["query"],
+        api_key=getattr(config, "OPENAI_API_KEY", ""),
+        limit=depth,
+        category=params["category"],
+        mode=params["content_mode"],
+    )
+    # Фильтры, которых нет у индекса содержимого, применяем к его результатам
+    ext = params["extension"].lower().lstrip(".")
+    if ext:
+        results = [r for r in results if r["extension"] == ext]
+    if params["drive"]:
+        drive = params["drive"].upper().rstrip(":\\/") + ":"
+        results = [r for r in results if r["path"].upper().startswith(drive)]
+    return results
+
+
+# ── Публичный API ─────────────────────────────────────────────────────────────
+
+def iter_hybrid_search(
+    query:            str = "",
+    category:         str = "",
+    extension:        str = "",
+    date_filter:      str = "",
+    size_filter:      str = "",
+    drive:            str = "",
+    limit:            int = 20,
+    offset:           int = 0,
+    content:          bool = True,
+    content_mode:     str = "auto",
+    name_deadline:    float = NAME_DEADLINE_SEC,
+    content_deadline: float = CONTENT_DEADLINE_SEC,
+) -> Iterator[dict]:
+    """
+    Генератор событий:
+      {"type": "partial", "engine": "name"|"content", "results": [...], "ms": ...}
+      {"type": "final", "results": [...], "engines": {"name": "ok", "content": "timeout"}}
+    Частичные результаты — сырой топ движка; финальный — слияние RRF с offset/limit.
+    Поиск по содержимому включается только при непустом query; date/size
+    фильтры ему неизвестны, поэтому при них он не запускается.
+    """
+    params = {
+        "query": query, "category": category, "extension": extension,
+        "date_filter": date_filter, "size_filter": size_filter, "drive": drive,
+        "content_mode": content_mode,
+    }
+    depth = min(MAX_DEPTH, offset + limit)
+    pool  = _get_pool()
+    start = time.monotonic()
+
+    futures: dict[Future, str] = {pool.submit(_name_engine, params, depth): "name"}
+    deadlines = {"name": start + name_deadline}
+    status    = {"name": "pending"}
+    if content and query.strip() and not date_filter and not size_filter:
+        futures[pool.submit(_content_engine, params, depth)] = "content"
+        deadlines["content"] = start + content_deadline
+        status["content"] = "pending"
+
+    results: dict[str, list[dict]] = {}
+    while futures:
+        timeout = max(0.0, min(deadlines[e] for e in futures.values()) - time.monotonic())
+        done, _ = wait(list(futures), timeout=timeout, return_when=FIRST_COMPLETED)
+        for fut in done:
+            engine = futures.pop(fut)
+            try:
+                results[engine] = fut.result()
+                status[engine]  = "ok"
+            except Exception as e:
+                results[engine] = []
+                status[engine]  = "error"
+                try:
+                    print(f"  [hybrid] {engine}: {e}")
+                except Exception:
+                    pass
+            yield {
+                "type":    "partial",
+                "engine":  engine,
+                "results": results[engine][:limit],
+                "ms":      int((time.monotonic() - start) * 1000),
+            }
+        now = time.monotonic()
+        for fut, engine in list(futures.items()):
+            if now >= deadlines[engine]:
+                # Поток дорабатывает в фоне — ответ его не ждёт
+                futures.pop(fut)
+                status[engine] = "timeout"
+
+    order = [e for e in ("name", "content") if e in results]
+    yield {
+        "type":    "final",
+        "results": rrf_merge([results[e] for e in order], order, limit, offset),
+        "engines": status,
+        "ms":      int((time.monotonic() - start) * 1000),
+    }
+
+
+def hybrid_search(**kwargs) -> dict:
+    """Блокирующий вариант: только финальное событие iter_hybrid_search()."""
+    final: dict = {"results": [], "engines": {}}
+    for event in iter_hybrid_search(**kwargs):
+        if event["type"] == "final":
+            final = event
+    return final
@@ -0,0 +1,229 @@
+"""
+search_session.py — серверные сессии поиска файлов с непрозрачными курсорами.
+
+Первый запрос открывает сессию: ранжированная выдача (FileIndexer.iter_search
+или слитый список гибридного поиска) материализуется лениво — ровно столько,
+сколько уже запросили страницы, плюс одна строка чтобы знать, есть ли дальше.
+Следующая страница по курсору — срез готового буфера или дочитывание
+генератора с места остановки, каскад запросов заново не выполняется.
+
+  • курсор — base64(session:offset:limit), клиенту его разбирать не нужно
+  • сессии живут SESSION_TTL_SEC с последнего обращения, LRU на MAX_SESSIONS
+  • истёкший курсор → resume() возвращает None, вызывающий открывает поиск заново
+
+Используется в /files/search (параметр cursor) и голосовых командах поиска
+(«следующие» — commands/search/next_results.py).
+"""
+
+import base64
+import binascii
+import collections
+import secrets
+import threading
+import time
+from typing import Iterator
+
+# ── Константы ─────────────────────────────────────────────────────────────────
+
+SESSION_TTL_SEC = 600     # 10 минут без обращений — сессия удаляется
+MAX_SESSIONS    = 64      # LRU: больше одновременно открытых поисков не держим
+MAX_RESULTS     = 500     # потолок выдачи одной сессии
+HYBRID_DEPTH    = 100     # стартовая глубина гибридного поиска (слияние RRF требует список целиком)
+
+
+# ── Курсор ────────────────────────────────────────────────────────────────────
+
+def encode_cursor(session_id: str, offset: int, limit: int) -> str:
+    raw = f"{session_id}:{offset}:{limit}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int, int] | None:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        session_id, offset, limit = raw.rsplit(":", 2)
+        return session_id, max(0, int(offset)), max(1, int(limit))
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+# ── Сессия ────────────────────────────────────────────────────────────────────
+
+class SearchSession:
+    """Буфер над ленивым источником результатов; страницы — срезы буфера."""
+
+    def __init__(self, source: Iterator[dict], params: dict, meta: dict | None = None):
+        self.id        = secrets.token_urlsafe(9)
+        self.params    = dict(params)
+        self.meta      = meta or {}
+        self.used_at   = time.monotonic()
+        self._source   = source
+        self._buffer:  list[dict] = []
+        self._exhausted = False
+        self._lock     = threading.Lock()
+
+    def page(self, offset: int, limit: int) -> tuple[list[dict], bool]:
+        """(результаты, есть ли следующая страница). Дочитывает источник до offset+limit+1."""
+        with self._lock:
+            need = min(offset + limit + 1, MAX_RESULTS)
+            try:
+                while len(self._buffer) < need and not self._exhausted:
+                    self._buffer.append(next(self._source))
+            except StopIteration:
+                self._exhausted = True
+            except Exception as e:
+                # Ошибка источника (БД занята, диск отключён) — отдаём то, что есть
+                self._exhausted = True
+                try:
+                    print(f"  [search-session] {e}")
+                except Exception:
+                    pass
+            self.used_at = time.monotonic()
+            return self._buffer[offset:offset + limit], len(self._buffer) > offset + limit
+
+    @property
+    def materialized(self) -> int:
+        return len(self._buffer)
+
+
+class SessionStore:
+    def __init__(self, ttl: float = SESSION_TTL_SEC, max_sessions: int = MAX_SESSIONS):
+        self._ttl      = ttl
+        self._max      = max_sessions
+        self._sessions: collections.OrderedDict[str, SearchSession] = collections.OrderedDict()
+        self._lock     = threading.Lock()
+        self._stats    = {"opened": 0, "resumed": 0, "expired": 0, "evicted": 0}
+
+    def open(self, source: Iterator[dict], params: dict, meta: dict | None = None) -> SearchSession:
+        session = SearchSession(source, params, meta)
+        with self._lock:
+            self._sweep()
+            self._sessions[session.id] = session
+            self._stats["opened"] += 1
+            while len(self._sessions) > self._max:
+                self._sessions.popitem(last=False)
+                self._stats["evicted"] += 1
+        return session
+
+    def get(self, session_id: str) -> SearchSession | None:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                self._stats["expired"] += 1
+                return None
+            if time.monotonic() - session.used_at > self._ttl:
+                del self._sessions[session_id]
+                self._stats["expired"] += 1
+                return None
+            self._sessions.move_to_end(session_id)
+            self._stats["resumed"] += 1
+            return session
+
+    def _sweep(self):
+        """Вызывать под self._lock."""
+        now = time.monotonic()
+        for sid in [s.id for s in self._sessions.values() if now - s.used_at > self._ttl]:
+            del self._sessions[sid]
+            self._stats["expired"] += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "active":       len(self._sessions),
+                "materialized": sum(s.materialized for s in self._sessions.values()),
+            }
+
+
+_store: SessionStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SessionStore()
+    return _store
+
+
+# ── Публичный API ─────────────────────────────────────────────────────────────
+
+def _page(session: SearchSession, offset: int, limit: int) -> dict:
+    results, has_more = session.page(offset, limit)
+    return {
+        "results":     results,
+        "offset":      offset,
+        "limit":       limit,
+        "has_more":    has_more,
+        "next_cursor": encode_cursor(session.id, offset + limit, limit) if has_more else None,
+        "params":      session.params,
+        **session.meta,
+    }
+
+
+def _hybrid_source(filters: dict, content_mode: str, depth: int) -> tuple[Iterator[dict], dict]:
+    """
+    Слитый список гибридного поиска на depth кандидатов. Если страницы ушли
+    дальше, а список был полным, — поиск заново с удвоенной глубиной (до
+    MAX_RESULTS); уже отданные пути пропускаются. Иначе выдача обрывалась
+    бы на глубине с has_more=False, хотя совпадения есть.
+    """
+    from database.files.hybrid_search import hybrid_search
+
+    def run(depth: int) -> dict:
+        return hybrid_search(**filters, limit=depth, offset=0, content_mode=content_mode)
+
+    first = run(depth)
+
+    def results() -> Iterator[dict]:
+        final, seen, depth_ = first, set(), depth
+        while True:
+            batch = final["results"]
+            for r in batch:
+                if r["path"] not in seen:
+                    seen.add(r["path"])
+                    yield r
+            if len(batch) < depth_ or depth_ >= MAX_RESULTS:
+                return
+            depth_ = min(MAX_RESULTS, depth_ * 2)
+            final  = run(depth_)
+
+    return results(), {"engines": first["engines"]}
+
+
+def _source(params: dict, want: int) -> tuple[Iterator[dict], dict]:
+    """Ленивый источник выдачи по параметрам поиска и метаданные для ответа."""
+    filters = {k: params.get(k, "") for k in
+               ("query", "category", "extension", "date_filter", "size_filter", "drive")}
+    if params.get("content"):
+        # Гибрид сливает движки через RRF — список целиком, глубина по первой странице
+        depth = min(MAX_RESULTS, max(HYBRID_DEPTH, want))
+        return _hybrid_source(filters, params.get("content_mode", "auto"), depth)
+    from database.files.file_indexer import get_indexer
+    return get_indexer().iter_search(**filters), {}
+
+
+def open_search(params: dict, limit: int, offset: int = 0) -> dict:
+    """
+    Открывает сессию и возвращает страницу [offset, offset + limit).
+    params: query, category, extension, date_filter, size_filter, drive —
+    фильтры поиска по имени; content=True — гибридный поиск (имя + содержимое)
+    с content_mode. В ответе next_cursor (None — дальше пусто).
+    """
+    source, meta = _source(params, offset + limit + 1)
+    session = get_session_store().open(source, params, meta)
+    return _page(session, offset, limit)
+
+
+def resume(cursor: str) -> dict | None:
+    """Следующая страница по курсору; None — курсор битый или сессия истекла."""
+    parsed = decode_cursor(cursor)
+    if parsed is None:
+        return None
+    session_id, offset, limit = parsed
+    session = get_session_store().get(session_id)
+    if session is None:
+        return None
+    return _page(session, offset, limit)
@@ -7,21 +7,36 @@ semantic_search.py — поиск по содержимому файлов че
   STRUCTURAL  — структурное описание без чтения данных (xlsx, csv, pptx)
   SKIP        — пропускаем (бинарники, конфиги, секреты)
 
-Хранение: SQLite BLOB (float32 × 1536 = 6 КБ на файл)
+Хранение: memory-mapped vectors.<gen>.npy (float32 × 1536 = 6 КБ на файл),
+          строки по content_hash — vector_store.py
+Кэш:      извлечённый текст (zlib) по ключу (path, size, mtime, версия экстрактора)
 Поиск:    numpy cosine similarity — достаточно до ~50k файлов без FAISS
+Офлайн:   полнотекстовый BM25-индекс (fulltext.py) строится тем же пайплайном
+          и без API-ключа; search_content() сливает оба движка через RRF
 """
 
+import collections
 import csv
+import hashlib
 import os
 import pathlib
 import sqlite3
-import struct
+import stat
 import threading
 import time
-import queue
+import zlib
+from concurrent.futures import (
+    FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait,
+)
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator, NamedTuple
 
 import numpy as np
 
+from database.files.fulltext import FullTextIndex, snippet
+from database.files.hybrid_search import rrf_merge
+from database.files.vector_store import VectorStore
+
 # ── Константы ─────────────────────────────────────────────────────────────────
 
 DB_PATH     = pathlib.Path(__file__).parent / "semantic.db"
@@ -32,6 +47,42 @@ MAX_CHARS   = 3000      # символов текста на файл
 MAX_FILE_MB = 500       # пропускаем только огромные файлы (>500 МБ)
 SIM_THRESH  = 0.25      # минимальный cosine score
 
+# Извлечение текста — CPU-bound (PyMuPDF, python-docx, openpyxl) и держит GIL,
+# поэтому выносим его в пул процессов
+EXTRACT_WORKERS  = max(1, min(4, (os.cpu_count() or 2) - 1))
+EXTRACT_TIMEOUT  = 30.0   # сек на файл — защита от патологических PDF
+EXTRACT_POOL_MIN = 20     # меньше файлов — извлекаем в потоке (спавн процессов дороже)
+
+# Кэш извлечённого текста: смена модели эмбеддингов или повторная индексация
+# не перечитывают PDF/DOCX/XLSX, пока у файла те же размер и mtime.
+# Поднимите EXTRACTOR_VERSION при любом изменении _extract_text.
+EXTRACTOR_VERSION = 1
+TEXT_CACHE_CHUNK  = 500   # строк за один SELECT / INSERT
+
+# Индексация по событиям watchdog
+SETTLE_SEC      = 5.0     # файл должен «замолчать» на столько секунд
+MIN_REEMBED_SEC = 300.0   # один путь — не чаще раза в 5 минут
+HOT_WINDOW_SEC  = 120.0   # окно детектора «горячих» файлов
+HOT_EVENTS      = 6       # событий за окно → файл горячий
+HOT_SETTLE_SEC  = 600.0   # горячий файл ждёт 10 минут тишины
+
+# Фоновое обслуживание semantic.db
+MAINT_FIRST_DELAY_SEC   = 600      # первый проход — через 10 минут после старта
+MAINT_INTERVAL_SEC      = 6 * 3600
+MAINT_BATCH             = 500      # строк за одну проверку сирот
+MAINT_PAUSE_SEC         = 0.05     # пауза между батчами — поиск не ждёт блокировку
+MAINT_VACUUM_PAGES      = 1000     # страниц за один incremental_vacuum
+MAINT_OFFLINE_GRACE_SEC = 7 * 86400   # файлы отключённого диска живут неделю
+
+FTS_BATCH = 200           # файлов за одну транзакцию полнотекстового индекса
+
+BLOB_GRACE_SEC    = 86400  # осиротевший вектор живёт сутки — переезд файла подхватит его без API
+PARTITION_RETRIES = 3      # снимок матрицы разошёлся с vector_rows (запись между чтениями)
+
+QUERY_CACHE_SIZE     = 512    # эмбеддингов запросов в памяти (LRU)
+QUERY_CACHE_WARM     = 200    # сколько последних запросов поднимаем из БД при старте
+QUERY_CACHE_MAX_ROWS = 5000   # потолок таблицы query_cache на диске
+
 # ── Таблица расширений ────────────────────────────────────────────────────────
 
 # Стратегия 1: читаем текст напрямую
@@ -252,14 +303,140 @@ def _extract_text(path: str) -> str:
     return ""
 
 
+# ── Пайплайн извлечения (пул процессов) ───────────────────────────────────────
+
+def _kill_pool(pool: ProcessPoolExecutor):
+    """Останавливает пул вместе с зависшими воркерами (shutdown их не прерывает)."""
+    procs = list((getattr(pool, "_processes", None) or {}).values())
+    try:
+        pool.shutdown(wait=False, cancel_futures=True)
+    except Exception:
+        pass
+    for proc in procs:
+        try:
+            proc.terminate()
+        except Exception:
+            pass
+
+
+def _extract_stream(
+    items: Iterable[tuple[str, float]],
+    total: int,
+) -> Iterator[tuple[str, float, str]]:
+    """
+    Отдаёт (path, mtime, text) по мере готовности — порядок не сохраняется.
+
+    Большие наборы разбираются в ProcessPoolExecutor: в полёте не больше
+    EXTRACT_WORKERS файлов, поэтому время с момента submit ≈ время работы
+    воркера. Файл дольше EXTRACT_TIMEOUT пропускается, а пул пересоздаётся —
+    иначе зависший PDF навсегда занимает процесс. Остальные файлы из полёта
+    отправляются заново (один повтор на файл).
+    """
+    items = iter(items)
+
+    if total < EXTRACT_POOL_MIN or EXTRACT_WORKERS < 2:
+        for path, mtime in items:
+            yield path, mtime, _extract_text(path)
+        return
+
+    try:
+        pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS)
+    except Exception:
+        for path, mtime in items:
+            yield path, mtime, _extract_text(path)
+        return
+
+    inflight: dict[Future, tuple[str, float, float]] = {}   # future → (path, mtime, started)
+    retry:    list[tuple[str, float]] = []
+    retried:  set[str] = set()
+
+    def _submit(path: str, mtime: float):
+        inflight[pool.submit(_extract_text, path)] = (path, mtime, time.monotonic())
+
+    try:
+        while True:
+            while len(inflight) < EXTRACT_WORKERS:
+                nxt = retry.pop() if retry else next(items, None)
+                if nxt is None:
+                    break
+                _submit(*nxt)
+            if not inflight:
+                break
+
+            oldest = min(started for _, _, started in inflight.values())
+            budget = max(0.05, EXTRACT_TIMEOUT - (time.monotonic() - oldest))
+            done, _ = wait(list(inflight), timeout=budget, return_when=FIRST_COMPLETED)
+
+            broken = False
+            for fut in done:
+                path, mtime, _ = inflight.pop(fut)
+                try:
+                    yield path, mtime, fut.result() or ""
+                except BrokenProcessPool:
+                    broken = True
+                    if path not in retried:
+                        retried.add(path)
+                        retry.append((path, mtime))
+                    else:
+                        # Второй раз роняет пул — пустой текст: вызывающий
+                        # запишет файл и не вернётся к нему до нового mtime
+                        _log_skip("воркер упал дважды", path)
+                        yield path, mtime, ""
+                except Exception:
+                    yield path, mtime, ""
+
+            now     = time.monotonic()
+            expired = [f for f, (_, _, st) in inflight.items() if now - st > EXTRACT_TIMEOUT]
+            if not expired and not broken:
+                continue
+
+            for fut in expired:
+                path, mtime, _ = inflight.pop(fut)
+                retried.add(path)   # зависший файл не повторяем
+                _log_skip(f"таймаут извлечения ({EXTRACT_TIMEOUT:.0f}с)", path)
+                yield path, mtime, ""
+            # Пересоздаём пул; то, что было в полёте, отправим ещё раз
+            for fut, (path, mtime, _) in list(inflight.items()):
+                if path not in retried:
+                    retried.add(path)
+                    retry.append((path, mtime))
+                else:
+                    _log_skip("второй перезапуск пула", path)
+                    yield path, mtime, ""
+            inflight.clear()
+            _kill_pool(pool)
+            pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS)
+    finally:
+        _kill_pool(pool)
+
+
+def _log_skip(reason: str, path: str):
+    try:
+        print(f"    [semantic] Пропуск, {reason}: {path}")
+    except Exception:
+        pass
+
+
+def _extractor_tag() -> str:
+    """Версия извлечения в ключе кэша: код экстрактора + лимит символов."""
+    return f"{EXTRACTOR_VERSION}:{MAX_CHARS}"
+
+
+def _pack_text(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8", errors="replace"), 6)
+
+
+def _unpack_text(blob: bytes) -> str:
+    return zlib.decompress(blob).decode("utf-8", errors="replace")
+
+
 # ── OpenAI Embeddings ─────────────────────────────────────────────────────────
 
 def _embed_batch(texts: list[str], api_key: str) -> list[list[float]] | None:
+    """Эмбеддинги через общий клиент: пул соединений, лимиты, адаптивные батчи."""
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key, timeout=30.0, max_retries=1)
-        resp   = client.embeddings.create(model=EMBED_MODEL, input=texts)
-        return [item.embedding for item in resp.data]
+        from database.files.embed_client import get_embed_client
+        return get_embed_client(api_key, EMBED_MODEL).embed(texts)
     except Exception as e:
         try:
             print(f"    [semantic] Embedding error: {e}")
@@ -268,16 +445,41 @@ def _embed_batch(texts: list[str], api_key: str) -> list[list[float]] | None:
         return None
 
 
-# ── Сериализация ──────────────────────────────────────────────────────────────
+def _embed_query_text(text: str, api_key: str) -> np.ndarray | None:
+    """Эмбеддинг поискового запроса; одновременные запросы склеиваются в один вызов API."""
+    try:
+        from database.files.embed_client import get_embed_client
+        vec = get_embed_client(api_key, EMBED_MODEL).embed_query(text)
+    except Exception as e:
+        try:
+            print(f"    [semantic] Embedding error: {e}")
+        except Exception:
+            pass
+        return None
+    return np.array(vec, dtype=np.float32) if vec else None
 
-def _vec_to_blob(vec: list[float]) -> bytes:
-    return struct.pack(f"{len(vec)}f", *vec)
 
+# ── Сериализация ──────────────────────────────────────────────────────────────
 
 def _blob_to_vec(blob: bytes) -> np.ndarray:
     return np.frombuffer(blob, dtype=np.float32).copy()
 
 
+def _content_hash(text: str) -> str:
+    """Ключ вектора: модель + извлечённый текст (копии файла дают один хэш)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(EMBED_MODEL.encode("utf-8"))
+    h.update(b"\0")
+    h.update(text.encode("utf-8", errors="replace"))
+    return h.hexdigest()
+
+
+def _normalize_query(query: str) -> str:
+    """Ключ кэша запросов: регистр, ё→е и лишние пробелы/знаки не важны."""
+    q = " ".join(query.lower().replace("ё", "е").split())
+    return q.strip(" .,!?;:«»\"'")
+
+
 _EXT_CATEGORY: dict[str, str] = {
     **{e: "document" for e in ("pdf", "docx", "doc", "txt", "md", "rst", "csv", "pptx", "xlsx", "xls", "odt", "rtf")},
     **{e: "code"     for e in FULL_TEXT},
@@ -292,109 +494,451 @@ def _ext_to_category(ext: str) -> str:
     return _EXT_CATEGORY.get(ext.lower(), "other")
 
 
+def _path_ext(path: str) -> str:
+    """Расширение для колонки embeddings.extension — по ней фильтр категории в SQL."""
+    return pathlib.Path(path).suffix.lower().lstrip(".")
+
+
+# Фильтр category в search(): одно расширение может входить в несколько
+# категорий (txt — и документ, и код), поэтому фильтруем по extension IN (...)
+_SEARCH_CATEGORIES: dict[str, set[str]] = {
+    "document": set(LIBRARY) | {"txt", "md", "rst", "csv", "pptx", "xlsx", "xls"},
+    "code":     set(FULL_TEXT),
+    "photo":    {"jpg", "jpeg", "png", "gif", "bmp", "webp", "tiff", "svg"},
+    "music":    {"mp3", "flac", "wav", "aac", "ogg", "m4a"},
+    "video":    {"mp4", "avi", "mkv", "mov", "wmv", "webm"},
+}
+
+
 # ── SemanticIndexer ───────────────────────────────────────────────────────────
 
+class _Partition(NamedTuple):
+    """Срез индекса: rows=None → mat уже подматрица среза, иначе индексы строк mat."""
+    mat:      np.ndarray
+    norms:    np.ndarray
+    rows:     np.ndarray | None
+    paths:    list[str]
+    previews: list[str]
+
+
 class SemanticIndexer:
-    def __init__(self):
-        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    def __init__(self, db_path: pathlib.Path | None = None):
+        # db_path — другой файл индекса (бенчмарки); по умолчанию DB_PATH
+        self._db_path = pathlib.Path(db_path) if db_path else DB_PATH
+        self._db_path.parent.mkdir(parents=True, exist_ok=True)
         self._lock   = threading.Lock()
-        self._conn   = sqlite3.connect(str(DB_PATH), check_same_thread=False)
+        self._conn   = sqlite3.connect(str(self._db_path), check_same_thread=False)
         self._conn.row_factory = sqlite3.Row
         self._init_db()
+        # Векторы — в memory-mapped .npy рядом с semantic.db (zero-copy загрузка)
+        self._vectors = VectorStore(self._db_path.parent, self._conn, self._lock, EMBED_DIM)
+        # Резидентные срезы индекса по категориям (см. _partition)
+        self._rows_version = 0
+        self._parts: dict[str, _Partition] = {}
+        self._part_version: tuple = ()
+        self._part_lock = threading.Lock()
+        self._migrate_blobs_to_store()
+        # Полнотекстовый индекс в том же файле — работает без сети и ключа
+        self._fts = FullTextIndex(self._conn, self._lock)
         self._progress: dict = {
             "is_indexing": False,
             "indexed": 0, "total": 0, "percent": 100,
         }
-        # Очередь для фоновой индексации из watchdog
-        self._queue: queue.Queue = queue.Queue()
+        # LRU эмбеддингов запросов: (model, normalized query) → вектор.
+        # Повторный запрос не платит сетевой round-trip (~500+ мс).
+        self._qcache: collections.OrderedDict[tuple[str, str], np.ndarray] = \
+            collections.OrderedDict()
+        self._qcache_stats = {"hits": 0, "db_hits": 0, "misses": 0}
+        self._warm_query_cache()
+        # Сколько файлов получили готовый вектор по хэшу содержимого
+        self._dedup_stats = {"reused": 0, "embedded": 0}
+        # Хэши, которые сейчас эмбеддит другой _flush_batch (watchdog + rebuild):
+        # hash → Event, выставляется, когда вектор записан или запрос не удался
+        self._inflight: dict[str, threading.Event] = {}
+        # Кэш извлечённого текста: сколько файлов не пришлось разбирать
+        self._text_stats = {"hits": 0, "misses": 0}
+        # Очередь для фоновой индексации из watchdog: path → время последнего события
+        self._watch_cond    = threading.Condition()
+        self._watch_pending: dict[str, float] = {}
+        self._watch_events:  dict[str, collections.deque] = {}   # события за HOT_WINDOW_SEC
+        self._last_indexed:  dict[str, float] = {}
+        self._watch_stats = {"events": 0, "coalesced": 0, "indexed": 0, "hot_indexed": 0}
         threading.Thread(
             target=self._background_worker,
             daemon=True,
             name="semantic-worker",
         ).start()
+        # Фоновое обслуживание БД (см. run_maintenance)
+        self._maint_lock   = threading.Lock()
+        self._maint_report: dict = {}
+        threading.Thread(
+            target=self._maintenance_loop,
+            daemon=True,
+            name="semantic-maintenance",
+        ).start()
 
     # ── БД ────────────────────────────────────────────────────────────────────
 
     def _init_db(self):
+        # embeddings.embedding — устаревшая колонка (векторы раньше лежали в строке);
+        # теперь вектор хранится один раз по content_hash: embedding_blobs — реестр
+        # хэшей (last_used для GC), сами векторы — в VectorStore (.npy);
+        # embedding_blobs.embedding заполнена только у записей до миграции
         self._conn.executescript("""
             CREATE TABLE IF NOT EXISTS embeddings (
                 path         TEXT PRIMARY KEY,
                 modified_at  REAL NOT NULL,
                 embedding    BLOB NOT NULL,
                 text_preview TEXT,
-                indexed_at   REAL NOT NULL
+                indexed_at   REAL NOT NULL,
+                content_hash TEXT
             );
             CREATE INDEX IF NOT EXISTS idx_sem_mtime ON embeddings(modified_at);
+            CREATE TABLE IF NOT EXISTS embedding_blobs (
+                hash       TEXT PRIMARY KEY,
+                embedding  BLOB NOT NULL,
+                last_used  REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS query_cache (
+                model     TEXT NOT NULL,
+                query     TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                used_at   REAL NOT NULL,
+                PRIMARY KEY (model, query)
+            );
+            CREATE INDEX IF NOT EXISTS idx_qc_used ON query_cache(used_at);
+            CREATE TABLE IF NOT EXISTS extracted_text (
+                path         TEXT PRIMARY KEY,
+                size         INTEGER NOT NULL,
+                mtime        REAL NOT NULL,
+                extractor    TEXT NOT NULL,
+                text         BLOB NOT NULL,
+                extracted_at REAL NOT NULL
+            );
         """)
         self._conn.commit()
+        self._migrate_inline_vectors()
+        self._migrate_columns()
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sem_hash ON embeddings(content_hash)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sem_ext ON embeddings(extension)"
+        )
+        self._conn.commit()
+
+    def _migrate_columns(self):
+        """
+        Миграция колонок embeddings:
+          extension     — фильтр категории уходит в SQL (extension IN (...))
+          missing_since — файл на отключённом диске (см. run_maintenance)
+        Колонка category из ранней версии миграции никем не читалась — удаляется.
+        """
+        cols = {r[1] for r in self._conn.execute("PRAGMA table_info(embeddings)").fetchall()}
+        for col, decl in (("extension", "TEXT"), ("missing_since", "REAL")):
+            if col not in cols:
+                self._conn.execute(f"ALTER TABLE embeddings ADD COLUMN {col} {decl}")
+        if "category" in cols:
+            try:
+                self._conn.execute("ALTER TABLE embeddings DROP COLUMN category")
+            except sqlite3.OperationalError:
+                pass    # SQLite < 3.35 — колонка остаётся, её просто не пишут
+        self._conn.commit()
+
+        rows = self._conn.execute(
+            "SELECT path FROM embeddings WHERE extension IS NULL"
+        ).fetchall()
+        if rows:
+            self._conn.executemany(
+                "UPDATE embeddings SET extension = ? WHERE path = ?",
+                [(_path_ext(r["path"]), r["path"]) for r in rows],
+            )
+            self._conn.commit()
+
+    def _migrate_inline_vectors(self):
+        """Миграция: векторы из embeddings.embedding → embedding_blobs."""
+        cols = {r[1] for r in self._conn.execute("PRAGMA table_info(embeddings)").fetchall()}
+        if "content_hash" not in cols:
+            self._conn.execute("ALTER TABLE embeddings ADD COLUMN content_hash TEXT")
+            self._conn.commit()
+
+        rows = self._conn.execute(
+            "SELECT path, embedding FROM embeddings WHERE content_hash IS NULL"
+        ).fetchall()
+        if not rows:
+            return
+        # Исходный текст старых записей неизвестен — ключом служит хэш самого вектора
+        now = time.time()
+        blobs, links = {}, []
+        for r in rows:
+            h = "v:" + hashlib.blake2b(r["embedding"], digest_size=16).hexdigest()
+            blobs[h] = r["embedding"]
+            links.append((h, r["path"]))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO embedding_blobs (hash, embedding, last_used) VALUES (?, ?, ?)",
+            [(h, b, now) for h, b in blobs.items()],
+        )
+        self._conn.executemany(
+            "UPDATE embeddings SET content_hash = ?, embedding = X'' WHERE path = ?",
+            links,
+        )
+        self._conn.commit()
+
+    def _migrate_blobs_to_store(self):
+        """Миграция: векторы из embedding_blobs.embedding → VectorStore."""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT hash, embedding FROM embedding_blobs "
+                    "WHERE length(embedding) > 0 LIMIT 1000"
+                ).fetchall()
+            if not rows:
+                return
+            good = [r for r in rows if len(r["embedding"]) == EMBED_DIM * 4]
+            if good:
+                self._vectors.append(
+                    [r["hash"] for r in good],
+                    np.stack([_blob_to_vec(r["embedding"]) for r in good]),
+                )
+            with self._lock:
+                # Вектор другой размерности (чужая модель) не переносим — пересчитается
+                self._conn.executemany(
+                    "DELETE FROM embedding_blobs WHERE hash = ?",
+                    [(r["hash"],) for r in rows if len(r["embedding"]) != EMBED_DIM * 4],
+                )
+                self._conn.executemany(
+                    "UPDATE embedding_blobs SET embedding = X'' WHERE hash = ?",
+                    [(r["hash"],) for r in good],
+                )
+                self._conn.commit()
+
+    # ── Кэш эмбеддингов запросов ──────────────────────────────────────────────
+
+    def _warm_query_cache(self):
+        """Поднимает последние запросы из БД в LRU и подрезает таблицу."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM query_cache WHERE rowid NOT IN ("
+                "  SELECT rowid FROM query_cache ORDER BY used_at DESC LIMIT ?"
+                ")",
+                (QUERY_CACHE_MAX_ROWS,),
+            )
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT query, embedding FROM query_cache WHERE model = ? "
+                "ORDER BY used_at DESC LIMIT ?",
+                (EMBED_MODEL, min(QUERY_CACHE_WARM, QUERY_CACHE_SIZE)),
+            ).fetchall()
+        # Самые свежие — в конец OrderedDict (вытесняются последними)
+        for r in reversed(rows):
+            self._qcache[(EMBED_MODEL, r["query"])] = _blob_to_vec(r["embedding"])
+
+    def _qcache_put(self, key: tuple[str, str], vec: np.ndarray):
+        with self._lock:
+            self._qcache[key] = vec
+            self._qcache.move_to_end(key)
+            while len(self._qcache) > QUERY_CACHE_SIZE:
+                self._qcache.popitem(last=False)
+
+    def _embed_query(self, query: str, api_key: str) -> np.ndarray | None:
+        """Эмбеддинг запроса: память → semantic.db → OpenAI API."""
+        norm = _normalize_query(query)
+        if not norm:
+            return None
+        key = (EMBED_MODEL, norm)
+        now = time.time()
+
+        with self._lock:
+            vec = self._qcache.get(key)
+            if vec is not None:
+                self._qcache.move_to_end(key)
+                self._qcache_stats["hits"] += 1
+                self._conn.execute(
+                    "UPDATE query_cache SET used_at = ? WHERE model = ? AND query = ?",
+                    (now, EMBED_MODEL, norm),
+                )
+                self._conn.commit()
+                return vec
+            row = self._conn.execute(
+                "SELECT embedding FROM query_cache WHERE model = ? AND query = ?",
+                key,
+            ).fetchone()
+            if row is not None:
+                self._qcache_stats["db_hits"] += 1
+                self._conn.execute(
+                    "UPDATE query_cache SET used_at = ? WHERE model = ? AND query = ?",
+                    (now, EMBED_MODEL, norm),
+                )
+                self._conn.commit()
+
+        if row is not None:
+            vec = _blob_to_vec(row["embedding"])
+            self._qcache_put(key, vec)
+            return vec
+
+        vec = _embed_query_text(norm, api_key)
+        if vec is None:
+            return None
+        with self._lock:
+            self._qcache_stats["misses"] += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_cache (model, query, embedding, used_at) "
+                "VALUES (?, ?, ?, ?)",
+                (EMBED_MODEL, norm, vec.tobytes(), now),
+            )
+            self._conn.commit()
+        self._qcache_put(key, vec)
+        return vec
+
+    def get_query_cache_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._qcache_stats)
+            size  = len(self._qcache)
+        lookups = stats["hits"] + stats["db_hits"] + stats["misses"]
+        return {
+            **stats,
+            "size":     size,
+            "hit_rate": round((stats["hits"] + stats["db_hits"]) / lookups, 3) if lookups else 0.0,
+        }
 
     # ── Фоновый worker (обрабатывает очередь из watchdog) ─────────────────────
+    #
+    # Очередь с «временем успокоения»: файл индексируется только после того,
+    # как про него SETTLE_SEC не приходило событий. Плюс не чаще раза в
+    # MIN_REEMBED_SEC на путь, а «горячие» файлы (лог, документ с автосохранением)
+    # ждут HOT_SETTLE_SEC тишины — иначе они жгут квоту API и CPU на каждом save.
+
+    def _is_hot(self, path: str, now: float) -> bool:
+        events = self._watch_events.get(path)
+        if not events:
+            return False
+        while events and now - events[0] > HOT_WINDOW_SEC:
+            events.popleft()
+        return len(events) >= HOT_EVENTS
+
+    def _due_at(self, path: str, last_event: float, now: float) -> float:
+        """Момент, когда путь можно индексировать (monotonic)."""
+        settle = HOT_SETTLE_SEC if self._is_hot(path, now) else SETTLE_SEC
+        due    = last_event + settle
+        last   = self._last_indexed.get(path)
+        if last is not None:
+            due = max(due, last + MIN_REEMBED_SEC)
+        return due
+
+    def _take_due(self) -> tuple[list[str], float]:
+        """Под self._watch_cond: забирает готовые пути; второй элемент — сколько ждать."""
+        now     = time.monotonic()
+        ready   = []
+        wait_for = 5.0
+        for path, last_event in self._watch_pending.items():
+            due = self._due_at(path, last_event, now)
+            if due <= now:
+                ready.append(path)
+                if len(ready) >= BATCH_SIZE:
+                    break
+            else:
+                wait_for = min(wait_for, due - now)
+        for path in ready:
+            del self._watch_pending[path]
+            self._last_indexed[path] = now
+            if self._is_hot(path, now):
+                self._watch_stats["hot_indexed"] += 1
+        # Записи старше интервала больше ни на что не влияют
+        if len(self._last_indexed) > 10_000:
+            self._last_indexed = {
+                p: t for p, t in self._last_indexed.items() if now - t < MIN_REEMBED_SEC
+            }
+        for path in [p for p, ev in self._watch_events.items() if not ev or now - ev[-1] > HOT_WINDOW_SEC]:
+            del self._watch_events[path]
+        return ready, max(0.05, wait_for)
 
     def _background_worker(self):
-        """Забирает пути из очереди батчами, ждёт между батчами (rate limit)."""
+        """Забирает «успокоившиеся» пути батчами. Rate limit соблюдает embed_client."""
         while True:
             try:
-                path = self._queue.get(timeout=5)
-            except queue.Empty:
-                continue
-            except Exception:
-                break
-
-            try:
-                batch = [path]
-                # Сливаем всё что успело накопиться
-                try:
-                    while len(batch) < BATCH_SIZE:
-                        batch.append(self._queue.get_nowait())
-                except queue.Empty:
-                    pass
+                with self._watch_cond:
+                    batch, wait_for = self._take_due()
+                    if not batch:
+                        self._watch_cond.wait(timeout=wait_for)
+                        continue
+                    self._watch_stats["indexed"] += len(batch)
 
                 import config
-                api_key = getattr(config, "OPENAI_API_KEY", "")
-                if api_key:
-                    self.build_index(batch, api_key)
-
-                time.sleep(1)  # пауза между батчами — OpenAI rate limit
+                # Без ключа обновится только полнотекстовый индекс
+                self.build_index(batch, getattr(config, "OPENAI_API_KEY", ""))
             except Exception:
                 pass
 
     def enqueue(self, path: str):
         """Добавить файл в очередь на семантическую индексацию (из watchdog)."""
         ext = pathlib.Path(path).suffix.lower().lstrip(".")
-        if ext in ALL_SUPPORTED and not _too_large(path):
-            self._queue.put(path)
+        if ext not in ALL_SUPPORTED or _too_large(path):
+            return
+        now = time.monotonic()
+        with self._watch_cond:
+            self._watch_stats["events"] += 1
+            if path in self._watch_pending:
+                self._watch_stats["coalesced"] += 1
+            self._watch_pending[path] = now
+            self._watch_events.setdefault(path, collections.deque()).append(now)
+            self._watch_cond.notify()
+
+    def get_watch_stats(self) -> dict:
+        with self._watch_cond:
+            now = time.monotonic()
+            return {
+                **self._watch_stats,
+                "pending": len(self._watch_pending),
+                "hot":     sum(1 for p in list(self._watch_events) if self._is_hot(p, now)),
+            }
+
 
     # ── Построение индекса ────────────────────────────────────────────────────
 
     def build_index(self, file_paths: list[str], api_key: str) -> int:
         """
-        Индексирует переданные файлы.
+        Индексирует переданные файлы: полнотекстовый индекс всегда,
+        эмбеддинги — если есть api_key.
         Пропускает файлы которые уже в БД и не изменились.
+        Возвращает число файлов с новыми эмбеддингами (без ключа — в FTS).
         """
-        if not api_key:
-            return 0
-
-        # Фильтруем: только поддерживаемые расширения + не слишком большие
-        candidates = [
-            p for p in file_paths
-            if pathlib.Path(p).suffix.lower().lstrip(".") in ALL_SUPPORTED
-            and os.path.isfile(p)
-            and not _too_large(p)
-        ]
-
-        # Только новые или изменённые
-        to_index: list[tuple[str, float]] = []
-        for path in candidates:
+        embed_on = bool(api_key)
+
+        # Один os.stat на файл: тип, размер и mtime сразу
+        max_bytes = MAX_FILE_MB * 1024 * 1024
+        current: dict[str, float] = {}
+        sizes:   dict[str, int]   = {}
+        for p in file_paths:
+            dot = p.rfind(".")
+            if dot < 0 or p[dot + 1:].lower() not in ALL_SUPPORTED:
+                continue
             try:
-                mtime = os.path.getmtime(path)
+                st = os.stat(p)
             except OSError:
                 continue
+            if stat.S_ISREG(st.st_mode) and st.st_size <= max_bytes:
+                current[p] = st.st_mtime
+                sizes[p]   = st.st_size
+
+        # Карта (path → mtime) из БД одним сканом вместо SELECT на каждый файл
+        def _stale(known: dict[str, float]) -> set[str]:
+            unchanged = {
+                p for p in current.keys() & known.keys()
+                if abs(known[p] - current[p]) <= 0.5
+            }
+            return current.keys() - unchanged
+
+        emb_stale: set[str] = set()
+        if embed_on:
             with self._lock:
-                row = self._conn.execute(
-                    "SELECT modified_at FROM embeddings WHERE path = ?", (path,)
-                ).fetchone()
-            if row is None or abs(float(row["modified_at"]) - mtime) > 0.5:
-                to_index.append((path, mtime))
+                emb_stale = _stale(dict(self._conn.execute(
+                    "SELECT path, modified_at FROM embeddings"
+                ).fetchall()))
+        fts_stale = _stale(self._fts.known_mtimes()) if self._fts.available else set()
+
+        to_index: list[tuple[str, float]] = [
+            (p, current[p]) for p in emb_stale | fts_stale
+        ]
 
         if not to_index:
             return 0
@@ -408,36 +952,96 @@ class SemanticIndexer:
             "indexed": 0, "total": len(to_index), "percent": 0,
         }
 
-        indexed      = 0
-        batch_texts:  list[str]   = []
-        batch_paths:  list[str]   = []
-        batch_mtimes: list[float] = []
-
-        for path, mtime in to_index:
-            text = _extract_text(path)
-            if not text.strip():
-                continue
-
-            # Имя файла в тексте улучшает смысловое совпадение
-            stem = pathlib.Path(path).stem.replace("_", " ").replace("-", " ")
-            batch_texts.append(f"{stem}. {text}")
-            batch_paths.append(path)
-            batch_mtimes.append(mtime)
-
-            if len(batch_texts) >= BATCH_SIZE:
-                indexed += self._flush_batch(
-                    batch_texts, batch_paths, batch_mtimes, api_key
+        # Эмбеддинг идёт в отдельных потоках (до EMBED_CONCURRENCY батчей в полёте) —
+        # пока батчи летят в API, пул процессов уже разбирает следующие файлы
+        total        = len(to_index)
+        counter      = {"indexed": 0}
+        counter_lock = threading.Lock()
+        pending:      list[Future] = []
+        batch_texts:  list[str]    = []
+        batch_paths:  list[str]    = []
+        batch_mtimes: list[float]  = []
+        batch_hashes: list[str]    = []
+
+        fts_batch:    list[tuple]  = []
+        fts_done = 0
+
+        def _on_flushed(fut: Future):
+            try:
+                n = fut.result()
+            except Exception:
+                n = 0
+            with counter_lock:
+                counter["indexed"] += n
+                self._progress["indexed"] = counter["indexed"]
+                self._progress["percent"] = int(counter["indexed"] * 100 / total)
+
+        def _flush_fulltext():
+            nonlocal fts_done
+            self._fts.upsert_many(fts_batch)
+            fts_done += len(fts_batch)
+            fts_batch.clear()
+            if not embed_on:
+                self._progress["indexed"] = fts_done
+                self._progress["percent"] = int(fts_done * 100 / total)
+
+        import config
+        embed_workers = max(1, int(getattr(config, "EMBED_CONCURRENCY", 4)))
+        with ThreadPoolExecutor(max_workers=embed_workers, thread_name_prefix="semantic-embed") as embed_pool:
+
+            def _submit_batch():
+                fut = embed_pool.submit(
+                    self._flush_batch,
+                    list(batch_texts), list(batch_paths), list(batch_mtimes),
+                    api_key, list(batch_hashes),
                 )
+                fut.add_done_callback(_on_flushed)
+                pending.append(fut)
                 batch_texts.clear()
                 batch_paths.clear()
                 batch_mtimes.clear()
-                self._progress["indexed"] = indexed
-                self._progress["percent"] = int(indexed * 100 / len(to_index))
+                batch_hashes.clear()
+
+            # Текст из кэша отдаём сразу, пул процессов разбирает только новые файлы
+            cached, to_extract = self._split_text_cache(to_index, sizes)
+
+            def _all_texts() -> Iterator[tuple[str, float, str]]:
+                misses: list[tuple[str, float]] = []
+                yield from self._iter_cached_texts(cached, misses)
+                # Пропавшие и битые строки кэша — на извлечение вместе с новыми
+                yield from self._extract_and_cache(to_extract + misses, sizes)
+
+            texts = _all_texts()
+            for path, mtime, text in texts:
+                # Полнотекстовый индекс — локально, без сети; пустой текст тоже пишем,
+                # чтобы дифф по mtime не возвращал файл на следующем проходе
+                if path in fts_stale:
+                    fts_batch.append((path, mtime, pathlib.Path(path).name, text))
+                    if len(fts_batch) >= FTS_BATCH:
+                        _flush_fulltext()
+
+                if path not in emb_stale or not text.strip():
+                    continue
 
-        if batch_texts:
-            indexed += self._flush_batch(
-                batch_texts, batch_paths, batch_mtimes, api_key
-            )
+                # Имя файла в тексте улучшает смысловое совпадение
+                stem = pathlib.Path(path).stem.replace("_", " ").replace("-", " ")
+                batch_texts.append(f"{stem}. {text}")
+                batch_paths.append(path)
+                batch_mtimes.append(mtime)
+                batch_hashes.append(_content_hash(text))
+
+                if len(batch_texts) >= BATCH_SIZE:
+                    _submit_batch()
+
+            if batch_texts:
+                _submit_batch()
+            if fts_batch:
+                _flush_fulltext()
+            wait(pending)
+
+        indexed = counter["indexed"] if embed_on else fts_done
+        if embed_on:
+            self._gc_blobs()
 
         self._progress = {
             "is_indexing": False,
@@ -449,33 +1053,299 @@ class SemanticIndexer:
             pass
         return indexed
 
+    # ── Кэш извлечённого текста ───────────────────────────────────────────────
+
+    def _split_text_cache(
+        self,
+        items: list[tuple[str, float]],
+        sizes: dict[str, int],
+    ) -> tuple[list[tuple[str, float]], list[tuple[str, float]]]:
+        """Делит файлы на (есть валидный текст в кэше, надо извлекать)."""
+        tag = _extractor_tag()
+        with self._lock:
+            keys = {
+                r[0]: (r[1], r[2])
+                for r in self._conn.execute(
+                    "SELECT path, size, mtime FROM extracted_text WHERE extractor = ?",
+                    (tag,),
+                ).fetchall()
+            }
+        hits, misses = [], []
+        for path, mtime in items:
+            key = keys.get(path)
+            if key and key[0] == sizes.get(path) and abs(key[1] - mtime) <= 0.5:
+                hits.append((path, mtime))
+            else:
+                misses.append((path, mtime))
+        with self._lock:
+            self._text_stats["hits"]   += len(hits)
+            self._text_stats["misses"] += len(misses)
+        return hits, misses
+
+    def _iter_cached_texts(
+        self, items: list[tuple[str, float]], misses: list[tuple[str, float]],
+    ) -> Iterator[tuple[str, float, str]]:
+        """
+        Читает тексты из кэша кусками — весь кэш в память не поднимаем.
+        Строка, пропавшая из кэша после _split_text_cache или битая, уходит
+        в misses — вызывающий отправит её на извлечение заново.
+        """
+        for i in range(0, len(items), TEXT_CACHE_CHUNK):
+            chunk  = dict(items[i:i + TEXT_CACHE_CHUNK])
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT path, text FROM extracted_text WHERE path IN ({})".format(
+                        ",".join("?" * len(chunk))
+                    ),
+                    list(chunk),
+                ).fetchall()
+            for r in rows:
+                mtime = chunk.pop(r["path"])
+                try:
+                    text = _unpack_text(r["text"])
+                except Exception:
+                    misses.append((r["path"], mtime))
+                    continue
+                yield r["path"], mtime, text
+            misses.extend(chunk.items())
+
+    def _extract_and_cache(
+        self,
+        items: list[tuple[str, float]],
+        sizes: dict[str, int],
+    ) -> Iterator[tuple[str, float, str]]:
+        """
+        _extract_stream + запись результата в кэш. Пустой текст тоже кэшируется:
+        сканы PDF без текстового слоя иначе разбирались бы при каждом проходе.
+        """
+        tag  = _extractor_tag()
+        rows: list[tuple] = []
+
+        def _store():
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO extracted_text "
+                    "(path, size, mtime, extractor, text, extracted_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.commit()
+            rows.clear()
+
+        try:
+            for path, mtime, text in _extract_stream(items, len(items)):
+                rows.append((path, sizes.get(path, 0), mtime, tag, _pack_text(text), time.time()))
+                if len(rows) >= TEXT_CACHE_CHUNK:
+                    _store()
+                yield path, mtime, text
+        finally:
+            if rows:
+                _store()
+
+    def get_cached_text(self, path: str) -> str | None:
+        """Текст файла из кэша, если файл с тех пор не менялся; иначе None."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime, extractor, text FROM extracted_text WHERE path = ?",
+                (path,),
+            ).fetchone()
+        if (row is None or row["extractor"] != _extractor_tag()
+                or row["size"] != st.st_size or abs(row["mtime"] - st.st_mtime) > 0.5):
+            return None
+        try:
+            return _unpack_text(row["text"])
+        except Exception:
+            return None
+
     def _flush_batch(
+        self,
+        texts:   list[str],
+        paths:   list[str],
+        mtimes:  list[float],
+        api_key: str,
+        hashes:  list[str] | None = None,
+    ) -> int:
+        """
+        Пишет батч в индекс. В API уходит только текст, вектора которого ещё
+        нет в embedding_blobs: копии, бэкапы и переехавшие файлы берут готовый.
+        Вектор копии посчитан по имени первого экземпляра — содержимое то же.
+
+        Файлы с готовым вектором записываются до запроса к API — их не
+        теряет упавший эмбеддинг соседей. Параллельные вызовы не эмбеддят
+        один хэш дважды: недостающие хэши резервируются в self._inflight,
+        второй вызов ждёт первого. Готовые векторы в том же захвате
+        блокировки получают свежий last_used — _gc_blobs их не удалит.
+        Возвращает, сколько файлов записано.
+        """
+        if hashes is None:
+            hashes = [_content_hash(t) for t in texts]
+        now = time.time()
+
+        unique: dict[str, str] = {}
+        for h, text in zip(hashes, texts):
+            unique.setdefault(h, text)
+        with self._lock:
+            known = {
+                r[0] for r in self._conn.execute(
+                    "SELECT hash FROM embedding_blobs WHERE hash IN ({})".format(
+                        ",".join("?" * len(unique))
+                    ),
+                    list(unique),
+                ).fetchall()
+            }
+            self._conn.executemany(
+                "UPDATE embedding_blobs SET last_used = ? WHERE hash = ?",
+                [(now, h) for h in known],
+            )
+            self._conn.commit()
+            waiting = {h: self._inflight[h] for h in unique if h not in known and h in self._inflight}
+            missing = [h for h in unique if h not in known and h not in waiting]
+            for h in missing:
+                self._inflight[h] = threading.Event()
+
+        written = self._link_rows(texts, paths, mtimes, hashes, known, now)
+
+        embedded = False
+        try:
+            if missing:
+                vecs = _embed_batch([unique[h] for h in missing], api_key)
+                if vecs:
+                    # Сначала вектор в файл, потом запись в реестре: реестр без строки
+                    # в vector_rows не появится даже при обрыве между шагами
+                    self._vectors.append(missing, vecs)
+                    with self._lock:
+                        self._conn.executemany(
+                            "INSERT OR REPLACE INTO embedding_blobs (hash, embedding, last_used) "
+                            "VALUES (?, X'', ?)",
+                            [(h, now) for h in missing],
+                        )
+                        self._conn.commit()
+                    embedded = True
+        finally:
+            with self._lock:
+                for h in missing:
+                    self._inflight.pop(h).set()
+
+        for event in waiting.values():
+            event.wait()
+        later = set(waiting) | (set(missing) if embedded else set())
+        if later:
+            written += self._link_rows(texts, paths, mtimes, hashes, later, now)
+
+        with self._lock:
+            new = len(missing) if embedded else 0
+            self._dedup_stats["reused"] += written - new
+            self._dedup_stats["embedded"] += new
+        return written
+
+    def _link_rows(
         self,
         texts:  list[str],
         paths:  list[str],
         mtimes: list[float],
-        api_key: str,
+        hashes: list[str],
+        wanted: set[str],
+        now:    float,
     ) -> int:
-        vecs = _embed_batch(texts, api_key)
-        if not vecs:
+        """
+        Записывает в embeddings файлы батча с хэшем из wanted. Наличие вектора
+        проверяется в той же транзакции: его мог не дописать соседний вызов
+        (упал API) или удалить сборщик другого процесса — такие файлы не
+        пишем, их подхватит следующий проход.
+        """
+        if not wanted:
             return 0
-        now  = time.time()
-        rows = [
-            (path, mtime, _vec_to_blob(vec), texts[i][:300], now)
-            for i, (path, mtime, vec) in enumerate(zip(paths, mtimes, vecs))
-        ]
         with self._lock:
+            present = {
+                r[0] for r in self._conn.execute(
+                    "SELECT hash FROM embedding_blobs WHERE hash IN ({})".format(
+                        ",".join("?" * len(wanted))
+                    ),
+                    list(wanted),
+                ).fetchall()
+            }
+            rows = [
+                (path, mtime, texts[i][:300], now, h, _path_ext(path))
+                for i, (path, mtime, h) in enumerate(zip(paths, mtimes, hashes))
+                if h in present
+            ]
+            if not rows:
+                return 0
             self._conn.executemany(
                 "INSERT OR REPLACE INTO embeddings "
-                "(path, modified_at, embedding, text_preview, indexed_at) "
-                "VALUES (?, ?, ?, ?, ?)",
+                "(path, modified_at, embedding, text_preview, indexed_at, content_hash, extension) "
+                "VALUES (?, ?, X'', ?, ?, ?, ?)",
                 rows,
             )
             self._conn.commit()
+            self._rows_version += 1
         return len(rows)
 
+    def _gc_blobs(self):
+        """Удаляет векторы, на которые давно никто не ссылается."""
+        with self._lock:
+            dead = [r[0] for r in self._conn.execute(
+                "SELECT hash FROM embedding_blobs WHERE last_used < ? AND hash NOT IN ("
+                "  SELECT content_hash FROM embeddings WHERE content_hash IS NOT NULL"
+                ")",
+                (time.time() - BLOB_GRACE_SEC,),
+            ).fetchall()]
+            self._conn.executemany(
+                "DELETE FROM embedding_blobs WHERE hash = ?", [(h,) for h in dead]
+            )
+            self._conn.commit()
+        self._vectors.remove(dead)
+        self._vectors.maybe_compact()
+
     # ── Поиск ─────────────────────────────────────────────────────────────────
 
+    @staticmethod
+    def _allowed_exts(category: str) -> set[str] | None:
+        """Допустимые расширения категории: в _partition — условие extension IN (...)
+        в SQL (индекс idx_sem_ext), в search_fulltext — фильтр кандидатов BM25."""
+        if not category:
+            return None
+        return _SEARCH_CATEGORIES.get(category)
+
+    @staticmethod
+    def _ext_allowed(path: str, allowed_exts: set[str] | None) -> bool:
+        if allowed_exts is None:
+            return True
+        dot = path.rfind(".")
+        return (path[dot + 1:].lower() if dot >= 0 else "") in allowed_exts
+
+    @staticmethod
+    def _result_dict(path: str, score: float, preview: str) -> dict:
+        import datetime
+        p = pathlib.Path(path)
+        try:
+            mtime     = os.path.getmtime(path)
+            mtime_str = datetime.datetime.fromtimestamp(mtime).strftime("%d.%m.%Y %H:%M")
+            size      = os.path.getsize(path)
+        except OSError:
+            mtime_str = ""
+            size      = 0
+
+        file_ext = p.suffix.lower().lstrip(".")
+        return {
+            "id":             None,
+            "name":           p.name,
+            "path":           path,
+            "folder":         str(p.parent),
+            "extension":      file_ext,
+            "category":       _ext_to_category(file_ext),
+            "size_bytes":     size,
+            "size_human":     _human_size(size),
+            "modified_at":    0,
+            "modified_human": mtime_str,
+            "score":          round(score, 3),
+            "preview":        preview[:200],
+        }
+
     def search(
         self,
         query:    str,
@@ -490,98 +1360,182 @@ class SemanticIndexer:
         if not api_key or not query.strip():
             return []
 
-        vecs = _embed_batch([query], api_key)
-        if not vecs:
+        query_vec = self._embed_query(query, api_key)
+        if query_vec is None:
             return []
-        query_vec = np.array(vecs[0], dtype=np.float32)
-
-        # Pre-compute допустимые расширения для категории — фильтр в Python
-        # (SUFFIX в SQL дорогой; категория обычно отсекает 80%+ записей)
-        allowed_exts: set[str] | None = None
-        if category:
-            cat_map = {
-                "document": set(LIBRARY) | {"txt", "md", "rst", "csv", "pptx", "xlsx", "xls"},
-                "code":     set(FULL_TEXT),
-                "photo":    {"jpg", "jpeg", "png", "gif", "bmp", "webp", "tiff", "svg"},
-                "music":    {"mp3", "flac", "wav", "aac", "ogg", "m4a"},
-                "video":    {"mp4", "avi", "mkv", "mov", "wmv", "webm"},
-            }
-            allowed_exts = cat_map.get(category)
 
-        with self._lock:
-            rows = self._conn.execute(
-                "SELECT path, embedding, text_preview FROM embeddings"
-            ).fetchall()
-
-        if not rows:
-            return []
-
-        live_paths: list[str]        = []
-        matrix:     list[np.ndarray] = []
-        previews:   dict[str, str]   = {}
-
-        for r in rows:
-            p = r["path"]
-            # Быстрый фильтр по расширению ДО os.path.isfile() — экономит I/O
-            if allowed_exts is not None:
-                dot = p.rfind(".")
-                ext = p[dot + 1:].lower() if dot >= 0 else ""
-                if ext not in allowed_exts:
-                    continue
-            if not os.path.isfile(p):   # исключаем папки и несуществующие пути
-                continue
-            live_paths.append(p)
-            matrix.append(_blob_to_vec(r["embedding"]))
-            previews[p] = r["text_preview"] or ""
-
-        if not matrix:
+        part = self._partition(category)
+        if part is None:
             return []
 
-        mat       = np.array(matrix, dtype=np.float32)
-        mat_norms = np.linalg.norm(mat, axis=1)
-        q_norm    = float(np.linalg.norm(query_vec))
+        q_norm = float(np.linalg.norm(query_vec))
         if q_norm < 1e-9:
             return []
 
-        sims    = (mat @ query_vec) / (mat_norms * q_norm + 1e-9)
+        query_vec = np.asarray(query_vec, dtype=np.float32)
+        if part.rows is None:
+            sims = (part.mat @ query_vec) / (part.norms * q_norm + 1e-9)
+        else:
+            # Без категории: один проход по всей матрице (страницы из кэша ОС),
+            # потом выборка живых строк
+            sims_all = (part.mat @ query_vec) / (part.norms * q_norm + 1e-9)
+            sims     = sims_all[part.rows]
         top_idx = np.argsort(sims)[::-1]
 
-        import datetime
         results = []
         for idx in top_idx:
             score = float(sims[idx])
             if score < SIM_THRESH:
                 break
-            path = live_paths[idx]
-            p    = pathlib.Path(path)
-            try:
-                mtime     = os.path.getmtime(path)
-                mtime_str = datetime.datetime.fromtimestamp(mtime).strftime("%d.%m.%Y %H:%M")
-                size      = os.path.getsize(path)
-            except OSError:
-                mtime_str = ""
-                size      = 0
-
-            file_ext = p.suffix.lower().lstrip(".")
-            results.append({
-                "id":             None,
-                "name":           p.name,
-                "path":           path,
-                "folder":         str(p.parent),
-                "extension":      file_ext,
-                "category":       _ext_to_category(file_ext),
-                "size_bytes":     size,
-                "size_human":     _human_size(size),
-                "modified_at":    0,
-                "modified_human": mtime_str,
-                "score":          round(score, 3),
-                "preview":        previews[path][:200],
-            })
+            path = part.paths[idx]
+            # Папки и удалённые файлы отсеиваем только среди кандидатов —
+            # раньше os.path.isfile() шёл по всем строкам индекса
+            if not os.path.isfile(path):
+                continue
+            results.append(self._result_dict(path, score, part.previews[idx]))
             if len(results) >= limit:
                 break
 
         return results
 
+    def _partition(self, category: str) -> "_Partition | None":
+        """
+        Резидентный срез индекса под категорию. Фильтр по extension выполняет
+        SQLite (индекс idx_sem_ext), срез категории хранится отдельной
+        непрерывной подматрицей — запрос трогает только её. Срезы сбрасываются
+        при изменении embeddings (этим процессом или другим — PRAGMA data_version)
+        и при новой версии VectorStore.
+        """
+        allowed = self._allowed_exts(category)
+        key     = category if allowed is not None else ""
+
+        sql = (
+            "SELECT e.path, e.text_preview, r.row "
+            "FROM embeddings e JOIN vector_rows r ON r.hash = e.content_hash "
+            "WHERE e.missing_since IS NULL"
+        )
+        params: list = []
+        if allowed is not None:
+            sql += " AND e.extension IN ({})".format(",".join("?" * len(allowed)))
+            params = sorted(allowed)
+
+        for _ in range(PARTITION_RETRIES):
+            # memmap без копирования; переоткрывается только при смене версии
+            mat, norms, vec_version = self._vectors.snapshot()
+            if mat is None:
+                return None
+            with self._lock:
+                data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+                version = (data_version, self._rows_version, vec_version)
+            with self._part_lock:
+                if self._part_version != version:
+                    self._parts.clear()
+                    self._part_version = version
+                part = self._parts.get(key)
+            if part is not None:
+                return part
+
+            # Версия и vector_rows — одним чтением: в одной транзакции и под
+            # тем же lock, что у записи этого процесса. Снимок матрицы старше
+            # этой версии (append/compact между ними) — строки не его, заново
+            with self._lock:
+                self._conn.commit()
+                self._conn.execute("BEGIN")
+                try:
+                    stored = self._vectors.stored_version()
+                    rows   = self._conn.execute(sql, params).fetchall() if stored == vec_version else None
+                finally:
+                    self._conn.commit()
+            if rows is not None:
+                break
+        else:
+            return None
+
+        # Строки, дописанные другим процессом после снимка матрицы, — до следующей версии
+        rows = [r for r in rows if r["row"] < len(mat)]
+        if not rows:
+            return None
+
+        idx      = np.fromiter((r["row"] for r in rows), dtype=np.int64, count=len(rows))
+        paths    = [r["path"] for r in rows]
+        previews = [r["text_preview"] or "" for r in rows]
+        if allowed is None:
+            part = _Partition(mat, norms, idx, paths, previews)
+        else:
+            part = _Partition(np.ascontiguousarray(mat[idx]), norms[idx], None, paths, previews)
+
+        # Срез согласован со своим снимком; кэшируем, только если версия с тех пор не ушла
+        with self._lock:
+            moved = self._vectors.stored_version() != vec_version
+        with self._part_lock:
+            if self._part_version == version and not moved:
+                self._parts[key] = part
+        return part
+
+    def search_fulltext(
+        self,
+        query:    str,
+        limit:    int = 5,
+        category: str = "",
+    ) -> list[dict]:
+        """
+        Локальный BM25-поиск по тексту файлов — без сети, за миллисекунды.
+        score нормирован к лучшему результату (0–1).
+        """
+        if not query.strip():
+            return []
+        allowed_exts = self._allowed_exts(category)
+        # Запас на фильтр категории и удалённые с диска файлы
+        hits, terms = self._fts.search(query, limit=limit * 4 if allowed_exts else limit * 2)
+
+        results: list[dict] = []
+        top = hits[0][1] if hits else 0.0
+        for path, score in hits:
+            if not self._ext_allowed(path, allowed_exts) or not os.path.isfile(path):
+                continue
+            text = self.get_cached_text(path) or ""
+            results.append(self._result_dict(
+                path, score / top if top > 0 else 0.0, snippet(text, terms),
+            ))
+            if len(results) >= limit:
+                break
+        return results
+
+    def search_content(
+        self,
+        query:    str,
+        api_key:  str,
+        limit:    int = 5,
+        category: str = "",
+        mode:     str = "auto",
+    ) -> list[dict]:
+        """
+        Поиск по содержимому с выбором движка:
+          semantic — только эмбеддинги (нужен ключ и сеть)
+          fulltext — только локальный BM25
+          hybrid   — оба, слияние через Reciprocal Rank Fusion
+          auto     — hybrid если есть ключ, иначе fulltext
+        Если семантика не ответила (нет сети), hybrid отдаёт полнотекстовые результаты.
+        """
+        if mode == "auto":
+            mode = "hybrid" if api_key else "fulltext"
+        if mode == "semantic":
+            return self.search(query, api_key, limit=limit, category=category)
+        if mode == "fulltext" or not api_key:
+            return self.search_fulltext(query, limit=limit, category=category)
+
+        # Глубина кандидатов больше limit — иначе RRF нечего сливать
+        depth = max(limit * 3, 20)
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="content-search") as pool:
+            sem_fut = pool.submit(self.search, query, api_key, depth, category)
+            fts_fut = pool.submit(self.search_fulltext, query, depth, category)
+            fts = fts_fut.result()
+            try:
+                sem = sem_fut.result()
+            except Exception:
+                sem = []
+        return rrf_merge([sem, fts], ["semantic", "fulltext"], limit)
+
     # ── Управление ────────────────────────────────────────────────────────────
 
     def remove_file(self, path: str):
@@ -591,18 +1545,247 @@ class SemanticIndexer:
         """Удалить файл или папку (все вложенные пути) из семантического индекса."""
         prefix = path.rstrip("/\\") + os.sep
         with self._lock:
+            # Вектор остаётся в embedding_blobs ещё BLOB_GRACE_SEC: если это
+            # переезд, watcher добавит новый путь и вектор переиспользуется
+            self._conn.execute(
+                "UPDATE embedding_blobs SET last_used = ? WHERE hash IN ("
+                "  SELECT content_hash FROM embeddings WHERE path = ? OR path LIKE ?"
+                ")",
+                (time.time(), path, prefix + "%"),
+            )
             self._conn.execute(
                 "DELETE FROM embeddings WHERE path = ? OR path LIKE ?",
                 (path, prefix + "%"),
             )
+            self._rows_version += 1
+            self._conn.execute(
+                "DELETE FROM extracted_text WHERE path = ? OR path LIKE ?",
+                (path, prefix + "%"),
+            )
             self._conn.commit()
+        self._fts.remove_path(path, prefix)
+        with self._watch_cond:
+            for p in [p for p in self._watch_pending if p == path or p.startswith(prefix)]:
+                del self._watch_pending[p]
+
+    # ── Обслуживание ──────────────────────────────────────────────────────────
+    #
+    # Watcher сообщает не обо всех удалениях: файлы, стёртые пока сервер был
+    # выключен, и файлы на отключённых дисках оставались в индексе навсегда и
+    # участвовали в каждом запросе. Фоновое обслуживание раз в MAINT_INTERVAL_SEC:
+    # сборка сирот батчами, GC векторов и компактизация .npy, incremental VACUUM,
+    # REINDEX / PRAGMA optimize, quick_check. Итог — в get_status()["maintenance"].
+
+    def _maintenance_loop(self):
+        time.sleep(MAINT_FIRST_DELAY_SEC)
+        while True:
+            try:
+                if self._progress.get("is_indexing"):
+                    time.sleep(60)   # не конкурируем с индексацией за блокировку
+                    continue
+                self.run_maintenance()
+            except Exception as e:
+                try:
+                    print(f"    [semantic] Ошибка обслуживания: {e}")
+                except Exception:
+                    pass
+            time.sleep(MAINT_INTERVAL_SEC)
+
+    @staticmethod
+    def _volume_online(path: str) -> bool:
+        """Диск/шара пути подключены — иначе отсутствие файла ничего не значит."""
+        anchor = pathlib.Path(path).anchor
+        return not anchor or os.path.exists(anchor)
+
+    def _remove_exact(self, paths: list[str]):
+        """Как remove_path, но для списка точных путей (без LIKE-сканов)."""
+        if not paths:
+            return
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(paths), TEXT_CACHE_CHUNK):
+                chunk = paths[i:i + TEXT_CACHE_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                self._conn.execute(
+                    f"UPDATE embedding_blobs SET last_used = ? WHERE hash IN ("
+                    f"  SELECT content_hash FROM embeddings WHERE path IN ({marks})"
+                    f")",
+                    [now, *chunk],
+                )
+                self._conn.execute(f"DELETE FROM embeddings WHERE path IN ({marks})", chunk)
+                self._conn.execute(f"DELETE FROM extracted_text WHERE path IN ({marks})", chunk)
+            self._rows_version += 1
+            self._conn.commit()
+        self._fts.remove_exact(paths)
+
+    def _gc_orphans(self, table: str, key: str, track_offline: bool) -> dict:
+        """
+        Проходит таблицу батчами по rowid. Файл пропал на подключённом диске —
+        удаляем сразу. Диск отключён — в embeddings помечаем missing_since
+        (строка выпадает из поиска) и удаляем через MAINT_OFFLINE_GRACE_SEC.
+        """
+        removed = offline = restored = 0
+        cursor  = 0
+        while True:
+            cols = f"{key}, path" + (", missing_since" if track_offline else "")
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT {cols} FROM {table} WHERE {key} > ? ORDER BY {key} LIMIT ?",
+                    (cursor, MAINT_BATCH),
+                ).fetchall()
+            if not rows:
+                break
+            cursor = rows[-1][0]
+            now    = time.time()
+            gone:  list[str]          = []
+            marks: list[tuple]        = []
+            for r in rows:
+                path    = r[1]
+                missing = r[2] if track_offline else None
+                if os.path.exists(path):
+                    if missing is not None:
+                        marks.append((None, path))
+                        restored += 1
+                elif self._volume_online(path):
+                    gone.append(path)
+                elif track_offline:
+                    offline += 1
+                    if missing is None:
+                        marks.append((now, path))
+                    elif now - missing > MAINT_OFFLINE_GRACE_SEC:
+                        gone.append(path)
+            if marks:
+                with self._lock:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET missing_since = ? WHERE path = ?", marks
+                    )
+                    self._rows_version += 1
+                    self._conn.commit()
+            self._remove_exact(gone)
+            removed += len(gone)
+            time.sleep(MAINT_PAUSE_SEC)   # отдаём блокировку поиску
+        return {"removed": removed, "offline": offline, "restored": restored}
+
+    def _vacuum(self) -> int:
+        """incremental_vacuum порциями; первый запуск переводит БД в auto_vacuum=INCREMENTAL."""
+        with self._lock:
+            self._conn.commit()
+            if self._conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                # Режим меняется только полным VACUUM — один раз
+                self._conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                self._conn.execute("VACUUM")
+        freed = 0
+        while True:
+            with self._lock:
+                free = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if not free:
+                    break
+                step = min(free, MAINT_VACUUM_PAGES)
+                self._conn.execute(f"PRAGMA incremental_vacuum({step})").fetchall()
+                self._conn.commit()
+            freed += step
+            time.sleep(MAINT_PAUSE_SEC)
+        return freed
+
+    def _db_stats(self) -> dict:
+        with self._lock:
+            page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+            pages     = self._conn.execute("PRAGMA page_count").fetchone()[0]
+            free      = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+            offline   = self._conn.execute(
+                "SELECT COUNT(*) FROM embeddings WHERE missing_since IS NOT NULL"
+            ).fetchone()[0]
+        vec = self._vectors.get_stats()
+        return {
+            "db_bytes":          pages * page_size,
+            "free_bytes":        free * page_size,
+            "free_ratio":        round(free / pages, 3) if pages else 0.0,
+            "vector_dead_ratio": round(vec["dead"] / vec["rows"], 3) if vec["rows"] else 0.0,
+            "offline_rows":      offline,
+        }
+
+    def run_maintenance(self) -> dict:
+        """Один проход обслуживания; отчёт сохраняется для get_status()."""
+        if not self._maint_lock.acquire(blocking=False):
+            return dict(self._maint_report)   # уже идёт
+        try:
+            started = time.time()
+            before  = self._db_stats()
+            orphans = {
+                "embeddings": self._gc_orphans("embeddings", "rowid", track_offline=True),
+                "fulltext":   self._gc_orphans("fulltext_files", "id", track_offline=False)
+                              if self._fts.available else {},
+                "text_cache": self._gc_orphans("extracted_text", "rowid", track_offline=False),
+            }
+            self._gc_blobs()   # заодно компактизирует vectors.npy при ≥25% надгробий
+            with self._lock:
+                self._conn.execute(
+                    "DELETE FROM query_cache WHERE rowid NOT IN ("
+                    "  SELECT rowid FROM query_cache ORDER BY used_at DESC LIMIT ?"
+                    ")",
+                    (QUERY_CACHE_MAX_ROWS,),
+                )
+                self._conn.commit()
+            freed_pages = self._vacuum()
+            with self._lock:
+                self._conn.execute("REINDEX embeddings")
+                if self._fts.available:
+                    self._conn.execute("INSERT INTO fulltext(fulltext) VALUES ('optimize')")
+                self._conn.execute("PRAGMA optimize")
+                self._conn.commit()
+                check = self._conn.execute("PRAGMA quick_check").fetchone()[0]
+            report = {
+                "last_run":     started,
+                "duration_sec": round(time.time() - started, 2),
+                "orphans":      orphans,
+                "freed_pages":  freed_pages,
+                "integrity":    check,
+                "before":       before,
+            }
+            self._maint_report = report
+            try:
+                removed = sum(o.get("removed", 0) for o in orphans.values())
+                print(f"    [semantic] Обслуживание: удалено сирот {removed}, "
+                      f"освобождено страниц {freed_pages}, integrity={check}")
+            except Exception:
+                pass
+            return report
+        finally:
+            self._maint_lock.release()
 
     def get_status(self) -> dict:
+        import config
+        try:
+            from database.files.embed_client import get_embed_client
+            api_key = getattr(config, "OPENAI_API_KEY", "")
+            client  = get_embed_client(api_key, EMBED_MODEL).get_stats() if api_key else {}
+        except Exception:
+            client = {}
         with self._lock:
             count = self._conn.execute(
                 "SELECT COUNT(*) FROM embeddings"
             ).fetchone()[0]
-        return {"indexed_files": count, **self._progress}
+            vectors = self._conn.execute(
+                "SELECT COUNT(*) FROM embedding_blobs"
+            ).fetchone()[0]
+            dedup = dict(self._dedup_stats)
+            text_rows = self._conn.execute(
+                "SELECT COUNT(*) FROM extracted_text"
+            ).fetchone()[0]
+            text_cache = {**self._text_stats, "rows": text_rows}
+        return {
+            "indexed_files": count,
+            "unique_vectors": vectors,
+            "dedup":         dedup,
+            "text_cache":    text_cache,
+            "watch_queue":   self.get_watch_stats(),
+            "vector_store":  self._vectors.get_stats(),
+            "fulltext":      {"available": self._fts.available, "documents": self._fts.count()},
+            "maintenance":   {**self._db_stats(), "last": self._maint_report},
+            **self._progress,
+            "query_cache":   self.get_query_cache_stats(),
+            "embed_client":  client,
+        }
 
 
 def _human_size(b: int) -> str:
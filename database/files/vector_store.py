@@ -0,0 +1,271 @@
+"""
+vector_store.py — векторы семантического индекса в memory-mapped .npy файле.
+
+  • vectors.<gen>.npy — append-only матрица float32 (N × dim), обычный .npy:
+    заголовок фиксированной длины (128 байт) переписывается на месте при
+    дописывании строк, данные открываются через np.memmap(mode="r") без копий
+  • vector_rows (hash → row) в semantic.db — какая строка файла чья
+  • строка без записи в vector_rows — «надгробие»; compact() переписывает
+    живые строки в файл следующего поколения
+  • vector_meta.version растёт при каждой записи — читатели (в том числе
+    другой процесс: API + CLI) по нему понимают, что пора переоткрыть файл;
+    страницы файла общие через кэш ОС
+
+Запись сериализуется транзакцией BEGIN IMMEDIATE в SQLite — это же и
+межпроцессная блокировка.
+"""
+
+import os
+import pathlib
+import sqlite3
+import struct
+import threading
+
+import numpy as np
+
+# ── Константы ─────────────────────────────────────────────────────────────────
+
+HEADER_LEN        = 128            # фиксированный заголовок .npy v1.0 (кратен 64)
+NPY_MAGIC         = b"\x93NUMPY\x01\x00"
+COMPACT_MIN_DEAD  = 1000           # меньше надгробий — не трогаем файл
+COMPACT_DEAD_FRAC = 0.25           # и только если мёртвых строк ≥ 25%
+COPY_CHUNK_ROWS   = 4096
+
+
+def _header(rows: int, dim: int) -> bytes:
+    """Заголовок .npy фиксированной длины — np.load читает файл как обычно."""
+    text = "{'descr': '<f4', 'fortran_order': False, 'shape': (%d, %d), }" % (rows, dim)
+    body = text.ljust(HEADER_LEN - len(NPY_MAGIC) - 2 - 1) + "\n"
+    return NPY_MAGIC + struct.pack("<H", len(body)) + body.encode("latin1")
+
+
+# ── VectorStore ───────────────────────────────────────────────────────────────
+
+class VectorStore:
+    def __init__(
+        self,
+        directory: pathlib.Path,
+        conn:      sqlite3.Connection,
+        lock:      threading.Lock,
+        dim:       int,
+    ):
+        self._dir  = pathlib.Path(directory)
+        self._conn = conn
+        self._lock = lock
+        self.dim   = dim
+        # Резидентная копия: memmap + нормы строк, действительны для _version
+        self._mm:      np.ndarray | None = None
+        self._norms:   np.ndarray | None = None
+        self._version  = -1
+        self._gen      = -1
+        self._view_lock = threading.Lock()
+
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS vector_rows (
+                    hash TEXT PRIMARY KEY,
+                    row  INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS vector_meta (
+                    key   TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO vector_meta (key, value) VALUES
+                    ('generation', 0), ('rows', 0), ('version', 0);
+            """)
+            self._conn.commit()
+        self._sweep_old_generations()
+
+    # ── Метаданные ────────────────────────────────────────────────────────────
+
+    def _meta(self) -> dict[str, int]:
+        """Вызывать под self._lock."""
+        return dict(self._conn.execute("SELECT key, value FROM vector_meta").fetchall())
+
+    def _file(self, gen: int) -> pathlib.Path:
+        return self._dir / f"vectors.{gen}.npy"
+
+    def _sweep_old_generations(self):
+        """Удаляет файлы прошлых поколений (на Windows мог держать другой процесс)."""
+        with self._lock:
+            gen = self._meta()["generation"]
+        for f in self._dir.glob("vectors.*.npy"):
+            if f.name != self._file(gen).name:
+                try:
+                    f.unlink()
+                except OSError:
+                    pass
+
+    # ── Запись ────────────────────────────────────────────────────────────────
+
+    def append(self, hashes: list[str], vecs) -> None:
+        """Дописывает векторы в конец файла и регистрирует их строки."""
+        if not hashes:
+            return
+        mat = np.ascontiguousarray(np.asarray(vecs, dtype="<f4"))
+        if mat.ndim != 2 or mat.shape[1] != self.dim:
+            raise ValueError(f"ожидалась размерность {self.dim}, получено {mat.shape}")
+
+        with self._lock:
+            self._conn.commit()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                meta  = self._meta()
+                start = meta["rows"]
+                path  = self._file(meta["generation"])
+                if not path.exists():
+                    path.write_bytes(_header(0, self.dim))
+                with open(path, "r+b") as f:
+                    # Пишем по счётчику из БД, а не в конец файла: хвост от
+                    # оборванной записи просто перезаписывается
+                    f.seek(HEADER_LEN + start * self.dim * 4)
+                    f.write(mat.tobytes())
+                    f.seek(0)
+                    f.write(_header(start + len(mat), self.dim))
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO vector_rows (hash, row) VALUES (?, ?)",
+                    [(h, start + i) for i, h in enumerate(hashes)],
+                )
+                self._conn.execute(
+                    "UPDATE vector_meta SET value = ? WHERE key = 'rows'", (start + len(mat),)
+                )
+                self._conn.execute(
+                    "UPDATE vector_meta SET value = value + 1 WHERE key = 'version'"
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def remove(self, hashes: list[str]) -> None:
+        """Надгробия: строка остаётся в файле до compact()."""
+        if not hashes:
+            return
+        with self._lock:
+            self._conn.executemany("DELETE FROM vector_rows WHERE hash = ?", [(h,) for h in hashes])
+            self._conn.execute("UPDATE vector_meta SET value = value + 1 WHERE key = 'version'")
+            self._conn.commit()
+
+    def maybe_compact(self) -> bool:
+        stats = self.get_stats()
+        if stats["dead"] >= COMPACT_MIN_DEAD and stats["dead"] >= stats["rows"] * COMPACT_DEAD_FRAC:
+            self.compact()
+            return True
+        return False
+
+    def compact(self) -> None:
+        """Переписывает живые строки в файл нового поколения."""
+        with self._lock:
+            self._conn.commit()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                meta = self._meta()
+                live = self._conn.execute(
+                    "SELECT hash, row FROM vector_rows ORDER BY row"
+                ).fetchall()
+                old_path = self._file(meta["generation"])
+                new_gen  = meta["generation"] + 1
+                new_path = self._file(new_gen)
+
+                old = None
+                if meta["rows"] and old_path.exists():
+                    old = np.memmap(old_path, dtype="<f4", mode="r",
+                                    offset=HEADER_LEN, shape=(meta["rows"], self.dim))
+                with open(new_path, "wb") as f:
+                    f.write(_header(len(live), self.dim))
+                    for i in range(0, len(live), COPY_CHUNK_ROWS):
+                        rows = [r[1] for r in live[i:i + COPY_CHUNK_ROWS]]
+                        f.write(np.ascontiguousarray(old[rows]).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                del old
+
+                self._conn.executemany(
+                    "UPDATE vector_rows SET row = ? WHERE hash = ?",
+                    [(i, r[0]) for i, r in enumerate(live)],
+                )
+                self._conn.execute("UPDATE vector_meta SET value = ? WHERE key = 'generation'", (new_gen,))
+                self._conn.execute("UPDATE vector_meta SET value = ? WHERE key = 'rows'", (len(live),))
+                self._conn.execute("UPDATE vector_meta SET value = value + 1 WHERE key = 'version'")
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        with self._view_lock:
+            self._mm = self._norms = None
+            self._version = self._gen = -1
+        try:
+            old_path.unlink()
+        except OSError:
+            pass   # файл ещё отображён другим процессом — удалит следующий старт
+
+    # ── Чтение ────────────────────────────────────────────────────────────────
+
+    def matrix(self) -> tuple[np.ndarray | None, np.ndarray | None]:
+        """
+        (memmap N×dim, нормы строк) — без копирования данных.
+        Переоткрывается только если vector_meta.version изменилась; при простом
+        дописывании нормы досчитываются лишь для новых строк.
+        """
+        mm, norms, _ = self.snapshot()
+        return mm, norms
+
+    def snapshot(self) -> tuple[np.ndarray | None, np.ndarray | None, int]:
+        """matrix() вместе с версией, которой этот снимок соответствует."""
+        with self._lock:
+            meta = self._meta()
+        with self._view_lock:
+            if meta["version"] == self._version:
+                return self._mm, self._norms, self._version
+            rows, gen = meta["rows"], meta["generation"]
+            path = self._file(gen)
+            if rows == 0 or not path.exists():
+                self._mm, self._norms = None, None
+            else:
+                mm = np.memmap(path, dtype="<f4", mode="r", offset=HEADER_LEN, shape=(rows, self.dim))
+                prev = 0
+                if (gen == self._gen and self._norms is not None
+                        and self._mm is not None and len(self._mm) <= rows):
+                    prev = len(self._mm)
+                fresh = np.linalg.norm(mm[prev:], axis=1).astype(np.float32)
+                self._norms = np.concatenate([self._norms[:prev], fresh]) if prev else fresh
+                self._mm = mm
+            self._version, self._gen = meta["version"], gen
+            return self._mm, self._norms, self._version
+
+    def stored_version(self) -> int:
+        """vector_meta.version в БД сейчас. Вызывать под общим lock."""
+        return self._meta()["version"]
+
+    @property
+    def version(self) -> int:
+        """Версия последнего снимка matrix() (−1 — ещё не открывали)."""
+        return self._version
+
+    def get(self, hash_: str) -> np.ndarray | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT row FROM vector_rows WHERE hash = ?", (hash_,)
+            ).fetchone()
+        mm, _ = self.matrix()
+        if row is None or mm is None or row[0] >= len(mm):
+            return None
+        return np.array(mm[row[0]])
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            meta = self._meta()
+            live = self._conn.execute("SELECT COUNT(*) FROM vector_rows").fetchone()[0]
+        try:
+            size = self._file(meta["generation"]).stat().st_size
+        except OSError:
+            size = 0
+        return {
+            "rows":       meta["rows"],
+            "live":       live,
+            "dead":       max(0, meta["rows"] - live),
+            "generation": meta["generation"],
+            "file_bytes": size,
+        }
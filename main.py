@@ -41,7 +41,7 @@ from config import (
 import speech.STT.stt as _stt_module
 from speech.STT.stt import STT, get_stt
 from speech.TTS.tts_v2 import TTS
-from ai.brain import Brain
+from ai.brain import Brain, start_keep_warm
 from speech.STT.recorder import Recorder
 from speech.STT.wake_word import wait_for_wake_word, StopListener
 from utils.ramdisk import setup_vosk_ramdisk
@@ -109,6 +109,21 @@ def handle_query(stt: STT, tts: TTS, brain: Brain,
     return text
 
 
+def answer(text: str, stt: STT, tts: TTS, brain: Brain) -> str:
+    """
+    GPT → TTS потоком: ответ режется на предложения по мере генерации,
+    первое звучит, пока модель пишет остальные. Стоп-слово прерывает речь.
+    """
+    print()
+    with StopListener(stt, tts, on_stop=brain.cancel):
+        response = tts.speak_stream(
+            brain.think_stream(text),
+            on_sentence=lambda s: print(f"  Jarvis: {s}"),
+        )
+    print()
+    return response
+
+
 # ── Главный цикл ─────────────────────────────────────────────────────────────
 
 def main():
@@ -142,6 +157,9 @@ def main():
     recorder = Recorder()
     recorder.calibrate()
 
+    # Соединение с OpenAI тёплое, пока ждём wake word — первый ответ без TLS-рукопожатия
+    start_keep_warm()
+
     print(f"\n[✓] Jarvis готов!\n")
     tts.speak(lang["ready"])
 
@@ -177,10 +195,7 @@ def main():
 
         # ── Шаг 3: GPT → TTS ─────────────────────────────────────────────────
         print(f"  [*] {lang['thinking']}")
-        response = brain.think(text)
-        print(f"\n  Jarvis: {response}\n")
-        with StopListener(stt, tts):
-            tts.speak(response)
+        answer(text, stt, tts, brain)
 
         # ── Шаг 4: Followup — слушаем продолжение без wake word ──────────────
         followup_end = time.time() + FOLLOWUP_SECONDS
@@ -216,10 +231,7 @@ def main():
 
             # Отвечаем на продолжение
             print(f"  [*] {lang['thinking']}")
-            response = brain.think(followup_text)
-            print(f"\n  Jarvis: {response}\n")
-            with StopListener(stt, tts):
-                tts.speak(response)
+            answer(followup_text, stt, tts, brain)
 
             # Предварительная инициализация перед следующим слушанием
             recorder.prepare()
@@ -137,6 +137,9 @@ class StopListener:
 
         with StopListener(stt, tts):
             tts.speak(response)
+
+    on_stop — вызывается вместе с tts.stop(), например brain.cancel:
+    стоп-слово обрывает и генерацию ответа, а не только звук.
     """
 
     _CHUNK_SIZE    = int(SAMPLE_RATE * 0.08)
@@ -144,9 +147,10 @@ class StopListener:
     _SILENCE_CHUNKS = 5     # ~400 мс тишины
     _MAX_CHUNKS    = 25     # ~2 сек максимум
 
-    def __init__(self, stt, tts):
+    def __init__(self, stt, tts, on_stop=None):
         self._stt     = stt
         self._tts     = tts
+        self._on_stop = on_stop
         self._active  = threading.Event()
         self._thread  = None
 
@@ -213,6 +217,8 @@ class StopListener:
                             if _is_stop_word(text):
                                 print("  [✓] Прерывание речи!")
                                 self._tts.stop()
+                                if self._on_stop is not None:
+                                    self._on_stop()
                                 self._active.clear()
                                 return
                             speech_buf.clear()
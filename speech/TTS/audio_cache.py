@@ -0,0 +1,104 @@
+"""
+audio_cache.py — озвученные фразы на диске.
+
+LRU в памяти у TTS живёт до перезапуска; здесь — синтезированное аудио
+файлами в speech/TTS/audio_cache/. Ответ из кэша ответов (ai/response_cache.py)
+режется на те же предложения, что и в первый раз, — их звук берётся отсюда
+без синтеза.
+
+  • ключ — хэш голоса, его настроек и текста: смена голоса/скорости не
+    отдаёт старую запись
+  • tts_v3 хранит MP3 от Edge TTS, tts_v2 — PCM int16 от Piper
+  • больше MAX_FILES файлов — удаляются давно не звучавшие (по mtime,
+    который обновляется при каждом чтении)
+"""
+
+import hashlib
+import os
+import pathlib
+import threading
+
+# ── Константы ─────────────────────────────────────────────────────────────────
+
+CACHE_DIR   = pathlib.Path(__file__).parent / "audio_cache"
+MAX_FILES   = 2000
+PRUNE_EVERY = 50      # проверка лимита — раз в столько записей
+
+
+class AudioCache:
+    def __init__(self, directory: pathlib.Path | str = CACHE_DIR, max_files: int = MAX_FILES):
+        self._dir    = pathlib.Path(directory)
+        self._max    = max_files
+        self._lock   = threading.Lock()
+        self._writes = 0
+        self._stats  = {"hits": 0, "misses": 0, "writes": 0}
+
+    def _path(self, text: str, variant: tuple, ext: str) -> pathlib.Path:
+        h = hashlib.blake2b(digest_size=16)
+        for part in (*variant, text):
+            h.update(str(part).encode("utf-8", errors="replace"))
+            h.update(b"\0")
+        return self._dir / f"{h.hexdigest()}.{ext}"
+
+    def get(self, text: str, variant: tuple, ext: str) -> bytes | None:
+        path = self._path(text, variant, ext)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+        with self._lock:
+            self._stats["hits"] += 1
+        return data
+
+    def put(self, text: str, variant: tuple, ext: str, data: bytes) -> None:
+        if not data:
+            return
+        path = self._path(text, variant, ext)
+        try:
+            self._dir.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(path.suffix + ".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            try:
+                print(f"  [!] Кэш озвучки: {e}")
+            except Exception:
+                pass
+            return
+        with self._lock:
+            self._stats["writes"] += 1
+            self._writes += 1
+            prune = self._writes % PRUNE_EVERY == 0
+        if prune:
+            self._prune()
+
+    def _prune(self):
+        try:
+            files = sorted(
+                (p for p in self._dir.iterdir() if p.suffix != ".tmp"),
+                key=lambda p: p.stat().st_mtime,
+            )
+            for p in files[:max(0, len(files) - self._max)]:
+                p.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+_cache: AudioCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_audio_cache() -> AudioCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AudioCache()
+    return _cache
@@ -35,6 +35,7 @@ import wave
 import random
 import threading
 import collections
+from typing import Iterable
 import numpy as np
 import sounddevice as sd
 import config
@@ -268,34 +269,81 @@ class TTS:
                 print(f"  [!] TTS v2 ошибка: {e}")
             return
 
-        # Несколько предложений — конвейер: синтез следующего пока играет текущее.
-        # Очередь с буфером 2: продюсер всегда на шаг впереди плеера.
+        self._pipeline(sentences)
+
+    def speak_stream(self, sentences: Iterable[str], on_sentence=None) -> str:
+        """
+        Озвучивает предложения по мере поступления (Brain.think_stream):
+        первое играет, пока модель ещё пишет остальные. on_sentence(s) —
+        вызывается на каждое полученное предложение (вывод, UI).
+        Возвращает весь текст ответа. Блокирует до конца.
+        """
+        self._stop_evt.clear()
+        if not self._voice:
+            spoken = []
+            for s in sentences:
+                spoken.append(s)
+                self._notify(on_sentence, s)
+                print(f"  [TTS] {s}")
+            return " ".join(spoken)
+        return self._pipeline(sentences, on_sentence)
+
+    @staticmethod
+    def _notify(on_sentence, sentence: str):
+        if on_sentence is None:
+            return
+        try:
+            on_sentence(sentence)
+        except Exception as e:
+            print(f"  [!] TTS on_sentence: {e}")
+
+    def _pipeline(self, sentences: Iterable[str], on_sentence=None) -> str:
+        """
+        Конвейер: синтез следующего предложения пока играет текущее.
+        Очередь с буфером 2: продюсер всегда на шаг впереди плеера.
+        После stop() источник всё равно дочитывается (без синтеза) —
+        у стрима модели должен закончиться ответ.
+        """
         audio_q: queue.Queue = queue.Queue(maxsize=2)
+        spoken:  list[str]   = []
 
         def _producer():
-            for s in sentences:
-                if self._stop_evt.is_set():
-                    break
-                a = self._get_cache(s)
-                if a is None:
-                    a = self._synthesize(s)
+            try:
+                for s in sentences:
+                    spoken.append(s)
+                    self._notify(on_sentence, s)
+                    if self._stop_evt.is_set():
+                        continue
+                    a = self._get_cache(s)
+                    if a is None:
+                        a = self._synthesize(s)
+                        if a is not None:
+                            self._add_cache(s, a)
                     if a is not None:
-                        self._add_cache(s, a)
-                audio_q.put(a)
-            audio_q.put(None)  # сигнал окончания
+                        audio_q.put(a)
+            except Exception as e:
+                print(f"  [!] TTS v2 поток текста: {e}")
+            finally:
+                audio_q.put(None)  # сигнал окончания
 
-        threading.Thread(target=_producer, daemon=True, name="tts-producer").start()
+        producer = threading.Thread(target=_producer, daemon=True, name="tts-producer")
+        producer.start()
 
-        TTS.is_speaking = True
         try:
             while True:
                 a = audio_q.get()
-                if a is None or self._stop_evt.is_set():
+                if a is None:
                     break
+                if self._stop_evt.is_set():
+                    continue   # дочитываем очередь, чтобы продюсер не завис на put()
+                TTS.is_speaking = True
                 self._play(a)
         finally:
-            time.sleep(ECHO_PAUSE)
+            producer.join()
+            if TTS.is_speaking:
+                time.sleep(ECHO_PAUSE)
             TTS.is_speaking = False
+        return " ".join(spoken)
 
     def speak_activation(self):
         """Случайная фраза активации — мгновенно из кэша."""
@@ -322,8 +370,21 @@ class TTS:
     def _synthesize(self, text: str) -> np.ndarray | None:
         """
         Синтезирует текст в numpy array с аудио данными.
-        Всё происходит локально — нет сетевых запросов.
+        Всё происходит локально — нет сетевых запросов; PCM фразы
+        сохраняется в кэш озвучки на диске, повтор не синтезируется.
         """
+        from speech.TTS.audio_cache import get_audio_cache
+        variant = (VOICE_MODELS.get(self._lang), self._sr, LENGTH_SCALE, NOISE_SCALE, NOISE_W)
+        pcm = get_audio_cache().get(text, variant, "pcm")
+        if pcm is not None:
+            return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+        audio = self._synthesize_piper(text)
+        if audio is not None:
+            pcm = np.clip(audio * 32768.0, -32768, 32767).astype(np.int16).tobytes()
+            get_audio_cache().put(text, variant, "pcm", pcm)
+        return audio
+
+    def _synthesize_piper(self, text: str) -> np.ndarray | None:
         try:
             from piper import SynthesisConfig
 
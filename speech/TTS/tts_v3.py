@@ -13,9 +13,11 @@ tts_v3.py — Text-to-Speech через Microsoft Edge TTS (бесплатно,
 import asyncio
 import collections
 import io
+import queue
 import random
 import threading
 import time
+from typing import Iterable
 
 import av
 import numpy as np
@@ -135,15 +137,22 @@ async def _synth_async(text: str, voice: str, rate: str) -> bytes:
 
 
 def _synthesize(text: str, voice: str, rate: str) -> tuple[np.ndarray, int] | None:
-    """Запускает async синтез в общем фоновом event loop (быстро)."""
+    """
+    Запускает async синтез в общем фоновом event loop (быстро).
+    MP3 сохраняется в кэш озвучки на диске — повтор фразы без сети.
+    """
+    from speech.TTS.audio_cache import get_audio_cache
     try:
-        loop = _get_bg_loop()
-        future = asyncio.run_coroutine_threadsafe(
-            _synth_async(text, voice, rate), loop
-        )
-        mp3 = future.result(timeout=15.0)
-        if not mp3:
-            return None
+        mp3 = get_audio_cache().get(text, (voice, rate), "mp3")
+        if mp3 is None:
+            loop = _get_bg_loop()
+            future = asyncio.run_coroutine_threadsafe(
+                _synth_async(text, voice, rate), loop
+            )
+            mp3 = future.result(timeout=15.0)
+            if not mp3:
+                return None
+            get_audio_cache().put(text, (voice, rate), "mp3", mp3)
         return _mp3_to_numpy(mp3)
 
     except Exception as e:
@@ -240,6 +249,64 @@ class TTS:
             TTS.is_speaking = False
             print(f"  [!] TTS v3 ошибка: {e}")
 
+    def speak_stream(self, sentences: Iterable[str], on_sentence=None) -> str:
+        """
+        Озвучивает предложения по мере поступления (Brain.think_stream):
+        синтез следующего идёт, пока играет текущее — первое предложение
+        звучит, пока модель ещё пишет остальные. on_sentence(s) вызывается на
+        каждое полученное предложение (вывод, UI). После stop() источник
+        дочитывается без синтеза — ответ модели нужен целиком для истории.
+        Возвращает весь текст ответа. Блокирует до конца.
+        """
+        self._stop_evt.clear()
+        voice   = _get_voice()
+        rate    = _get_rate()
+        audio_q: queue.Queue = queue.Queue(maxsize=2)
+        spoken:  list[str]   = []
+
+        def _producer():
+            try:
+                for s in sentences:
+                    spoken.append(s)
+                    if on_sentence is not None:
+                        try:
+                            on_sentence(s)
+                        except Exception as e:
+                            print(f"  [!] TTS on_sentence: {e}")
+                    if self._stop_evt.is_set():
+                        continue
+                    result = self._cache_get(s)
+                    if result is None:
+                        result = _synthesize(s, voice, rate)
+                        if result is None:
+                            print(f"  [TTS] {s}")
+                            continue
+                        self._cache_put(s, result)
+                    audio_q.put(result)
+            except Exception as e:
+                print(f"  [!] TTS v3 поток текста: {e}")
+            finally:
+                audio_q.put(None)   # сигнал окончания
+
+        producer = threading.Thread(target=_producer, daemon=True, name="tts-producer")
+        producer.start()
+
+        try:
+            while True:
+                item = audio_q.get()
+                if item is None:
+                    break
+                if self._stop_evt.is_set():
+                    continue   # дочитываем очередь, чтобы продюсер не завис на put()
+                TTS.is_speaking = True
+                self._play(*item)
+        finally:
+            producer.join()
+            if TTS.is_speaking:
+                time.sleep(ECHO_PAUSE)
+            TTS.is_speaking = False
+        return " ".join(spoken)
+
     def speak_activation(self):
         """Случайная фраза активации — мгновенно из кэша."""
         lang    = getattr(config, "ACTIVE_LANGUAGE", "ru")
@@ -0,0 +1,29 @@
+"""
+tokens.py — оценка числа токенов текста без запроса к API.
+
+Нужна и истории диалога (ai/brain.py — бюджет HISTORY_TOKEN_BUDGET), и
+клиенту эмбеддингов (database/files/embed_client.py — батчи и лимиты
+в токенах). Точный подсчёт — tiktoken, если установлен; иначе эвристика.
+"""
+
+_encoder = None
+_encoder_loaded = False
+
+
+def estimate_tokens(text: str) -> int:
+    """tiktoken если установлен, иначе грубая оценка: ~4 символа ASCII или ~2 кириллицы на токен."""
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        _encoder_loaded = True
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoder = None
+    if _encoder is not None:
+        try:
+            return len(_encoder.encode(text, disallowed_special=()))
+        except Exception:
+            pass
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars + 1) // 2